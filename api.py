@@ -0,0 +1,112 @@
+import json
+import hashlib
+import threading
+from operator import itemgetter
+
+# Javobda bo'lishi mumkin bo'lgan maydonlar (fields= shu nomlardan tanlanadi)
+API_FIELDS = ('id', 'title', 'description', 'duration', 'price', 'start_date',
+              'features', 'image_url', 'color', 'created_at', 'url')
+# Javob formati o'zgarganda oshiriladi: mijozlardagi eski ETag'lar 304 olmaydi
+API_REVISION = 2
+
+
+def parse_fields(value):
+    """Requested field names in ``API_FIELDS`` order.
+
+    An empty value means all fields; unknown names raise ``ValueError``.
+    """
+    if not value:
+        return API_FIELDS
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(API_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in API_FIELDS if name in names)
+
+
+def make_etag(version, *parts):
+    key = '\0'.join(str(part) for part in (API_REVISION, version, *parts))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _course_values(course, lang):
+    return {
+        'id': course.id,
+        'title': course.title,
+        'description': course.description,
+        'duration': course.duration,
+        'price': course.price,
+        'start_date': course.start_date,
+        'features': list(course.features),
+        'image_url': course.image_url,
+        'color': course.color,
+        'created_at': course.created_at,
+        # Sahifa shu til prefiksi ostida (course_detail route'i)
+        'url': f'/{lang}/course/{course.id}',
+    }
+
+
+class CourseEncoder:
+    """JSON for catalog courses, assembled from pre-encoded fragments.
+
+    Every field of a course is serialized once per catalog build as a
+    ``"name":value`` byte string, and the full object is kept ready-made.
+    A response only joins the fragments of the requested fields, with a
+    joiner compiled once per ``fields`` selection. Course objects are
+    replaced on every catalog rebuild, so fragments are keyed by the
+    object and never go stale.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._tables = {}    # lang -> (catalog list, {course: fragments})
+        self._joiners = {}   # fields -> callable(fragments) -> bytes
+        self._lock = threading.Lock()
+
+    def _table(self, lang):
+        courses = self.catalog.all(lang)
+        entry = self._tables.get(lang)
+        if entry is None or entry[0] is not courses:
+            # Katalog qayta qurilgan: eski bo'laklar tashlab yuboriladi
+            with self._lock:
+                entry = self._tables.get(lang)
+                if entry is None or entry[0] is not courses:
+                    entry = self._tables[lang] = (courses, {})
+        return entry[1]
+
+    def _joiner(self, fields):
+        joiner = self._joiners.get(fields)
+        if joiner is None:
+            indexes = [API_FIELDS.index(name) for name in fields]
+            if fields == API_FIELDS:
+                # To'liq obyekt bo'laklar bilan birga tayyorlab qo'yilgan
+                joiner = itemgetter(-1)
+            elif len(indexes) == 1:
+                index = indexes[0]
+                joiner = lambda fragments: b'{' + fragments[index] + b'}'
+            else:
+                get = itemgetter(*indexes)
+                joiner = lambda fragments: b'{' + b','.join(get(fragments)) + b'}'
+            self._joiners[fields] = joiner
+        return joiner
+
+    def _fragments(self, table, course, lang):
+        fragments = table.get(course)
+        if fragments is None:
+            values = _course_values(course, lang)
+            parts = [f'"{name}":{_dumps(values[name])}'.encode('utf-8') for name in API_FIELDS]
+            fragments = table[course] = (*parts, b'{' + b','.join(parts) + b'}')
+        return fragments
+
+    def encode_course(self, lang, course, fields=API_FIELDS):
+        return self._joiner(fields)(self._fragments(self._table(lang), course, lang))
+
+    def encode_page(self, lang, courses, next_cursor, fields=API_FIELDS):
+        table = self._table(lang)
+        join = self._joiner(fields)
+        items = b','.join([join(self._fragments(table, course, lang)) for course in courses])
+        return b'{"courses":[' + items + b'],"next_cursor":' + _dumps(next_cursor).encode('utf-8') + b'}'
@@ -0,0 +1,179 @@
+# uvicorn --factory asgi:create_application --workers 3   (yoki: hypercorn 'asgi:create_application()')
+import os
+import sys
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from config import Config
+
+# Shundan katta so'rov tanasi xotirada emas, vaqtinchalik faylda turadi
+BODY_MEMORY_LIMIT = 64 * 1024
+# Javob bo'laklari shu hajmgacha yig'ilib event loop'ga bitta o'tishda yuboriladi
+SEND_BUFFER = 64 * 1024
+
+
+def wsgi_environ(scope, body, content_length):
+    """WSGI environ for an ASGI HTTP scope whose body is already read into ``body``."""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI satrlari latin-1 ko'rinishidagi baytlar
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        # Tana to'liq o'qilgan: chunked so'rovda ham uzunlik ma'lum
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if key in environ:
+            # HTTP/2 cookie'ni bir necha sarlavhaga bo'ladi
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+class WsgiBridge:
+    """ASGI application serving a WSGI app (all the Flask routes) from threads.
+
+    The request body is received on the event loop before a thread is
+    taken, so slow uploads and idle keep-alive connections cost a
+    coroutine instead of a worker thread. The view then runs on a pool of
+    ``threads`` threads, and the response goes back to the loop in as few
+    hops as possible (one for an ordinary page); streamed responses keep
+    the server's backpressure. Unlike asgiref's ``WsgiToAsgi``, requests
+    are not serialized on one shared thread, and ``close()`` is called on
+    the response, so Flask's teardown runs.
+    """
+
+    def __init__(self, wsgi_app, threads=4, on_startup=(), on_shutdown=()):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.on_startup = list(on_startup)
+        self.on_shutdown = list(on_shutdown)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        # Fork'dan keyin (gunicorn -k uvicorn.workers.UvicornWorker) yangi pool
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='asgi')
+                    self._pid = os.getpid()
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close'})
+
+    async def lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            callbacks = {'lifespan.startup': self.on_startup,
+                         'lifespan.shutdown': self.on_shutdown}.get(message['type'])
+            if callbacks is None:
+                continue
+            for callback in callbacks:
+                await loop.run_in_executor(None, callback)
+            await send({'type': message['type'] + '.complete'})
+            if message['type'] == 'lifespan.shutdown':
+                return
+
+    async def http(self, scope, receive, send):
+        with SpooledTemporaryFile(BODY_MEMORY_LIMIT) as body:
+            length = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                body.write(chunk)
+                length += len(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor(), self.run_wsgi, loop, scope, body, length, send)
+
+    def run_wsgi(self, loop, scope, body, length, send):
+        # Thread ichida: view, so'ng javob event loop orqali yuboriladi
+        response = {}
+        pending = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            }
+            return pending.append
+
+        def flush(more_body):
+            messages = []
+            if not response.get('started'):
+                messages.append(response['start'])
+                response['started'] = True
+            messages.append({'type': 'http.response.body', 'body': b''.join(pending), 'more_body': more_body})
+            pending.clear()
+            asyncio.run_coroutine_threadsafe(_send_all(send, messages), loop).result()
+
+        result = self.wsgi_app(wsgi_environ(scope, body, length), start_response)
+        try:
+            size = 0
+            for chunk in result:
+                if not chunk:
+                    continue
+                pending.append(chunk)
+                size += len(chunk)
+                if size >= SEND_BUFFER:
+                    flush(True)
+                    size = 0
+            flush(False)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+async def _send_all(send, messages):
+    for message in messages:
+        await send(message)
+
+
+def create_application():
+    """The ASGI application for uvicorn/hypercorn, like ``main:create_app()`` for gunicorn."""
+    from main import create_app, lead_writer
+    # Buferdagi arizalar worker to'xtashidan oldin yoziladi (gunicorn.conf.py dagi worker_exit kabi)
+    return WsgiBridge(create_app(), threads=Config.ASGI_THREADS, on_shutdown=[lead_writer.stop])
+
@@ -0,0 +1,171 @@
+import os
+import re
+import glob
+import json
+import shutil
+import subprocess
+import tempfile
+
+import requests
+
+from assets import fingerprint
+
+try:
+    import rjsmin
+except ImportError:  # ixtiyoriy: bo'lmasa JS faqat birlashtiriladi
+    rjsmin = None
+
+TAILWIND_CONFIG_RE = re.compile(r'tailwind\.config\s*=\s*\{')
+FONT_URL_RE = re.compile(r'url\((?:\.\./)?webfonts/([^)?#]+)[^)]*\)')
+
+VENDOR_CSS = {
+    'fontawesome.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'aos.css': 'https://unpkg.com/aos@2.3.1/dist/aos.css',
+}
+VENDOR_JS = {
+    'aos.js': 'https://unpkg.com/aos@2.3.1/dist/aos.js',
+}
+FONTAWESOME_WEBFONTS_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/'
+
+
+class AssetBuildError(Exception):
+    pass
+
+
+def extract_tailwind_config(html):
+    """Return the object literal assigned to ``tailwind.config`` in ``html``."""
+    match = TAILWIND_CONFIG_RE.search(html)
+    if match is None:
+        return '{}'
+    start = match.end() - 1
+    depth = 0
+    for i in range(start, len(html)):
+        if html[i] == '{':
+            depth += 1
+        elif html[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return html[start:i + 1]
+    raise AssetBuildError('tailwind.config is not closed')
+
+
+class AssetBuilder:
+    """Compile the public site's CSS/JS into ``static/dist``.
+
+    Replaces the in-browser Tailwind compiler and the Font Awesome / AOS
+    CDN requests with two self-hosted files:
+
+    * ``dist/app.css``: AOS + Font Awesome (fonts copied to
+      ``dist/webfonts`` and referenced by fingerprinted URL) + Tailwind
+      output built with the standalone ``tailwindcss`` CLI from the classes
+      used in ``templates/**/*.html``, ``static/src/js`` and the course
+      colours stored in the database, using the theme configured inline
+      in ``base.html``;
+    * ``dist/app.js``: AOS + ``static/src/js/*.js`` (the former inline
+      scripts), loaded with ``defer``.
+
+    Vendor downloads are cached in ``cache_dir``.
+    """
+
+    def __init__(self, root, static_folder, template_folder, cache_dir,
+                 tailwind_bin='tailwindcss', asset_prefix='/assets', session=None):
+        self.root = root
+        self.static_folder = static_folder
+        self.template_folder = template_folder
+        self.cache_dir = cache_dir
+        self.tailwind_bin = tailwind_bin
+        self.asset_prefix = asset_prefix.rstrip('/')
+        self.session = session or requests.Session()
+        self.dist = os.path.join(static_folder, 'dist')
+
+    def build(self, extra_classes=()):
+        os.makedirs(self.dist, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        css = '\n'.join([
+            self.fetch('aos.css', VENDOR_CSS['aos.css']).decode('utf-8'),
+            self.fontawesome_css(),
+            self.tailwind_css(extra_classes),
+        ])
+        js = '\n;\n'.join([self.fetch('aos.js', VENDOR_JS['aos.js']).decode('utf-8')] + self.source_scripts())
+        if rjsmin is not None:
+            js = rjsmin.jsmin(js)
+
+        outputs = {'dist/app.css': css.encode('utf-8'), 'dist/app.js': js.encode('utf-8')}
+        for logical, data in outputs.items():
+            self._write(os.path.join(self.static_folder, logical), data)
+        return {logical: len(data) for logical, data in outputs.items()}
+
+    # --- vendor ---
+
+    def fetch(self, name, url):
+        path = os.path.join(self.cache_dir, name)
+        if not os.path.exists(path):
+            response = self.session.get(url, timeout=30)
+            if response.status_code != 200:
+                raise AssetBuildError(f'{url}: HTTP {response.status_code}')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, response.content)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def fontawesome_css(self):
+        css = self.fetch('fontawesome.css', VENDOR_CSS['fontawesome.css']).decode('utf-8')
+        urls = {}
+        for font in sorted(set(FONT_URL_RE.findall(css))):
+            data = self.fetch(f'webfonts/{font}', FONTAWESOME_WEBFONTS_URL + font)
+            logical = f'dist/webfonts/{font}'
+            self._write(os.path.join(self.static_folder, logical), data)
+            urls[font] = f'{self.asset_prefix}/{fingerprint(logical, data)}'
+        # ../webfonts/x.woff2 -> /assets/dist/webfonts/x.<hash>.woff2
+        return FONT_URL_RE.sub(lambda m: f'url({urls[m.group(1)]})', css)
+
+    # --- tailwind ---
+
+    def tailwind_css(self, extra_classes=()):
+        with open(os.path.join(self.template_folder, 'base.html'), 'r', encoding='utf-8') as f:
+            inline_config = extract_tailwind_config(f.read())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            classes_file = os.path.join(tmp, 'classes.txt')
+            with open(classes_file, 'w', encoding='utf-8') as f:
+                f.write(' '.join(sorted(set(' '.join(c for c in extra_classes if c).split()))))
+
+            content = [
+                os.path.join(self.template_folder, '**', '*.html'),
+                os.path.join(self.static_folder, 'src', 'js', '**', '*.js'),
+                classes_file,
+            ]
+            config_path = os.path.join(tmp, 'tailwind.config.js')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                f.write(f'module.exports = Object.assign({inline_config}, {{content: {json.dumps(content)}}});\n')
+
+            output = os.path.join(tmp, 'tailwind.css')
+            command = [self.tailwind_bin, '-c', config_path,
+                       '-i', os.path.join(self.static_folder, 'src', 'css', 'app.css'),
+                       '-o', output, '--minify']
+            if shutil.which(self.tailwind_bin) is None and not os.path.exists(self.tailwind_bin):
+                raise AssetBuildError(
+                    f"'{self.tailwind_bin}' topilmadi: pip install pytailwindcss yoki TAILWINDCSS_BIN ni sozlang")
+            result = subprocess.run(command, cwd=self.root, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise AssetBuildError(result.stderr.strip() or 'tailwindcss failed')
+            with open(output, 'r', encoding='utf-8') as f:
+                return f.read()
+
+    # --- scripts ---
+
+    def source_scripts(self):
+        scripts = []
+        for path in sorted(glob.glob(os.path.join(self.static_folder, 'src', 'js', '*.js'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                scripts.append(f.read())
+        return scripts
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
@@ -0,0 +1,89 @@
+import os
+import hashlib
+import mimetypes
+
+from compression import compress, is_compressible, supported_encodings, MIN_SIZE
+
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+
+def fingerprint(logical, data):
+    base, ext = os.path.splitext(logical)
+    return f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+class Asset:
+    __slots__ = ('logical', 'hashed', 'path', 'mimetype', 'etag', 'size', 'variants')
+
+    def __init__(self, logical, hashed, path, mimetype, etag, size, variants):
+        self.logical = logical
+        self.hashed = hashed
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.size = size
+        self.variants = variants  # encoding -> bytes
+
+
+class AssetManifest:
+    """Content-hashed URLs for everything under ``static/``.
+
+    ``build()`` walks the static folder once at startup, maps each file to
+    ``<name>.<hash>.<ext>`` and pre-compresses text assets with gzip (and
+    brotli when installed). ``url()`` is what templates call through
+    ``static_url()``; files the manifest doesn't know fall back to the
+    plain ``/static/`` URL.
+    """
+
+    def __init__(self, static_folder, url_prefix='/assets', exclude=()):
+        self.static_folder = static_folder
+        self.url_prefix = url_prefix.rstrip('/')
+        self.exclude = tuple(exclude)
+        self._by_logical = {}
+        self._by_hashed = {}
+
+    def build(self):
+        by_logical, by_hashed = {}, {}
+        for dirpath, dirnames, filenames in os.walk(self.static_folder):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                logical = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                if logical.startswith(self.exclude):
+                    continue
+                asset = self._load(logical, path)
+                by_logical[logical] = asset
+                by_hashed[asset.hashed] = asset
+        self._by_logical, self._by_hashed = by_logical, by_hashed
+        return self
+
+    def _load(self, logical, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        hashed = fingerprint(logical, data)
+        mimetype = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+        variants = {}
+        if is_compressible(mimetype) and len(data) >= MIN_SIZE:
+            for encoding in supported_encodings():
+                body = compress(data, encoding)
+                if len(body) < len(data):
+                    variants[encoding] = body
+        return Asset(logical, hashed, path, mimetype, digest[:32], len(data), variants)
+
+    def url(self, logical):
+        asset = self._by_logical.get(logical)
+        if asset is None:
+            return f'/static/{logical}'
+        return f'{self.url_prefix}/{asset.hashed}'
+
+    def exists(self, logical):
+        return logical in self._by_logical
+
+    def lookup(self, hashed):
+        return self._by_hashed.get(hashed)
+
+    def __len__(self):
+        return len(self._by_logical)
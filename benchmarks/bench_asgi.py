@@ -0,0 +1,243 @@
+"""Sync (gunicorn gthread) vs. ASGI (uvicorn + asgi.py) under a slow upstream.
+
+Starts a fake Telegram API that answers every sendMessage after
+``--upstream-delay`` seconds, points ``TELEGRAM_API_URL`` at it and runs
+the same load against each deployment with the same number of worker
+processes and view threads, so both use about the same memory (the total
+RSS of the server processes is reported): ``--clients`` keep-alive
+clients cycling through a course page, the course listing and a contact
+form post, plus ``--slow-clients`` that upload a form post a few bytes
+every ``--slow-interval`` seconds, like phones on a bad connection.
+Reports requests/s and p50/p99 latency per kind, and how many Telegram
+messages were delivered while the load ran. The ASGI run is skipped if
+uvicorn is not installed.
+
+    python benchmarks/bench_asgi.py [--workers 2] [--threads 4] [--clients 16] [--slow-clients 8] [--seconds 10]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KINDS = ('page', 'list', 'form')
+
+
+class FakeTelegram(BaseHTTPRequestHandler):
+    delay = 1.0
+    delivered = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.delay)
+        with self.lock:
+            FakeTelegram.delivered += 1
+        body = b'{"ok": true, "result": {}}'
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # server to'xtatilgan
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_tree_rss(pid):
+    # /proc bo'yicha: master/supervisor va uning barcha workerlari, KiB
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    stack.extend(int(child) for child in f.read().split())
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+def start_server(name, port, env, args):
+    if name == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py']
+        env = dict(env, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS=str(args.workers),
+                   GUNICORN_THREADS=str(args.threads))
+    else:
+        command = [sys.executable, '-m', 'uvicorn', '--factory', 'asgi:create_application', '--port', str(port),
+                   '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log']
+        env = dict(env, ASGI_THREADS=str(args.threads))
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/uz/')
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                # Har bir worker o'z keshini to'ldirsin
+                for _ in range(args.workers * 4):
+                    for path in ('/uz/course/1', '/uz/online-courses'):
+                        connection.request('GET', path)
+                        connection.getresponse().read()
+                connection.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{name} did not start')
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))]
+
+
+def client(port, deadline, number, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    i = 0
+    while time.monotonic() < deadline:
+        kind = KINDS[i % len(KINDS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if kind == 'form':
+                body = urlencode({'name': f'Bench {number}-{i}', 'phone': f'+99890{number:03d}{i:04d}',
+                                  'subject': 'Savol', 'message': f'Xabar {i}'})
+                connection.request('POST', '/uz/contact-form', body,
+                                   {'Content-Type': 'application/x-www-form-urlencoded'})
+                expect = 302
+            else:
+                connection.request('GET', '/uz/course/1' if kind == 'page' else '/uz/online-courses')
+                expect = 200
+            response = connection.getresponse()
+            response.read()
+            if response.status != expect:
+                raise RuntimeError(response.status)
+            latencies[kind].append(time.perf_counter() - start)
+        except Exception:
+            errors[kind] += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.close()
+
+
+def slow_client(port, deadline, number, interval, done):
+    # Forma tanasi bir necha baytdan, har interval soniyada
+    i = 0
+    while time.monotonic() < deadline:
+        i += 1
+        body = urlencode({'name': f'Slow {number}-{i}', 'phone': f'+99891{number:03d}{i:04d}',
+                          'subject': 'Savol', 'message': 'Sekin tarmoq'}).encode()
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=30) as s:
+                s.sendall(b'POST /uz/contact-form HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+                          b'Content-Type: application/x-www-form-urlencoded\r\n'
+                          + f'Content-Length: {len(body)}\r\n\r\n'.encode())
+                for offset in range(0, len(body), 16):
+                    if time.monotonic() >= deadline:
+                        return
+                    time.sleep(interval)
+                    s.sendall(body[offset:offset + 16])
+                if s.recv(12).startswith(b'HTTP/1.1 302'):
+                    done[0] += 1
+        except OSError:
+            pass
+
+
+def run(name, port, env, args):
+    process = start_server(name, port, env, args)
+    try:
+        delivered = FakeTelegram.delivered
+        latencies = {kind: [] for kind in KINDS}
+        errors = dict.fromkeys(KINDS, 0)
+        slow_done = [0]
+        deadline = time.monotonic() + args.seconds
+        threads = [threading.Thread(target=slow_client, args=(port, deadline, n, args.slow_interval, slow_done))
+                   for n in range(args.slow_clients)]
+        # Sekin mijozlar avval ulanib olsin
+        for t in threads:
+            t.start()
+        time.sleep(min(1.0, args.seconds / 4))
+        start = time.perf_counter()
+        clients = [threading.Thread(target=client, args=(port, deadline, n, latencies, errors))
+                   for n in range(args.clients)]
+        for t in clients:
+            t.start()
+        rss = process_tree_rss(process.pid)
+        for t in clients + threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        total = sum(len(values) for values in latencies.values())
+        print(f'{name:>8}: {total / elapsed:7.0f} req/s  RSS {rss / 1024:6.1f} MiB  '
+              f'slow posts {slow_done[0]}  telegram delivered {FakeTelegram.delivered - delivered}')
+        for kind in KINDS:
+            values = sorted(latencies[kind])
+            print(f'{kind:>14}: {len(values) / elapsed:7.0f} req/s  p50 {percentile(values, 50) * 1000:7.1f} ms'
+                  f'  p99 {percentile(values, 99) * 1000:7.1f} ms  errors {errors[kind]}')
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='Har bir workerda view threadlari')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--slow-clients', type=int, default=8)
+    parser.add_argument('--slow-interval', type=float, default=0.5)
+    parser.add_argument('--upstream-delay', type=float, default=1.0, help='Telegram javobi (soniya)')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    FakeTelegram.delay = args.upstream_delay
+    upstream = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegram)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+
+    try:
+        import uvicorn  # noqa: F401
+        servers = ('gunicorn', 'uvicorn')
+    except ImportError:
+        print('uvicorn is not installed: only the sync deployment is measured')
+        servers = ('gunicorn',)
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   DATABASE_PATH=os.path.join(directory, 'bench.db'),
+                   TELEGRAM_BOT_TOKEN='bench', TELEGRAM_CHAT_ID='1',
+                   TELEGRAM_API_URL=f'http://127.0.0.1:{upstream.server_port}',
+                   RATE_LIMIT_PER_IP=str(10 ** 9), RATE_LIMIT_PER_PHONE=str(10 ** 9),
+                   FREEZE_DIR='')
+        # Baza bir marta tayyorlanadi, workerlar faqat tekshiradi
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'main', 'bootstrap'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        for name in servers:
+            run(name, free_port(), env, args)
+    upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
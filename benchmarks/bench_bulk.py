@@ -0,0 +1,122 @@
+"""Bulk course import/export throughput.
+
+Generates ``--rows`` courses with all three translations as JSON Lines and
+CSV, imports each file into a fresh scratch database (schema migrated,
+full-text search triggers installed, like production), imports the JSON
+Lines file again so every record is an update, and exports the catalog
+in both formats. Reports records/s and the process's peak RSS after each
+step, which should not grow with ``--rows``. ``--no-search`` leaves out the
+FTS5 index to show its share of the import cost.
+
+    python benchmarks/bench_bulk.py [--rows 100000] [--chunk-size 1000] [--no-search]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import Database
+from migrations import migrate
+from search import CourseSearch, drop_triggers
+from i18n import LANGUAGES, DEFAULT_LANGUAGE
+from bulk import FORMATS, record_columns, read_records, import_courses, export_courses
+
+
+def record(i):
+    values = {'image_path': f'static/images/courses/{i % 97:02x}.jpg', 'color': 'from-islamic-green to-islamic-blue'}
+    for lang in LANGUAGES:
+        values.update({
+            f'title_{lang}': f'Kurs {i} ({lang})',
+            f'description_{lang}': f"Kurs {i} tavsifi: qur'on, arab tili, tajvid va fiqh asoslari",
+            f'duration_{lang}': f'{i % 12 + 1} oy',
+            f'price_{lang}': f'{(i % 9 + 1) * 100},000 UZS',
+            f'start_date_{lang}': f'{i % 28 + 1} Yanvar',
+            f'features_{lang}': ['Tajvid', 'Grammatika', f'Guruh {i % 20}'],
+        })
+    return values
+
+
+def write_inputs(directory, rows):
+    import csv
+    paths = {fmt: os.path.join(directory, f'courses.{fmt}') for fmt in FORMATS}
+    with open(paths['jsonl'], 'w', encoding='utf-8') as jf, open(paths['csv'], 'w', encoding='utf-8', newline='') as cf:
+        writer = csv.DictWriter(cf, record_columns(LANGUAGES), extrasaction='ignore')
+        writer.writeheader()
+        for i in range(rows):
+            values = record(i)
+            jf.write(json.dumps(values, ensure_ascii=False) + '\n')
+            writer.writerow({k: ', '.join(v) if isinstance(v, list) else v for k, v in values.items()})
+    return paths
+
+
+def scratch_database(directory, name, with_search):
+    database = Database(os.path.join(directory, name))
+    search = CourseSearch(database, None, LANGUAGES) if with_search else None
+    with database.transaction() as conn:
+        migrate(conn)
+        if search is None:
+            # Migratsiya indeksni yaratadi; trigger'larsiz u import narxiga qo'shilmaydi
+            drop_triggers(conn)
+    return database, search
+
+
+def measure(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def report(name, count, elapsed, extra=''):
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+    print(f'{name:>16}: {count / elapsed:9.0f} records/s  {elapsed:6.2f} s  peak RSS {rss:6.1f} MiB{extra}')
+
+
+def run_import(database, search, path, fmt, chunk_size):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return import_courses(database, read_records(f, fmt), LANGUAGES, DEFAULT_LANGUAGE, search,
+                              chunk_size=chunk_size)
+
+
+def run_export(database, fmt):
+    return sum(len(chunk) for chunk in export_courses(database, fmt, LANGUAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--no-search', action='store_true', help='FTS5 indeksisiz')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_inputs(directory, args.rows)
+        for fmt in FORMATS:
+            print(f'{fmt} input: {os.path.getsize(paths[fmt]) / 2 ** 20:.1f} MiB')
+
+        for fmt in FORMATS:
+            database, search = scratch_database(directory, f'{fmt}.db', not args.no_search)
+            result, elapsed = measure(lambda: run_import(database, search, paths[fmt], fmt, args.chunk_size))
+            report(f'import {fmt}', args.rows, elapsed,
+                   f'  added {result.added}  updated {result.updated}  errors {len(result.errors)}')
+
+        # Hamma yozuv mavjud kursni yangilaydi (id'lar bilan eksport qilingan fayl)
+        exported = os.path.join(directory, 'exported.jsonl')
+        with open(exported, 'w', encoding='utf-8', newline='') as f:
+            for chunk in export_courses(database, 'jsonl', LANGUAGES):
+                f.write(chunk)
+        result, elapsed = measure(lambda: run_import(database, search, exported, 'jsonl', args.chunk_size))
+        report('re-import jsonl', args.rows, elapsed, f'  added {result.added}  updated {result.updated}')
+
+        for fmt in FORMATS:
+            size, elapsed = measure(lambda: run_export(database, fmt))
+            report(f'export {fmt}', args.rows, elapsed, f'  {size / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
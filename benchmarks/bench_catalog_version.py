@@ -0,0 +1,179 @@
+"""Cache coherence across worker processes through the catalog version.
+
+Loads the app once and forks ``--workers`` reader processes from it, the
+way gunicorn's ``preload_app`` does, plus an admin process. Every process
+has its own page cache and course read model over one database file.
+
+1. Rounds: the admin process edits a course title through
+   ``admin_edit_course``; then each worker requests the course page and
+   the API object once. Every worker must show the new title on that
+   first request, and all workers must send the same API ETag.
+2. Load: the workers serve the course page and API object in a loop for
+   ``--seconds`` while the admin process keeps editing. A response is
+   stale if its request started after a newer title was committed but
+   still shows an older one; there must be none.
+
+Also reports what the per-request version check costs. Exits with 1 on
+any stale response, ETag mismatch or error.
+
+    python benchmarks/bench_catalog_version.py [--workers 4] [--rounds 20] [--seconds 5]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TITLE_RE = re.compile(r'Coherence (\d+)')
+COURSE_ID = 1
+
+
+def edit_form(n):
+    return {'title_uz': f'Coherence {n}', 'description_uz': 'Tavsif', 'duration_uz': '3 oy',
+            'price_uz': '100,000 UZS', 'start_date_uz': '1 Yanvar', 'color': 'from-islamic-green to-islamic-blue'}
+
+
+def seen_title(body):
+    match = TITLE_RE.search(body)
+    return int(match.group(1)) if match else 0
+
+
+def fetch(client):
+    page = client.get(f'/uz/course/{COURSE_ID}')
+    api = client.get(f'/api/v1/courses/{COURSE_ID}?lang=uz&fields=id,title')
+    if page.status_code != 200 or api.status_code != 200:
+        raise RuntimeError(f'HTTP {page.status_code}/{api.status_code}')
+    return seen_title(page.get_data(as_text=True)), seen_title(api.get_data(as_text=True)), api.headers['ETag']
+
+
+def worker(commands, results):
+    import main
+    client = main.app.test_client()
+    while True:
+        command = commands.get()
+        if command is None:
+            return
+        if command == 'fetch':
+            try:
+                results.put(fetch(client))
+            except Exception as e:
+                results.put(e)
+            continue
+        # ('load', deadline): so'rov boshlangan vaqt va ko'rilgan sarlavha
+        samples, errors = [], 0
+        while time.monotonic() < command[1]:
+            start = time.monotonic()
+            try:
+                page, api, _ = fetch(client)
+                samples.append((start, page, api))
+            except Exception:
+                errors += 1
+        results.put((samples, errors))
+
+
+def admin(commands, results):
+    import main
+    client = main.app.test_client()
+    client.post('/admin/login', data={'username': 'admin', 'password': 'admin123'})
+    while True:
+        command = commands.get()
+        if command is None:
+            return
+        if isinstance(command, int):
+            response = client.post(f'/admin/course/edit/{COURSE_ID}', data=edit_form(command))
+            results.put(response.status_code)
+            continue
+        # ('load', deadline, first): commit vaqtlari (javob qaytgandan keyin)
+        commits, n = [], command[2]
+        while time.monotonic() < command[1]:
+            client.post(f'/admin/course/edit/{COURSE_ID}', data=edit_form(n))
+            commits.append((time.monotonic(), n))
+            n += 1
+            time.sleep(0.02)
+        results.put(commits)
+
+
+def check_cost(main, repeat=20000):
+    with main.app.app_context():
+        main.course_catalog.rebuild()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            main.course_catalog.refresh()
+        return (time.perf_counter() - start) / repeat
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_PATH'] = os.path.join(tmp, 'bench.db')
+        os.environ['TELEGRAM_BOT_TOKEN'] = ''
+        os.environ['FREEZE_DIR'] = ''
+        import main
+        # preload_app kabi: keshlar fork'dan oldin to'ldiriladi
+        main.create_app()
+        failures = 0
+
+        queues = [multiprocessing.Queue() for _ in range(args.workers + 1)]
+        results = [multiprocessing.Queue() for _ in range(args.workers + 1)]
+        procs = [multiprocessing.Process(target=worker, args=(queues[i], results[i]), daemon=True)
+                 for i in range(args.workers)]
+        procs.append(multiprocessing.Process(target=admin, args=(queues[-1], results[-1]), daemon=True))
+        for p in procs:
+            p.start()
+        workers = range(args.workers)
+
+        # 1. Har bir tahrirdan keyingi birinchi so'rov
+        for n in range(1, args.rounds + 1):
+            queues[-1].put(n)
+            status = results[-1].get()
+            for i in workers:
+                queues[i].put('fetch')
+            seen = [results[i].get() for i in workers]
+            errors = [s for s in seen if isinstance(s, Exception)]
+            etags = {s[2] for s in seen if not isinstance(s, Exception)}
+            stale = [s for s in seen if not isinstance(s, Exception) and s[:2] != (n, n)]
+            if status != 302 or errors or stale or len(etags) != 1:
+                failures += 1
+                print(f'round {n}: admin {status}, errors {errors}, stale {stale}, etags {len(etags)}')
+        print(f'rounds: {args.rounds} edits x {args.workers} workers, {failures} failed')
+
+        # 2. Yuklama ostida
+        deadline = time.monotonic() + args.seconds
+        for i in workers:
+            queues[i].put(('load', deadline))
+        queues[-1].put(('load', deadline, args.rounds + 1))
+        commits = results[-1].get()
+        served = stale = errors = 0
+        for i in workers:
+            samples, worker_errors = results[i].get()
+            errors += worker_errors
+            served += len(samples)
+            for start, page, api in samples:
+                # So'rov boshlanishidan oldin commit qilingan eng yangi sarlavha
+                committed = max((n for at, n in commits if at < start), default=args.rounds)
+                if min(page, api) < committed:
+                    stale += 1
+        for q in queues:
+            q.put(None)
+        for p in procs:
+            p.join()
+        failures += stale + errors
+        print(f'load:   {served / args.seconds:,.0f} requests/s, {len(commits)} edits, '
+              f'{stale} stale responses, {errors} errors')
+
+        print(f'check:  {check_cost(main) * 1e6:.1f} us per request (catalog_version read)')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main_()
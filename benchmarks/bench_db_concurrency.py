@@ -0,0 +1,109 @@
+"""Hammer course reads while an admin-style writer updates the table.
+
+Runs several reader processes (like gunicorn workers, each with a few
+threads) plus one writer process against a scratch copy of the schema and
+fails if any operation raises "database is locked".
+
+    python benchmarks/bench_db_concurrency.py [--workers 4] [--threads 4] [--seconds 5]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def reader(path, threads, seconds, results):
+    from db import Database
+    database = Database(path)
+    counts = {'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def loop():
+        reads = errors = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                database.query('''
+                    SELECT * FROM courses c JOIN course_translations t ON t.course_id = c.id AND t.lang = 'uz'
+                    ORDER BY c.created_at DESC
+                ''')
+                database.query_one("SELECT * FROM course_translations WHERE course_id = ? AND lang = 'uz'", (1,))
+                reads += 2
+            except Exception as e:
+                errors += 1
+                print(f'reader error: {e}')
+        with lock:
+            counts['reads'] += reads
+            counts['errors'] += errors
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(counts)
+
+
+def writer(path, seconds, results):
+    from db import Database
+    from courses import insert_course
+    database = Database(path)
+    writes = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with database.transaction() as conn:
+                conn.execute("UPDATE course_translations SET price = ? WHERE course_id = ? AND lang = 'uz'",
+                             (f'{writes} so\'m', 1))
+                course_id = insert_course(conn, {'uz': {'title': 'Test', 'description': 'Test', 'duration': '1 oy',
+                                                        'price': '1', 'start_date': '1 Yanvar', 'features': None}},
+                                          None, None)
+                conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+            writes += 1
+        except Exception as e:
+            errors += 1
+            print(f'writer error: {e}')
+    results.put({'writes': writes, 'errors': errors})
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        os.environ['DATABASE_PATH'] = path
+        import main
+        main.init_db()
+        main.db.close()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=reader, args=(path, args.threads, args.seconds, results))
+                 for _ in range(args.workers)]
+        procs.append(multiprocessing.Process(target=writer, args=(path, args.seconds, results)))
+        for p in procs:
+            p.start()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        for _ in procs:
+            for key, value in results.get().items():
+                totals[key] += value
+        for p in procs:
+            p.join()
+
+    print(f"reads:  {totals['reads'] / args.seconds:>10,.0f}/s")
+    print(f"writes: {totals['writes'] / args.seconds:>10,.0f}/s")
+    print(f"errors: {totals['errors']}")
+    sys.exit(1 if totals['errors'] else 0)
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,150 @@
+"""Enrollment burst: one transaction per request vs. the LeadWriter buffer.
+
+Several threads (like gunicorn worker threads during a campaign) submit
+enrollments with their Telegram notification as fast as they can against
+a scratch database. ``direct`` commits every enrollment and its outbox
+row on its own, as the route would without the buffer; ``buffered`` goes
+through ``LeadWriter``. Reports throughput, submit latency, commits and
+the worst time a row waited in the buffer (with ``--think-ms 0`` the
+submit threads starve the writer of the GIL, so it exceeds ``max_delay``;
+a pause per request is closer to real traffic). Then times an inbox page
+with a course filter and a full CSV export over the rows written.
+
+    python benchmarks/bench_leads.py [--threads 8] [--seconds 3] [--max-delay 0.2] [--think-ms 1]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import Database
+from migrations import migrate
+from outbox import TelegramOutbox
+from leads import LeadWriter, LEAD_COLUMNS, INBOX_KINDS, inbox_query, iter_csv, utc_timestamp, _INSERTS
+
+COURSES = 50
+
+
+def scratch_database(directory, name):
+    database = Database(os.path.join(directory, name))
+    with database.transaction() as conn:
+        migrate(conn)
+        conn.executemany('INSERT INTO courses (id) VALUES (?)', [(i,) for i in range(1, COURSES + 1)])
+    return database
+
+
+def enrollment(i):
+    return {'course_id': i % COURSES + 1, 'course_title': f'Kurs {i % COURSES + 1}', 'full_name': f'Talaba {i}',
+            'phone': '+998901234567', 'email': 'bench@example.com', 'preferred_time': 'morning',
+            'message': '', 'lang': 'uz'}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))]
+
+
+def run(submit, threads, seconds, think):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+
+    def loop():
+        mine, failed = [], 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            i = next(counter)
+            start = time.perf_counter()
+            try:
+                submit(i)
+            except Exception as e:
+                failed += 1
+                print(f'submit error: {e}')
+            mine.append(time.perf_counter() - start)
+            if think:
+                time.sleep(think)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sorted(latencies), errors[0], time.perf_counter() - start
+
+
+def report(name, latencies, errors, elapsed, commits, extra=''):
+    n = len(latencies)
+    print(f'{name:>9}: {n / elapsed:9.0f} submits/s  p50 {percentile(latencies, 50) * 1000:7.3f} ms'
+          f'  p99 {percentile(latencies, 99) * 1000:7.3f} ms  commits {commits:6d}  errors {errors}{extra}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--max-delay', type=float, default=0.2)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--think-ms', type=float, default=0.0,
+                        help="Har bir ariza orasidagi pauza (so'rovning qolgan ishi)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Har bir ariza o'z tranzaksiyasida (bufer bo'lmaganda)
+        database = scratch_database(directory, 'direct.db')
+        outbox = TelegramOutbox(database, None, 'chat')
+        columns = LEAD_COLUMNS['enrollments'][:-1]
+
+        def direct(i):
+            values = enrollment(i)
+            with database.transaction() as conn:
+                conn.execute(_INSERTS['enrollments'], tuple(values[c] for c in columns) + (utc_timestamp(),))
+                outbox.add(conn, f'Yangi ariza: {values["full_name"]}')
+
+        latencies, errors, elapsed = run(direct, args.threads, args.seconds, args.think_ms / 1000)
+        report('direct', latencies, errors, elapsed, len(latencies))
+
+        database = scratch_database(directory, 'buffered.db')
+        outbox = TelegramOutbox(database, None, 'chat')
+        flushes = {'commits': 0, 'max_wait': 0.0}
+
+        def on_flush(rows, waited):
+            flushes['commits'] += 1
+            flushes['max_wait'] = max(flushes['max_wait'], waited)
+
+        writer = LeadWriter(database, outbox, max_delay=args.max_delay, batch_size=args.batch_size,
+                            on_flush=on_flush)
+
+        def buffered(i):
+            values = enrollment(i)
+            writer.submit('enrollments', values, notification=f'Yangi ariza: {values["full_name"]}')
+
+        latencies, errors, elapsed = run(buffered, args.threads, args.seconds, args.think_ms / 1000)
+        writer.stop()
+        written = database.query_one('SELECT COUNT(*) FROM enrollments')[0]
+        report('buffered', latencies, errors, elapsed, flushes['commits'],
+               f"  max wait {flushes['max_wait'] * 1000:.1f} ms  written {written}/{len(latencies)}")
+
+        # Admin inbox: kurs filtri bilan bitta sahifa va to'liq CSV eksport
+        sql, params = inbox_query('enrollments', course_id=7, limit=51)
+        start = time.perf_counter()
+        for _ in range(100):
+            database.query(sql, params)
+        print(f'inbox page (course filter, {written} rows): {(time.perf_counter() - start) * 10:.3f} ms')
+        sql, params = inbox_query('enrollments')
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in iter_csv(database.execute(sql, params), INBOX_KINDS['enrollments']))
+        print(f'csv export: {(time.perf_counter() - start) * 1000:.1f} ms, {size / 1024:.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""Telegram outbox retries against a fake Telegram API.
+
+Starts a ``ThreadingHTTPServer`` that answers ``sendMessage`` from a
+script (429 with ``retry_after``, then 5xx, then 200) and drives
+``TelegramOutbox`` against a scratch database, checking the row after
+every step:
+
+1. Retries: the 429 pauses the sender for ``retry_after`` seconds without
+   counting an attempt; each 5xx counts one and schedules the next try
+   ``backoff_base ** attempts`` seconds later; the 200 marks the row
+   ``sent``. Nothing is sent before it is due.
+2. Lease: a worker claims a row and dies before delivering it. Another
+   sender must not touch the row while the lease runs, and must deliver
+   it (once) after the lease expires.
+3. Give up: a 400 fails the row at once, 5xx until ``max_attempts`` fails
+   it after the last attempt.
+4. Background: ``enqueue()`` with the sender thread, through the same
+   429/5xx script, ends with the row delivered.
+
+Exits with 1 if any check fails.
+
+    python benchmarks/bench_outbox.py [--retry-after 1] [--backoff-base 1.5] [--lease 1]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import Database
+from migrations import migrate
+from outbox import TelegramOutbox
+
+# Vaqt tekshiruvlarida ruxsat etilgan farq (soniya)
+SLACK = 0.3
+
+
+class FakeTelegram(BaseHTTPRequestHandler):
+    script = []      # (status, body) - navbatdagi javoblar, tugasa 200
+    received = []    # (status, text) - kelgan har bir sendMessage
+    lock = threading.Lock()
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+        with self.lock:
+            status, body = self.script.pop(0) if self.script else (200, {'ok': True, 'result': {}})
+            FakeTelegram.received.append((status, form.get('text', [''])[0]))
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def rate_limited(retry_after):
+    return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                 'parameters': {'retry_after': retry_after}}
+
+
+def server_error(status=500):
+    return status, {'ok': False, 'error_code': status, 'description': 'Internal Server Error'}
+
+
+def bad_request():
+    return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'}
+
+
+def respond(*responses):
+    with FakeTelegram.lock:
+        FakeTelegram.script = list(responses)
+        FakeTelegram.received = []
+
+
+class Checks:
+    def __init__(self):
+        self.failures = 0
+
+    def __call__(self, ok, message):
+        print(f"  {'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            self.failures += 1
+
+
+def row_of(database, message_id):
+    return database.query_one('SELECT * FROM telegram_outbox WHERE id = ?', (message_id,))
+
+
+def add(database, outbox, text):
+    # enqueue() emas: sender thread ishga tushmaydi, qadamlarni o'zimiz yuritamiz
+    with database.transaction() as conn:
+        outbox.add(conn, text)
+        return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+
+def wait_until(moment):
+    time.sleep(max(0.0, moment - time.time()) + 0.01)
+
+
+def check_retries(database, outbox, args, check):
+    print('1. 429 -> 5xx -> 5xx -> 200')
+    respond(rate_limited(args.retry_after), server_error(500), server_error(502))
+    message_id = add(database, outbox, 'retries')
+
+    start = time.time()
+    outbox.process_due()
+    row = row_of(database, message_id)
+    check(row['status'] == 'pending' and row['attempts'] == 0 and row['last_error'] == 'rate limited',
+          f"429: pending, attempt not counted ({row['status']}, attempts {row['attempts']})")
+    check(abs(row['next_attempt_at'] - (start + args.retry_after)) < SLACK,
+          f"429: next try after retry_after ({row['next_attempt_at'] - start:.2f} s)")
+    check(outbox.process_due() == 0 and len(FakeTelegram.received) == 1, '429: sender paused')
+
+    for attempt, status in ((1, 500), (2, 502)):
+        wait_until(row['next_attempt_at'])
+        start = time.time()
+        outbox.process_due()
+        row = row_of(database, message_id)
+        delay = args.backoff_base ** attempt
+        check(row['status'] == 'pending' and row['attempts'] == attempt and f'HTTP {status}' in row['last_error'],
+              f"{status}: pending, attempts {row['attempts']}")
+        check(abs(row['next_attempt_at'] - (start + delay)) < SLACK,
+              f"{status}: backoff {row['next_attempt_at'] - start:.2f} s (expected {delay:.2f})")
+        check(outbox.process_due() == 0 and len(FakeTelegram.received) == attempt + 1,
+              f'{status}: nothing sent before the backoff ends')
+
+    wait_until(row['next_attempt_at'])
+    outbox.process_due()
+    row = row_of(database, message_id)
+    check(row['status'] == 'sent' and row['sent_at'] is not None and row['last_error'] is None,
+          f"200: sent ({row['status']}, last_error {row['last_error']!r})")
+    check([status for status, _ in FakeTelegram.received] == [429, 500, 502, 200],
+          f'server saw {[status for status, _ in FakeTelegram.received]}')
+
+
+def check_lease(database, outbox, args, check):
+    print('2. lease of a crashed worker')
+    respond()
+    message_id = add(database, outbox, 'lease')
+    crashed = TelegramOutbox(database, 'bench', 'chat', lease=args.lease)
+    claimed_at = time.time()
+    check([row['id'] for row in crashed.claim(claimed_at)] == [message_id], 'worker A claims the row')
+    row = row_of(database, message_id)
+    check(row['status'] == 'sending' and abs(row['next_attempt_at'] - (claimed_at + args.lease)) < SLACK,
+          f"row leased for {row['next_attempt_at'] - claimed_at:.2f} s")
+
+    # Worker A shu yerda "o'ldi": B lease tugamaguncha qatorga tegmaydi
+    check(outbox.process_due() == 0 and not FakeTelegram.received, 'worker B skips the leased row')
+    wait_until(row['next_attempt_at'])
+    check(outbox.process_due() == 1, 'worker B claims it after the lease expires')
+    row = row_of(database, message_id)
+    check(row['status'] == 'sent' and [text for _, text in FakeTelegram.received] == ['lease'],
+          f"delivered once ({row['status']}, {len(FakeTelegram.received)} request)")
+
+
+def check_give_up(database, outbox, args, check):
+    print('3. giving up')
+    respond(bad_request())
+    message_id = add(database, outbox, 'bad request')
+    outbox.process_due()
+    row = row_of(database, message_id)
+    check(row['status'] == 'failed' and 'HTTP 400' in row['last_error'],
+          f"400: failed at once ({row['status']}, attempts {row['attempts']})")
+
+    attempts = 3
+    limited = TelegramOutbox(database, 'bench', 'chat', api_url=outbox.api_url, max_attempts=attempts,
+                             backoff_base=0.1)
+    respond(*[server_error(503)] * attempts)
+    message_id = add(database, limited, 'max attempts')
+    for _ in range(attempts):
+        wait_until(row_of(database, message_id)['next_attempt_at'])
+        limited.process_due()
+    row = row_of(database, message_id)
+    check(row['status'] == 'failed' and row['attempts'] == attempts,
+          f"5xx x{attempts}: failed after max_attempts ({row['status']}, attempts {row['attempts']})")
+    wait_until(row['next_attempt_at'])
+    check(limited.process_due() == 0 and len(FakeTelegram.received) == attempts, 'failed row is not retried')
+
+
+def check_background(database, outbox, args, check):
+    print('4. background sender')
+    respond(rate_limited(args.retry_after), server_error(500))
+    outbox.enqueue('background')
+    message_id = database.query_one('SELECT MAX(id) FROM telegram_outbox')[0]
+    deadline = time.time() + args.retry_after + args.backoff_base + outbox.poll_interval + 5
+    while time.time() < deadline and row_of(database, message_id)['status'] != 'sent':
+        time.sleep(0.05)
+    outbox.stop()
+    row = row_of(database, message_id)
+    check(row['status'] == 'sent' and row['attempts'] == 1,
+          f"enqueue(): sent after 429 and one 5xx ({row['status']}, attempts {row['attempts']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--retry-after', type=int, default=1, help='429 javobidagi retry_after (soniya)')
+    parser.add_argument('--backoff-base', type=float, default=1.5)
+    parser.add_argument('--lease', type=float, default=1.0)
+    args = parser.parse_args()
+
+    upstream = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegram)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    check = Checks()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(os.path.join(directory, 'outbox.db'))
+        outbox = TelegramOutbox(database, 'bench', 'chat', api_url=f'http://127.0.0.1:{upstream.server_port}',
+                                backoff_base=args.backoff_base, lease=args.lease, poll_interval=0.5)
+        with database.transaction() as conn:
+            migrate(conn)
+        check_retries(database, outbox, args, check)
+        check_lease(database, outbox, args, check)
+        check_give_up(database, outbox, args, check)
+        check_background(database, outbox, args, check)
+    upstream.shutdown()
+
+    print(f'{check.failures} failed')
+    sys.exit(1 if check.failures else 0)
+
+
+if __name__ == '__main__':
+    main()
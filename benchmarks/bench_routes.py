@@ -0,0 +1,488 @@
+"""Route-level load benchmark over a synthetic course catalog.
+
+Seeds a scratch database through ``init_db()`` with ``--courses`` courses
+(10 .. 10,000, all three languages), then drives every public and admin
+route in main.py
+
+* through the Flask test client (in-process, sequential), and
+* through a local threaded HTTP server with ``--concurrency`` clients
+  (``--http``),
+
+and reports per route: throughput, p50/p95/p99 latency, SQL statements
+and ``get_translation()`` calls per request, and the process' peak RSS
+after the route ran. Requests rotate through uz/ru/en.
+
+Results are written as JSON; ``--compare`` diffs against an earlier run
+and exits 1 when a route got slower (p95 or throughput) by more than
+``--threshold`` and ``--min-delta-ms``, or issues more queries or
+translation lookups per request.
+
+    python benchmarks/bench_routes.py --courses 1000 --requests 200 --http --output after.json
+    python benchmarks/bench_routes.py --courses 1000 --compare before.json --threshold 0.15
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import logging
+import sqlite3
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLORS = ('from-islamic-green to-islamic-blue', 'from-islamic-gold to-orange-500',
+          'from-islamic-purple to-purple-600')
+CREATED_AT_START = datetime(2024, 1, 1)
+SEARCH_TERMS = ('kurs 42', "kurs", 'курс 7', 'course description', 'uchinchi', 'Course 9999')
+COURSE_FORM = {
+    'title_uz': 'Bench kurs', 'title_ru': 'Бенч курс', 'title_en': 'Bench course',
+    'description_uz': "Sinov uchun kurs tavsifi", 'description_ru': 'Описание тестового курса',
+    'description_en': 'Benchmark course description',
+    'duration_uz': '3 oy', 'duration_ru': '3 месяца', 'duration_en': '3 months',
+    'price_uz': "300,000 so'm", 'price_ru': '300,000 сум', 'price_en': '300,000 UZS',
+    'start_date_uz': '1 Fevral', 'start_date_ru': '1 Февраль', 'start_date_en': '1 February',
+    'features_uz': 'Birinchi, Ikkinchi, Uchinchi', 'features_ru': 'Первый, Второй, Третий',
+    'features_en': 'First, Second, Third', 'color': COLORS[0],
+}
+
+# Har bir so'rovdagi SQL va tarjima chaqiruvlari (thread bo'yicha)
+_counters = threading.local()
+
+
+def _count(name):
+    setattr(_counters, name, getattr(_counters, name, 0) + 1)
+
+
+def _reset_counters():
+    _counters.sql = 0
+    _counters.translations = 0
+
+
+def seed_courses(main, count, seed=1):
+    from courses import insert_course, encode_features
+    rng = random.Random(seed)
+    images = [row['image_path'] for row in main.db.query('SELECT image_path FROM courses')] or [None]
+    features = {'uz': ['Birinchi', 'Ikkinchi', 'Uchinchi'], 'ru': ['Первый', 'Второй', 'Третий'],
+                'en': ['First', 'Second', 'Third']}
+    with main.db.transaction() as conn:
+        conn.execute('DELETE FROM courses')
+        for i in range(count):
+            n = i + 1
+            translations = {
+                'uz': (f"Kurs {n}", f"{n}-kurs tavsifi. " * rng.randint(2, 8), f"{rng.randint(1, 12)} oy",
+                       f"{rng.randint(1, 20)}00,000 so'm", f"{rng.randint(1, 28)} Yanvar"),
+                'ru': (f"Курс {n}", f"Описание курса {n}. " * rng.randint(2, 8), f"{rng.randint(1, 12)} месяцев",
+                       f"{rng.randint(1, 20)}00,000 сум", f"{rng.randint(1, 28)} Январь"),
+                'en': (f"Course {n}", f"Course {n} description. " * rng.randint(2, 8), f"{rng.randint(1, 12)} months",
+                       f"{rng.randint(1, 20)}00,000 UZS", f"{rng.randint(1, 28)} January"),
+            }
+            insert_course(conn, {
+                lang: dict(zip(('title', 'description', 'duration', 'price', 'start_date'), values),
+                           features=encode_features(features[lang]))
+                for lang, values in translations.items()
+            }, rng.choice(images), rng.choice(COLORS),
+                created_at=(CREATED_AT_START + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'))
+    return [row['id'] for row in main.db.query('SELECT id FROM courses')]
+
+
+def load_app(db_path):
+    os.environ['DATABASE_PATH'] = db_path
+    # Benchmark paytida Telegram'ga hech narsa yuborilmaydi
+    os.environ['TELEGRAM_BOT_TOKEN'] = ''
+    # Hamma so'rov bitta IP'dan: limit faqat *_duplicate routelarida ishlasin
+    os.environ.setdefault('RATE_LIMIT_PER_IP', str(10 ** 9))
+    os.environ.setdefault('RATE_LIMIT_PER_PHONE', str(10 ** 9))
+    import main
+
+    original_connect = main.db.connect
+
+    def connect():
+        conn = original_connect()
+        conn.set_trace_callback(lambda sql: _count('sql'))
+        return conn
+
+    main.db.connect = connect
+
+    original_get_translation = main.get_translation
+
+    def get_translation(key, lang=None):
+        _count('translations')
+        return original_get_translation(key, lang)
+
+    main.get_translation = get_translation
+
+    from flask import request_started, request_finished
+
+    def started(sender, **extra):
+        _reset_counters()
+
+    def finished(sender, response, **extra):
+        response.headers['X-Bench-SQL'] = str(getattr(_counters, 'sql', 0))
+        response.headers['X-Bench-Translations'] = str(getattr(_counters, 'translations', 0))
+
+    request_started.connect(started, main.app, weak=False)
+    request_finished.connect(finished, main.app, weak=False)
+    return main
+
+
+class Route:
+    def __init__(self, name, method, path, data=None, admin=False, expect=(200,), headers=None, files=None):
+        self.name = name
+        self.method = method
+        self.path = path          # str yoki i -> str
+        self.data = data          # dict yoki i -> dict
+        self.admin = admin
+        self.expect = expect
+        self.headers = headers    # dict yoki i -> dict
+        self.files = files        # {maydon: (fayl nomi, baytlar)}
+
+    def request_args(self, i):
+        path = self.path(i) if callable(self.path) else self.path
+        data = self.data(i) if callable(self.data) else self.data
+        headers = self.headers(i) if callable(self.headers) else self.headers
+        return path, data, headers
+
+    def client_data(self, data):
+        # Test client fayllarni data ichida (oqim, nom) ko'rinishida oladi
+        if not self.files:
+            return data
+        return dict(data or {}, **{field: (io.BytesIO(body), filename)
+                                   for field, (filename, body) in self.files.items()})
+
+
+def import_file(main, count=20):
+    # Eksportning birinchi kurslari: import katalogni o'zgartirmaydi, lekin to'liq yo'ldan o'tadi
+    from bulk import export_courses
+    from i18n import LANGUAGES
+    lines = ''.join(export_courses(main.db, 'jsonl', LANGUAGES)).splitlines(keepends=True)
+    return {'file': ('courses.jsonl', ''.join(lines[:count]).encode('utf-8'))}
+
+
+def build_routes(main, course_ids):
+    from i18n import LANGUAGES
+    rng = random.Random(2)
+    added = []
+    asset = next((a.hashed for a in main.asset_manifest._by_logical.values()
+                  if a.logical.endswith('.css')), None)
+
+    def localized(path):
+        # Public sahifalar til prefiksi ostida, so'rovlar tillar bo'yicha aylanadi
+        return lambda i: f'/{LANGUAGES[i % len(LANGUAGES)]}' + (path(i) if callable(path) else path)
+
+    def course_path(i):
+        return f'/course/{rng.choice(course_ids)}'
+
+    def delete_path(i):
+        if not added:
+            added.extend(row['id'] for row in main.db.query(
+                "SELECT course_id AS id FROM course_translations WHERE lang = 'uz' AND title = ?",
+                (COURSE_FORM['title_uz'],)))
+        return f'/admin/course/delete/{added.pop() if added else 0}'
+
+    routes = [
+        Route('root', 'GET', '/', headers=lambda i: {'Accept-Language': f'{LANGUAGES[i % len(LANGUAGES)]};q=0.9'},
+              expect=(302,)),
+        Route('home', 'GET', localized('/')),
+        Route('about', 'GET', localized('/about')),
+        Route('contact', 'GET', localized('/contact')),
+        Route('enroll', 'GET', localized('/enroll')),
+        Route('online_courses', 'GET', localized('/online-courses')),
+        Route('course_detail', 'GET', localized(course_path)),
+        Route('search', 'GET', localized(lambda i: f'/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}')),
+        Route('search_suggest', 'GET',
+              localized(lambda i: f'/api/search/suggest?q={SEARCH_TERMS[i % len(SEARCH_TERMS)][:3]}')),
+        Route('legacy_redirect', 'GET', '/about', expect=(301,)),
+        Route('set_language', 'GET', lambda i: f'/set_language/{LANGUAGES[i % len(LANGUAGES)]}', expect=(302,)),
+        Route('contact_form', 'POST', localized('/contact-form'), lambda i: {
+            'name': 'Bench', 'phone': '+998901234567', 'subject': 'Savol', 'message': f'Salom {i} {rng.random()}'},
+              expect=(302,)),
+        Route('contact_form_duplicate', 'POST', localized('/contact-form'), {
+            'name': 'Bench', 'phone': '+998901234567', 'subject': 'Savol', 'message': 'Salom'}, expect=(302,)),
+        Route('enroll_post', 'POST', localized('/enroll'), lambda i: {
+            'full_name': 'Bench', 'phone': '+998901234567', 'email': 'bench@example.com',
+            'course_id': str(rng.choice(course_ids)), 'preferred_time': 'morning', 'message': f'{i} {rng.random()}'},
+              expect=(302,)),
+        Route('admin', 'GET', '/admin'),
+        Route('admin_login_post', 'POST', '/admin/login',
+              {'username': 'admin', 'password': 'admin123'}, expect=(302,)),
+        Route('admin_dashboard', 'GET', '/admin/dashboard', admin=True),
+        Route('admin_add_course', 'GET', '/admin/course/add', admin=True),
+        Route('admin_add_course_post', 'POST', '/admin/course/add', COURSE_FORM, admin=True, expect=(302,)),
+        Route('admin_edit_course', 'GET', lambda i: f'/admin/course/edit/{rng.choice(course_ids)}', admin=True),
+        Route('admin_edit_course_post', 'POST', lambda i: f'/admin/course/edit/{course_ids[0]}',
+              dict(COURSE_FORM, title_uz='Kurs 1'), admin=True, expect=(302,)),
+        Route('admin_delete_course', 'GET', delete_path, admin=True, expect=(302,)),
+        Route('admin_inbox', 'GET', lambda i: f'/admin/inbox?course_id={rng.choice(course_ids)}', admin=True),
+        Route('admin_inbox_export', 'GET', '/admin/inbox/export.csv', admin=True),
+        Route('admin_courses_export', 'GET', '/admin/courses/export?format=jsonl', admin=True),
+        Route('admin_courses_export_csv', 'GET', '/admin/courses/export?format=csv', admin=True),
+        Route('admin_courses_import', 'POST', '/admin/courses/import', admin=True, expect=(302,),
+              files=import_file(main)),
+        Route('admin_metrics', 'GET', '/admin/metrics', admin=True),
+        Route('admin_slow_queries', 'GET', '/admin/metrics/slow-queries', admin=True),
+        # Profil yozuvi avval yig'iladi, keyin uni ko'rsatadigan routelar o'lchanadi
+        Route('online_courses_profiled', 'GET', localized('/online-courses?_profile=1'), admin=True),
+        Route('admin_profiles', 'GET', '/admin/profiles?name=online_courses', admin=True),
+        Route('admin_profile_collapsed', 'GET', '/admin/profiles/online_courses.collapsed', admin=True),
+        Route('admin_profile_speedscope', 'GET', '/admin/profiles/online_courses.speedscope.json', admin=True),
+        Route('admin_profiles_clear', 'POST', '/admin/profiles/clear', admin=True, expect=(302,)),
+        Route('admin_logout', 'GET', '/admin/logout', admin=True, expect=(302,)),
+    ]
+    if asset is not None:
+        routes.append(Route('asset', 'GET', f'/assets/{asset}'))
+    api_list = f'/api/v1/courses?limit={main.Config.API_MAX_PAGE_SIZE}'
+    etags = {}
+
+    def api_if_none_match(i):
+        # ETag katalog o'zgargandagina qayta olinadi, qolgan so'rovlar mijoz keshi kabi
+        version = main.course_catalog.version
+        if etags.get('version') != version:
+            etags['version'] = version
+            etags['list'] = main.app.test_client().get(api_list).headers.get('ETag', '')
+        return {'If-None-Match': etags['list']}
+
+    routes += [
+        Route('api_courses', 'GET', lambda i: f'{api_list}&lang={LANGUAGES[i % len(LANGUAGES)]}'),
+        Route('api_courses_fields', 'GET', '/api/v1/courses?fields=id,title,price&limit=1000'),
+        Route('api_courses_304', 'GET', api_list, headers=api_if_none_match, expect=(304,)),
+        Route('api_course', 'GET', lambda i: f'/api/v1/courses/{rng.choice(course_ids)}?lang=ru'),
+    ]
+    cursor = main.course_catalog.page(LANGUAGES[0], None, main.Config.COURSES_PAGE_SIZE)[1]
+    if cursor is not None:
+        routes.append(Route('online_courses_more', 'GET', localized(f'/online-courses/more?cursor={cursor}')))
+        routes.append(Route('enroll_more', 'GET', localized(f'/enroll/more?cursor={cursor}')))
+    return routes
+
+
+def session_cookies(main):
+    # Public so'rovlar cookie'siz (til URL'da); admin uchun imzolangan sessiya cookie'si
+    serializer = main.app.session_interface.get_signing_serializer(main.app)
+    return [None], [serializer.dumps({'admin_logged_in': True, 'admin_username': 'admin'})]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, elapsed, sql, translations, errors):
+    latencies = sorted(latencies)
+    n = len(latencies)
+    return {
+        'requests': n,
+        'errors': errors,
+        'throughput_rps': round(n / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'sql_queries_per_request': round(sum(sql) / n, 2) if n else 0.0,
+        'translation_lookups_per_request': round(sum(translations) / n, 2) if n else 0.0,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_test_client(main, route, cookies, requests_count, warmup, cold):
+    client = main.app.test_client()
+    latencies, sql, translations = [], [], []
+    errors = 0
+    for i in range(-warmup, requests_count):
+        path, data, headers = route.request_args(i)
+        cookie = cookies[i % len(cookies)]
+        if cookie:
+            client.set_cookie('session', cookie)
+        else:
+            client.delete_cookie('session')
+        if cold:
+            main.page_cache.clear()
+        start = time.perf_counter()
+        response = client.open(path, method=route.method, data=route.client_data(data), headers=headers)
+        response.get_data()
+        took = time.perf_counter() - start
+        if i < 0:
+            continue
+        latencies.append(took)
+        sql.append(int(response.headers.get('X-Bench-SQL', 0)))
+        translations.append(int(response.headers.get('X-Bench-Translations', 0)))
+        if response.status_code not in route.expect:
+            errors += 1
+    return latencies, sql, translations, errors
+
+
+def run_http(main, route, cookies, requests_count, warmup, cold, base_url, concurrency):
+    import requests
+
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, data, headers = route.request_args(i)
+        if cold:
+            main.page_cache.clear()
+        start = time.perf_counter()
+        try:
+            response = session.request(route.method, base_url + path, data=data, headers=headers, files=route.files,
+                                       cookies={'session': cookies[i % len(cookies)]} if cookies[i % len(cookies)] else None,
+                                       allow_redirects=False, timeout=30)
+            response.content
+        except requests.RequestException:
+            return time.perf_counter() - start, 0, 0, False
+        finally:
+            session.cookies.clear()
+        took = time.perf_counter() - start
+        return (took, int(response.headers.get('X-Bench-SQL', 0)),
+                int(response.headers.get('X-Bench-Translations', 0)),
+                response.status_code in route.expect)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(-warmup, 0)))
+        start = time.perf_counter()
+        results = list(pool.map(one, range(requests_count)))
+        elapsed = time.perf_counter() - start
+    return ([r[0] for r in results], [r[1] for r in results], [r[2] for r in results],
+            sum(1 for r in results if not r[3]), elapsed)
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    regressions = []
+    print(f"\n{'mode/route':<38}{'p95 ms':>20}{'rps':>22}{'sql/req':>14}")
+    for mode, routes in current['results'].items():
+        for name, now in routes.items():
+            before = baseline.get('results', {}).get(mode, {}).get(name)
+            if before is None:
+                continue
+            row = f"{mode + '/' + name:<38}" \
+                  f"{before['p95_ms']:>9.2f} -> {now['p95_ms']:<8.2f}" \
+                  f"{before['throughput_rps']:>10.0f} -> {now['throughput_rps']:<8.0f}" \
+                  f"{before['sql_queries_per_request']:>5.1f} -> {now['sql_queries_per_request']:<5.1f}"
+            reasons = []
+            # Kichik (shovqin darajasidagi) farqlar hisobga olinmaydi
+            if (now['p95_ms'] > before['p95_ms'] * (1 + threshold)
+                    and now['p95_ms'] - before['p95_ms'] > min_delta_ms):
+                reasons.append('p95')
+            if (now['throughput_rps'] < before['throughput_rps'] * (1 - threshold)
+                    and 1000 / max(now['throughput_rps'], 1e-9) - 1000 / max(before['throughput_rps'], 1e-9) > min_delta_ms):
+                reasons.append('throughput')
+            if now['sql_queries_per_request'] > before['sql_queries_per_request']:
+                reasons.append('sql')
+            if now['translation_lookups_per_request'] > before['translation_lookups_per_request']:
+                reasons.append('translations')
+            if reasons:
+                regressions.append((mode, name, reasons))
+                row += '  REGRESSION: ' + ', '.join(reasons)
+            print(row)
+    return regressions
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--courses', type=int, default=500, help='10 .. 10000')
+    parser.add_argument('--requests', type=int, default=200, help='so\'rovlar soni (har bir route uchun)')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--http', action='store_true', help='mahalliy HTTP server orqali ham o\'lchash')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--cold', action='store_true', help='har so\'rovdan oldin sahifa keshini tozalash')
+    parser.add_argument('--routes', help='vergul bilan ajratilgan route nomlari')
+    parser.add_argument('--output', help='natijani JSON faylga yozish')
+    parser.add_argument('--compare', help='avvalgi JSON natija bilan solishtirish')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='bundan kichik farqlar regressiya hisoblanmaydi')
+    args = parser.parse_args()
+    if not 10 <= args.courses <= 10000:
+        parser.error('--courses must be between 10 and 10000')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main = load_app(os.path.join(tmp, 'bench.db'))
+        main.init_db()
+        course_ids = seed_courses(main, args.courses)
+        main.course_catalog.rebuild()
+        main.page_cache.clear()
+
+        routes = build_routes(main, course_ids)
+        if args.routes:
+            wanted = set(args.routes.split(','))
+            routes = [r for r in routes if r.name in wanted]
+        public_cookies, admin_cookies = session_cookies(main)
+
+        results = {'test_client': {}}
+        for route in routes:
+            cookies = admin_cookies if route.admin else public_cookies
+            start = time.perf_counter()
+            latencies, sql, translations, errors = run_test_client(
+                main, route, cookies, args.requests, args.warmup, args.cold)
+            elapsed = sum(latencies) or (time.perf_counter() - start)
+            results['test_client'][route.name] = summarize(latencies, elapsed, sql, translations, errors)
+
+        if args.http:
+            server, base_url = start_server(main.app)
+            results['http'] = {}
+            try:
+                for route in routes:
+                    cookies = admin_cookies if route.admin else public_cookies
+                    latencies, sql, translations, errors, elapsed = run_http(
+                        main, route, cookies, args.requests, args.warmup, args.cold, base_url, args.concurrency)
+                    results['http'][route.name] = summarize(latencies, elapsed, sql, translations, errors)
+            finally:
+                server.shutdown()
+        main.db.close()
+
+    report = {
+        'meta': {
+            'courses': args.courses,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'cold': args.cold,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+    for mode, routes_ in results.items():
+        print(f"\n[{mode}] {args.courses} courses, {args.requests} requests/route")
+        print(f"{'route':<26}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'sql':>7}{'i18n':>7}{'rss MB':>9}{'err':>5}")
+        for name, r in routes_.items():
+            print(f"{name:<26}{r['throughput_rps']:>10.0f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                  f"{r['sql_queries_per_request']:>7.1f}{r['translation_lookups_per_request']:>7.1f}"
+                  f"{r['peak_rss_kb'] / 1024:>9.1f}{r['errors']:>5}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        print(f"\n{len(regressions)} regression(s) (threshold {args.threshold:.0%})")
+        exit_code = 1 if regressions else 0
+    if any(r['errors'] for routes_ in results.values() for r in routes_.values()):
+        exit_code = 1
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main_()
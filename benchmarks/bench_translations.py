@@ -0,0 +1,58 @@
+"""Micro-benchmark: translation lookups per second.
+
+"before" re-reads every translations/*.json file on each lookup (the old
+get_translation), "after" goes through the in-memory catalog and the
+per-request dict.
+
+    python benchmarks/bench_translations.py [--lookups 20000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from i18n import TRANSLATIONS_DIR, LANGUAGES  # noqa: E402
+import main  # noqa: E402
+
+
+def legacy_get_translation(key, lang='uz'):
+    translations = {}
+    for language in LANGUAGES:
+        try:
+            with open(os.path.join(TRANSLATIONS_DIR, f'{language}.json'), 'r', encoding='utf-8') as f:
+                translations[language] = json.load(f)
+        except FileNotFoundError:
+            translations[language] = {}
+    return translations.get(lang, {}).get(key, key)
+
+
+def run(fn, keys, lookups):
+    start = time.perf_counter()
+    for i in range(lookups):
+        fn(keys[i % len(keys)])
+    elapsed = time.perf_counter() - start
+    return lookups / elapsed
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lookups', type=int, default=20000)
+    args = parser.parse_args()
+
+    keys = list(main.catalog.get('uz').keys())
+
+    # Eski usul juda sekin, shuning uchun kamroq chaqiruv yetarli
+    before = run(legacy_get_translation, keys, max(args.lookups // 50, 100))
+    with main.app.test_request_context('/'):
+        after = run(main.get_translation, keys, args.lookups)
+
+    print(f'before: {before:>12,.0f} lookups/s')
+    print(f'after:  {after:>12,.0f} lookups/s')
+    print(f'speedup: {after / before:,.0f}x')
+
+
+if __name__ == '__main__':
+    main_()
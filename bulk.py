@@ -0,0 +1,257 @@
+import csv
+import json
+import itertools
+from datetime import datetime
+from io import StringIO
+
+from courses import (TRANSLATED_FIELDS, UPSERT_TRANSLATION_SQL, translations_from_form, translation_params,
+                     decode_features)
+
+FORMATS = ('jsonl', 'csv')
+COURSE_COLUMNS = ('id', 'image_path', 'color', 'created_at')
+_TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+# Yangi kurs (?4 bo'sh bo'lsa hozirgi vaqt); mavjud kursda bo'sh maydonlar o'zgarmaydi
+UPSERT_COURSE_SQL = '''
+    INSERT INTO courses (id, image_path, color, created_at) VALUES (?1, ?2, ?3, COALESCE(?4, CURRENT_TIMESTAMP))
+    ON CONFLICT (id) DO UPDATE SET
+        image_path = COALESCE(?2, image_path),
+        color = COALESCE(?3, color),
+        created_at = COALESCE(?4, created_at)
+'''
+
+
+def record_columns(languages):
+    """Flat record keys: course columns, then ``<field>_<lang>`` for each language."""
+    return COURSE_COLUMNS + tuple(f'{name}_{lang}' for lang in languages for name in TRANSLATED_FIELDS)
+
+
+class ImportResult:
+    __slots__ = ('added', 'updated', 'errors', 'course_ids')
+
+    def __init__(self, added=0, updated=0, errors=(), course_ids=()):
+        self.added = added
+        self.updated = updated
+        self.errors = list(errors)  # (qator raqami, xabar)
+        self.course_ids = list(course_ids)  # qo'shilgan/yangilangan kurslar, birinchi uchragan tartibda
+
+
+class _Rollback(Exception):
+    pass
+
+
+# --- o'qish ---
+
+def read_records(stream, fmt):
+    """``(line number, record)`` pairs from a text stream.
+
+    Records are flat dicts as in the admin course form (``title_uz``,
+    ``features_ru``...); a line that cannot be parsed yields its error
+    instead of a dict.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f'Invalid JSON: {e}')
+
+
+def _text(value):
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+
+def _timestamp(value):
+    value = _text(value)
+    if value is None:
+        return None
+    for fmt in _TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+    raise ValueError(f'Invalid created_at: {value!r}')
+
+
+def _course_id(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or not str(value).strip().isdigit() or int(value) <= 0:
+        raise ValueError(f'Invalid id: {value!r}')
+    return int(value)
+
+
+def parse_record(record, languages, default_lang):
+    """``(id or None, image_path, color, created_at, translations)``; raises ``ValueError``."""
+    if not isinstance(record, dict):
+        raise ValueError('A record must be an object')
+    return (_course_id(record.get('id')), _text(record.get('image_path')), _text(record.get('color')),
+            _timestamp(record.get('created_at')), translations_from_form(record, languages, default_lang))
+
+
+# --- import ---
+
+def import_courses(db, records, languages, default_lang, search=None, chunk_size=1000, max_errors=50):
+    """Upsert ``(line number, record)`` pairs by ``id`` in one transaction.
+
+    Records without an id become new courses. Their ids are assigned the
+    way AUTOINCREMENT would assign them one by one, so every write can go
+    through ``executemany`` in chunks of ``chunk_size`` records. An
+    existing course keeps its image, color and date when the record
+    leaves them empty; its translations are replaced by the record's.
+    If any record is invalid nothing is written and the first
+    ``max_errors`` problems are returned; otherwise ``course_ids`` lists
+    every course the import added or updated.
+
+    Keeping the ``search`` index in sync through its triggers costs 2-7
+    times more per record (updates the most) than rebuilding it per course
+    of the catalog, so once the import reaches a quarter of the existing
+    catalog the triggers are dropped and the index is rebuilt before
+    commit.
+    """
+    result = ImportResult()
+    try:
+        with db.transaction() as conn:
+            before = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0]
+            next_id = conn.execute('''
+                SELECT max(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'courses'), 0),
+                           COALESCE((SELECT MAX(id) FROM courses), 0)) + 1
+            ''').fetchone()[0]
+            total = 0
+            rebuild = False
+            chunk = {}  # course_id -> (row, translations, existing bo'lishi mumkinmi)
+            touched = {}  # dict: takrorlarsiz, tartib saqlanadi
+
+            for number, record in records:
+                try:
+                    if isinstance(record, Exception):
+                        raise record
+                    course_id, image_path, color, created_at, translations = parse_record(
+                        record, languages, default_lang)
+                except ValueError as e:
+                    result.errors.append((number, str(e)))
+                    if len(result.errors) >= max_errors:
+                        break
+                    continue
+                if result.errors:
+                    # Xato topilgan: qolganlari faqat tekshiriladi
+                    continue
+
+                explicit = course_id is not None
+                if explicit:
+                    next_id = max(next_id, course_id + 1)
+                else:
+                    course_id, next_id = next_id, next_id + 1
+                # Bitta bo'lakda bir kurs ikki marta bo'lsa tartib saqlanishi uchun
+                if course_id in chunk or len(chunk) >= chunk_size:
+                    if search is not None and not rebuild and total * 4 >= before:
+                        search.drop_triggers(conn)
+                        rebuild = True
+                    _write_chunk(conn, chunk, languages)
+                    chunk = {}
+                chunk[course_id] = ((course_id, image_path, color, created_at), translations, explicit)
+                touched[course_id] = None
+                total += 1
+
+            if result.errors:
+                raise _Rollback()
+            if search is not None and not rebuild and total >= max(before // 4, chunk_size):
+                search.drop_triggers(conn)
+                rebuild = True
+            _write_chunk(conn, chunk, languages)
+            if rebuild:
+                search.rebuild(conn)
+                search.create_schema(conn)
+            result.added = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0] - before
+            result.updated = total - result.added
+            result.course_ids = list(touched)
+    except _Rollback:
+        pass
+    return result
+
+
+def _write_chunk(conn, chunk, languages):
+    if not chunk:
+        return
+    conn.executemany(UPSERT_COURSE_SQL, [row for row, _, _ in chunk.values()])
+    # Yozuvda yo'q tillar mavjud kursdan o'chiriladi (admin formasi kabi)
+    stale = [(course_id, lang) for course_id, (_, translations, explicit) in chunk.items() if explicit
+             for lang in languages if lang not in translations]
+    if stale:
+        conn.executemany('DELETE FROM course_translations WHERE course_id = ? AND lang = ?', stale)
+    conn.executemany(UPSERT_TRANSLATION_SQL, [params for course_id, (_, translations, _) in chunk.items()
+                                              for params in translation_params(course_id, translations)])
+
+
+# --- eksport ---
+
+def export_records(cursor, languages, features_as_list=True):
+    """Flat records, one per course, from a cursor over the export query.
+
+    Rows are read lazily and grouped per course, so memory use does not
+    depend on the catalog size.
+    """
+    rows = iter(lambda: cursor.fetchmany(500), [])
+    for course_id, group in itertools.groupby(itertools.chain.from_iterable(rows), key=lambda row: row['id']):
+        record = None
+        for row in group:
+            if record is None:
+                record = {name: row[name] for name in COURSE_COLUMNS}
+            lang = row['lang']
+            if lang not in languages:
+                continue
+            for name in TRANSLATED_FIELDS:
+                value = row[name]
+                if name == 'features':
+                    items = decode_features(value)
+                    value = list(items) if features_as_list else ', '.join(items)
+                record[f'{name}_{lang}'] = value
+        yield record
+
+
+EXPORT_SQL = '''
+    SELECT c.id, c.image_path, c.color, c.created_at, t.lang, {fields}
+    FROM courses c LEFT JOIN course_translations t ON t.course_id = c.id
+    ORDER BY c.id, t.lang
+'''.format(fields=', '.join(f't.{name}' for name in TRANSLATED_FIELDS))
+
+
+def export_courses(db, fmt, languages, chunk_records=500):
+    """Text chunks of the whole catalog as JSON Lines or CSV (with a BOM, for Excel)."""
+    cursor = db.execute(EXPORT_SQL)
+    try:
+        if fmt == 'csv':
+            buffer = StringIO()
+            writer = csv.DictWriter(buffer, record_columns(languages))
+            buffer.write('\ufeff')
+            writer.writeheader()
+            for batch in _batched(export_records(cursor, languages, features_as_list=False), chunk_records):
+                writer.writerows(batch)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for batch in _batched(export_records(cursor, languages), chunk_records):
+                # Bo'sh maydonlar yozilmaydi
+                yield ''.join(json.dumps({k: v for k, v in record.items() if v not in (None, [])},
+                                         ensure_ascii=False) + '\n' for record in batch)
+    finally:
+        cursor.close()
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -7,6 +7,8 @@ load_dotenv()
 class Config:
     # Database Configuration - SQLite
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'muhib_academy.db')
+    DATABASE_BUSY_TIMEOUT_MS = int(os.getenv('DATABASE_BUSY_TIMEOUT_MS', '5000'))
+    DATABASE_MMAP_SIZE = int(os.getenv('DATABASE_MMAP_SIZE', str(64 * 1024 * 1024)))
     
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'muhib-academy-secret-key-2024')
@@ -15,6 +17,62 @@ class Config:
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', 'YOUR_BOT_TOKEN_HERE')
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', 'YOUR_CHAT_ID_HERE')
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+    TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', '3.05'))
+    TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', '10'))
+    TELEGRAM_MAX_ATTEMPTS = int(os.getenv('TELEGRAM_MAX_ATTEMPTS', '8'))
+    # 1 dan katta bo'lsa, navbatdagi xabarlar bitta sendMessage'da birlashtiriladi
+    TELEGRAM_BATCH_SIZE = int(os.getenv('TELEGRAM_BATCH_SIZE', '1'))
+    
+    # Arizalar va aloqa xabarlari guruhlab yoziladi: eng eski qator shuncha soniyadan ko'p kutmaydi
+    LEAD_FLUSH_DELAY = float(os.getenv('LEAD_FLUSH_DELAY', '0.2'))
+    LEAD_BATCH_SIZE = int(os.getenv('LEAD_BATCH_SIZE', '500'))
+    LEAD_MAX_PENDING = int(os.getenv('LEAD_MAX_PENDING', '10000'))
+    
+    # Public formalar (aloqa, ro'yxatdan o'tish): IP va telefon bo'yicha PERIOD soniyada nechta
+    RATE_LIMIT_PER_IP = int(os.getenv('RATE_LIMIT_PER_IP', '10'))
+    RATE_LIMIT_PER_PHONE = int(os.getenv('RATE_LIMIT_PER_PHONE', '5'))
+    RATE_LIMIT_PERIOD = float(os.getenv('RATE_LIMIT_PERIOD', '600'))
+    # Bir xil forma shu soniya ichida qayta yuborilsa saqlanmaydi
+    DUPLICATE_WINDOW = float(os.getenv('DUPLICATE_WINDOW', '300'))
+    # Berilsa, limitlar shu SQLite faylida barcha workerlar uchun umumiy bo'ladi
+    RATE_LIMIT_DATABASE = os.getenv('RATE_LIMIT_DATABASE', '')
+    # nginx kabi proxy'lar soni: mijoz IP'si, sxema va host X-Forwarded-* dan olinadi
+    TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+    
+    # asgi.py: har bir uvicorn workerida view'larni bajaradigan threadlar soni
+    ASGI_THREADS = int(os.getenv('ASGI_THREADS', '4'))
+    
+    # Sahifa keshi (public sahifalar uchun)
+    PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '512'))
+    PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    # Cookie'siz public javoblar: brauzer (max-age) va nginx/CDN (s-maxage) keshi, soniya
+    # (proxy sessiya cookie'si bor so'rovlarni keshdan o'tkazib yuborishi kerak: flash xabarlar)
+    PUBLIC_MAX_AGE = int(os.getenv('PUBLIC_MAX_AGE', '0'))
+    PUBLIC_SHARED_MAX_AGE = int(os.getenv('PUBLIC_SHARED_MAX_AGE', '300'))
+    
+    # flask freeze natijasi (nginx shu papkadan beradi); berilsa admin o'zgarishlari
+    # tegishli sahifalarni qayta yozadi. SITE_URL - hreflang havolalari uchun
+    FREEZE_DIR = os.getenv('FREEZE_DIR', '')
+    SITE_URL = os.getenv('SITE_URL', 'http://localhost')
+    
+    # Ro'yxatlarda bir sahifadagi kurslar soni
+    COURSES_PAGE_SIZE = int(os.getenv('COURSES_PAGE_SIZE', '12'))
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', '50'))
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '5000'))
+    
+    # Shundan sekin SQL so'rovlar EXPLAIN QUERY PLAN bilan logga yoziladi
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+    
+    # So'rovlarning shu ulushi profillanadi (0 - faqat admin ?_profile=1 / X-Profile bilan);
+    # namunalar orasidagi vaqt, ms
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '1'))
+    
+    # CSS/JS yig'ish (flask build-assets)
+    TAILWINDCSS_BIN = os.getenv('TAILWINDCSS_BIN', 'tailwindcss')
+    ASSET_CACHE_DIR = os.getenv('ASSET_CACHE_DIR', '.asset-cache')
     
     # Database URL
     @property
@@ -0,0 +1,279 @@
+import json
+import base64
+import binascii
+import itertools
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+
+# Har bir til uchun course_translations jadvalida saqlanadigan maydonlar
+TRANSLATED_FIELDS = ('title', 'description', 'duration', 'price', 'start_date', 'features')
+# Standart tilda bo'lishi shart bo'lgan maydonlar
+REQUIRED_FIELDS = ('title', 'description', 'duration', 'price', 'start_date')
+# catalog_version: courses/course_translations'dagi har bir o'zgarishda trigger'lar oshiradi
+CATALOG_VERSION_SQL = 'SELECT version FROM catalog_version WHERE id = 1'
+
+
+def encode_cursor(created_at, course_id):
+    raw = json.dumps([created_at or '', course_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, course_id = json.loads(raw)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(created_at, str) or not isinstance(course_id, int):
+        return None
+    return created_at, course_id
+
+
+def sort_key(created_at, course_id):
+    return (created_at or '', course_id)
+
+
+def split_features(text):
+    # JSON Lines importida xususiyatlar tayyor ro'yxat bo'lib keladi
+    items = text if isinstance(text, (list, tuple)) else (text or '').split(',')
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def encode_features(items):
+    return json.dumps(list(items), ensure_ascii=False) if items else None
+
+
+def decode_features(value):
+    return tuple(json.loads(value)) if value else ()
+
+
+def _form_value(value):
+    if isinstance(value, (list, tuple)):
+        return value or None
+    return str(value if value is not None else '').strip() or None
+
+
+def translations_from_form(form, languages, default_lang):
+    """``{lang: {field: value}}`` from ``<field>_<lang>`` form fields.
+
+    Languages left completely empty are omitted; a missing required
+    field of the default language raises ``ValueError``. Features may be
+    a comma-separated string or a list.
+    """
+    translations = {}
+    for lang in languages:
+        values = {name: _form_value(form.get(f'{name}_{lang}')) for name in TRANSLATED_FIELDS}
+        values['features'] = encode_features(split_features(values['features']))
+        if lang == default_lang:
+            missing = [name for name in REQUIRED_FIELDS if not values[name]]
+            if missing:
+                raise ValueError(f"Required fields missing for {lang}: {', '.join(missing)}")
+        elif not any(values.values()):
+            continue
+        translations[lang] = values
+    return translations
+
+
+# (course_id, lang, *TRANSLATED_FIELDS) parametrlari bilan
+UPSERT_TRANSLATION_SQL = f'''
+    INSERT INTO course_translations (course_id, lang, {', '.join(TRANSLATED_FIELDS)})
+    VALUES (?, ?, {', '.join('?' for _ in TRANSLATED_FIELDS)})
+    ON CONFLICT (course_id, lang) DO UPDATE SET {', '.join(f'{name} = excluded.{name}' for name in TRANSLATED_FIELDS)}
+'''
+
+
+def translation_params(course_id, translations):
+    return [(course_id, lang, *(values[name] for name in TRANSLATED_FIELDS)) for lang, values in translations.items()]
+
+
+def save_translations(conn, course_id, translations):
+    # Formada bo'sh qolgan tillarning qatorlari o'chiriladi
+    placeholders = ', '.join('?' for _ in translations)
+    conn.execute(f'DELETE FROM course_translations WHERE course_id = ? AND lang NOT IN ({placeholders})',
+                 (course_id, *translations))
+    conn.executemany(UPSERT_TRANSLATION_SQL, translation_params(course_id, translations))
+
+
+def insert_course(conn, translations, image_path, color, created_at=None):
+    if created_at is None:
+        cursor = conn.execute('INSERT INTO courses (image_path, color) VALUES (?, ?)', (image_path, color))
+    else:
+        cursor = conn.execute('INSERT INTO courses (image_path, color, created_at) VALUES (?, ?, ?)',
+                              (image_path, color, created_at))
+    save_translations(conn, cursor.lastrowid, translations)
+    return cursor.lastrowid
+
+
+def form_rows(db, rows):
+    """Course rows as flat dicts with ``<field>_<lang>`` keys, for admin forms."""
+    courses = {row['id']: dict(row) for row in rows}
+    if not courses:
+        return []
+    placeholders = ', '.join('?' for _ in courses)
+    for t in db.query(f'SELECT * FROM course_translations WHERE course_id IN ({placeholders})', tuple(courses)):
+        course = courses[t['course_id']]
+        for name in TRANSLATED_FIELDS:
+            course[f"{name}_{t['lang']}"] = t[name]
+        course[f"features_{t['lang']}"] = ', '.join(decode_features(t['features']))
+    return list(courses.values())
+
+
+class Course:
+    """One course projected into a single language."""
+
+    __slots__ = ('id', 'title', 'description', 'duration', 'price', 'start_date',
+                 '_features', 'image_path', 'image_url', 'color', 'created_at')
+
+    def __init__(self, id, title, description, duration, price, start_date,
+                 features, image_path, color, created_at):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.duration = duration
+        self.price = price
+        self.start_date = start_date
+        self._features = features
+        self.image_path = image_path
+        self.image_url = f'/{image_path}' if image_path else None
+        self.color = color
+        self.created_at = created_at
+
+    @classmethod
+    def from_row(cls, row, translation, default=None):
+        def field(name):
+            # Tarjima bo'lmasa standart tildagi qiymat ishlatiladi
+            value = translation[name] if translation is not None else None
+            if not value and default is not None:
+                value = default[name]
+            return value
+
+        return cls(
+            id=row['id'],
+            title=field('title'),
+            description=field('description'),
+            duration=field('duration'),
+            price=field('price'),
+            start_date=field('start_date'),
+            features=field('features'),
+            image_path=row['image_path'],
+            color=row['color'],
+            created_at=row['created_at'],
+        )
+
+    @property
+    def features(self):
+        # JSON faqat birinchi murojaatda o'qiladi: rebuild() minglab kursni qayta quradi
+        features = self._features
+        if features is None or isinstance(features, str):
+            features = self._features = decode_features(features)
+        return features
+
+
+class CourseCatalog:
+    """In-memory read model of courses and their translations.
+
+    Courses are read once and kept as per-language lists (newest first)
+    plus an id index, so public views never query SQLite. Admin writes
+    call ``rebuild()`` once they have committed. ``page()`` slices the
+    lists by a ``(created_at, id)`` keyset cursor.
+
+    ``version`` is the database's ``catalog_version`` counter as read
+    before the build, so every worker reports the same value for the same
+    data and it can key HTTP validators. ``refresh()`` compares it with
+    the stored counter (one single-row read) and drops the model when
+    another process has changed the courses; the next use rebuilds it.
+    """
+
+    def __init__(self, db, languages, default_lang):
+        self.db = db
+        self.languages = list(languages)
+        self.default_lang = default_lang
+        self._state = None
+        self._lock = threading.Lock()
+
+    def stored_version(self):
+        return self.db.query_one(CATALOG_VERSION_SQL)[0]
+
+    def _build(self):
+        # Versiya ma'lumotdan oldin o'qiladi: oraliqdagi o'zgarishni keyingi refresh() ko'radi
+        version = self.stored_version()
+        # Bitta o'tishda: har kursning tarjimalari (course_id, lang) PRIMARY KEY
+        # bo'yicha ketma-ket o'qiladi, keyin til bo'yicha ajratiladi
+        rows = self.db.query('''
+            SELECT c.id, c.image_path, c.color, c.created_at, t.*
+            FROM courses c
+            LEFT JOIN course_translations t ON t.course_id = c.id
+            ORDER BY c.created_at DESC, c.id DESC
+        ''')
+        lists = {lang: [] for lang in self.languages}
+        keys = []
+        for _, group in itertools.groupby(rows, key=itemgetter(0)):
+            translations = {row['lang']: row for row in group}
+            row = next(iter(translations.values()))
+            default = translations.get(self.default_lang)
+            for lang in self.languages:
+                lists[lang].append(Course.from_row(row, translations.get(lang), default))
+            keys.append(sort_key(row['created_at'], row['id']))
+        by_id = {lang: {course.id: course for course in courses} for lang, courses in lists.items()}
+        # Kalitlar o'sish tartibida: bisect shu ro'yxatda ishlaydi
+        keys.reverse()
+        return lists, by_id, keys, version
+
+    def _ensure(self):
+        state = self._state
+        if state is None:
+            with self._lock:
+                state = self._state
+                if state is None:
+                    state = self._build()
+                    self._state = state
+        return state
+
+    @property
+    def version(self):
+        return self._ensure()[3]
+
+    def _lang(self, lang):
+        return lang if lang in self.languages else self.default_lang
+
+    def all(self, lang):
+        return self._ensure()[0][self._lang(lang)]
+
+    def get(self, lang, course_id):
+        return self._ensure()[1][self._lang(lang)].get(course_id)
+
+    def page(self, lang, after=None, limit=12):
+        """Up to ``limit`` courses after the ``(created_at, id)`` key ``after``.
+
+        Returns ``(courses, next_cursor)``; ``next_cursor`` is None on the
+        last page.
+        """
+        lists, _, keys, _ = self._ensure()
+        courses = lists[self._lang(lang)]
+        start = 0 if after is None else len(keys) - bisect_left(keys, sort_key(*after))
+        chunk = courses[start:start + limit]
+        if start + limit >= len(courses) or not chunk:
+            return chunk, None
+        last = chunk[-1]
+        return chunk, encode_cursor(last.created_at, last.id)
+
+    def rebuild(self):
+        with self._lock:
+            self._state = self._build()
+
+    def refresh(self):
+        """Drop the model if the stored version moved; True if it did."""
+        state = self._state
+        if state is None or self.stored_version() == state[3]:
+            return False
+        with self._lock:
+            if self._state is state:
+                self._state = None
+        return True
+
+
+def bump_catalog_version(conn):
+    # Kurs qatorlari o'zgarmagan, lekin sahifalari o'zgargan bo'lsa (masalan, rasm derivativlari)
+    conn.execute('UPDATE catalog_version SET version = version + 1 WHERE id = 1')
@@ -0,0 +1,117 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class TimedConnection(sqlite3.Connection):
+    # Har bir execute vaqti on_query(conn, sql, params, seconds) ga beriladi
+    on_query = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.on_query(self, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.on_query(self, sql, (), time.perf_counter() - start)
+
+
+class Database:
+    """Per-thread, tuned SQLite connections.
+
+    Each thread (gunicorn worker thread or dev server thread) keeps one
+    connection with WAL, ``synchronous=NORMAL``, mmap and a busy timeout
+    applied once. ``cached_statements`` keeps prepared statements around,
+    so repeated queries skip the SQL compile step. Connections are
+    re-opened after a fork. With ``on_query`` set, every ``execute`` is
+    timed and reported to it.
+    """
+
+    def __init__(self, path, busy_timeout_ms=5000, mmap_size=64 * 1024 * 1024, cached_statements=256,
+                 on_query=None):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.on_query = on_query
+        self._local = threading.local()
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection if self.on_query else sqlite3.Connection,
+        )
+        if self.on_query:
+            conn.on_query = self.on_query
+        conn.row_factory = sqlite3.Row  # Bu dict-like access uchun
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self.connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def query(self, sql, params=()):
+        return self._fetch(sql, params, sqlite3.Cursor.fetchall)
+
+    def query_one(self, sql, params=()):
+        return self._fetch(sql, params, sqlite3.Cursor.fetchone)
+
+    def _fetch(self, sql, params, fetch):
+        if not self.on_query:
+            return fetch(self.execute(sql, params))
+        # SELECT'ning asosiy ishi fetch paytida bo'ladi: ikkalasi birga o'lchanadi
+        conn = self.connection()
+        start = time.perf_counter()
+        try:
+            return fetch(sqlite3.Connection.execute(conn, sql, params))
+        finally:
+            self.on_query(conn, sql, params, time.perf_counter() - start)
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE: yozish qulfi boshida olinadi, shuning uchun
+        # o'quvchidan yozuvchiga o'tishda "database is locked" bo'lmaydi
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            if self._local.pid == os.getpid():
+                conn.close()
+            self._local.conn = None
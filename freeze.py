@@ -0,0 +1,155 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import url_for
+
+from compression import supported_encodings, compress
+
+# nginx (sessiya cookie'si - flash xabarlar - yoki query string bo'lsa Flask'ga o'tkaziladi:
+# statik fayl ?cursor= ni bilmaydi va sahifalangan ro'yxat o'rniga birinchi sahifani beradi):
+#   location / {
+#       if ($cookie_session) { return 418; }
+#       if ($args) { return 418; }
+#       error_page 418 = @flask;
+#       gzip_static on; brotli_static on;
+#       try_files $uri/index.html @flask;
+#   }
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+# Kurslarga bog'liq bo'lmagan sahifalar faqat to'liq freeze'da yoziladi
+STATIC_ENDPOINTS = ('home', 'about', 'contact')
+# Kurs qo'shilganda/o'zgarganda/o'chirilganda qayta yoziladigan ro'yxatlar
+LISTING_ENDPOINTS = ('online_courses', 'enroll')
+
+
+def output_file(output_dir, url_path):
+    # /uz/ -> uz/index.html, /ru/course/5 -> ru/course/5/index.html (nginx: try_files $uri/index.html)
+    return os.path.join(output_dir, *url_path.strip('/').split('/'), 'index.html')
+
+
+def _atomic_write(path, data):
+    # Bir nechta worker bir faylni yozishi mumkin: vaqtinchalik nom har biriga alohida
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SiteFreezer:
+    """Pre-rendered copies of the public pages for nginx to serve.
+
+    Pages are rendered through the app itself with the test client (no
+    cookie, like an anonymous visitor), so they are exactly what Flask
+    would send. Each page is written as ``<url>/index.html`` together with
+    ``.gz`` (and ``.br`` if brotli is installed) variants for
+    ``gzip_static``/``brotli_static``; every file is replaced atomically.
+    Anything else (queries, forms, admin) falls through to Flask.
+    """
+
+    def __init__(self, app, output_dir, languages, base_url='http://localhost'):
+        self.app = app
+        self.output_dir = output_dir
+        self.languages = list(languages)
+        self.base_url = base_url
+        self.encodings = supported_encodings()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def urls(self, endpoints, **values):
+        # url_for bilan: routelar o'zgarsa yo'llar ham o'zgaradi
+        with self.app.test_request_context(base_url=self.base_url):
+            return [url_for(endpoint, lang=lang, **values) for endpoint in endpoints for lang in self.languages]
+
+    def render(self, url_path):
+        """The page body, or None if Flask does not answer it with a plain 200."""
+        response = self.app.test_client().get(url_path, base_url=self.base_url,
+                                              headers={'Accept-Encoding': 'identity'})
+        if response.status_code != 200 or response.mimetype != 'text/html':
+            return None
+        return response.get_data()
+
+    def write(self, url_path, body):
+        path = output_file(self.output_dir, url_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Avval siqilgan variantlar: index.html paydo bo'lganda ular tayyor
+        for encoding in self.encodings:
+            _atomic_write(path + SUFFIXES[encoding], compress(body, encoding))
+        _atomic_write(path, body)
+        return path
+
+    def remove(self, url_path):
+        path = output_file(self.output_dir, url_path)
+        for name in [path] + [path + SUFFIXES[encoding] for encoding in SUFFIXES]:
+            if os.path.exists(name):
+                os.remove(name)
+        directory = os.path.dirname(path)
+        if os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+
+    def _build_one(self, url_path):
+        body = self.render(url_path)
+        if body is None:
+            self.remove(url_path)
+            return None
+        return self.write(url_path, body)
+
+    def build(self, url_paths, jobs=1):
+        """Render and write ``url_paths``; pages that no longer exist are removed.
+
+        With ``jobs`` > 1 pages are built on a thread pool: brotli and
+        zlib release the GIL, and compression is most of the work.
+        """
+        if jobs > 1:
+            with ThreadPoolExecutor(jobs, thread_name_prefix='freeze') as pool:
+                results = list(pool.map(self._build_one, url_paths))
+        else:
+            results = [self._build_one(url_path) for url_path in url_paths]
+        return [path for path in results if path is not None]
+
+    def freeze(self, course_ids, jobs=1):
+        """Write every public page and delete pages left from removed courses."""
+        written = self.build(self.urls(STATIC_ENDPOINTS + LISTING_ENDPOINTS)
+                             + [url for course_id in course_ids
+                                for url in self.urls(('course_detail',), course_id=course_id)], jobs)
+        keep = set(written)
+        keep.update(path + suffix for path in written for suffix in SUFFIXES.values())
+        removed = 0
+        for lang in self.languages:
+            for directory, _, files in os.walk(os.path.join(self.output_dir, lang), topdown=False):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    if name.startswith('index.html') and path not in keep:
+                        os.remove(path)
+                        removed += 1
+                if not os.listdir(directory):
+                    os.rmdir(directory)
+        return len(written), removed
+
+    def rebuild_courses(self, course_ids=()):
+        """Incremental rebuild after an admin change: the listings and those courses' pages."""
+        url_paths = self.urls(LISTING_ENDPOINTS)
+        for course_id in course_ids:
+            url_paths += self.urls(('course_detail',), course_id=course_id)
+        return self.build(url_paths)
+
+    # --- background ---
+
+    def executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(1, thread_name_prefix='freeze')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, course_ids=()):
+        # Admin so'rovi kutmaydi; bitta thread - yozuvlar navbat bilan
+        course_ids = list(course_ids)
+
+        def job():
+            try:
+                self.rebuild_courses(course_ids)
+            except Exception as e:
+                print(f"Freeze error (courses {course_ids[:10]}): {e}")
+        return self.executor().submit(job)
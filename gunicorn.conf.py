@@ -0,0 +1,25 @@
+# gunicorn -c gunicorn.conf.py
+import gc
+import os
+import multiprocessing
+
+wsgi_app = 'main:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Ilova master'da bir marta yuklanadi: baza tekshiruvi va keshlar workerlar
+# orasida copy-on-write bo'linadi, birinchi so'rov ham "issiq" bo'ladi
+preload_app = True
+
+
+def when_ready(server):
+    # Yuklangan obyektlarni GC endi aylanib chiqmaydi - workerlarda ularning
+    # xotira sahifalari GC tufayli nusxalanmaydi
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Buferdagi arizalar worker to'xtashidan oldin yoziladi
+    import main
+    main.lead_writer.stop()
@@ -0,0 +1,62 @@
+import os
+import json
+import threading
+
+TRANSLATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations')
+LANGUAGES = ['uz', 'ru', 'en']
+DEFAULT_LANGUAGE = 'uz'
+
+
+class TranslationCatalog:
+    """Process-wide translation catalog.
+
+    Every language is parsed once and kept in memory; a language file is
+    re-read only when its mtime changes, so editing translations/*.json
+    still takes effect without a restart.
+    """
+
+    def __init__(self, directory=TRANSLATIONS_DIR, languages=LANGUAGES):
+        self.directory = directory
+        self.languages = list(languages)
+        self._entries = {}  # lang -> (mtime, dict)
+        self._lock = threading.Lock()
+
+    def _path(self, lang):
+        return os.path.join(self.directory, f'{lang}.json')
+
+    def _mtime(self, lang):
+        try:
+            return os.stat(self._path(lang)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self, lang):
+        try:
+            with open(self._path(lang), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Agar fayl topilmasa, standart qiymatlar
+            return {}
+
+    def get(self, lang):
+        if lang not in self.languages:
+            return {}
+        mtime = self._mtime(lang)
+        entry = self._entries.get(lang)
+        if entry is None or entry[0] != mtime:
+            with self._lock:
+                entry = self._entries.get(lang)
+                if entry is None or entry[0] != mtime:
+                    entry = (mtime, self._read(lang))
+                    self._entries[lang] = entry
+        return entry[1]
+
+    def version(self, lang):
+        entry = self._entries.get(lang)
+        return entry[0] if entry else None
+
+    def load_all(self):
+        return {lang: self.get(lang) for lang in self.languages}
+
+
+catalog = TranslationCatalog()
@@ -0,0 +1,297 @@
+import os
+import io
+import re
+import time
+import hashlib
+import json
+import uuid
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps, ImageFilter
+
+DERIVATIVE_WIDTHS = (320, 640, 960, 1280)
+PLACEHOLDER_WIDTH = 24
+WEBP_OPTIONS = {'quality': 80, 'method': 4}
+JPEG_OPTIONS = {'quality': 82, 'optimize': True, 'progressive': True}
+
+# <sha256[:32]>.<ext> va uning derivativlari: o'zgarmas, shuning uchun uzoq keshlanadi
+HASHED_IMAGE_RE = re.compile(r'^[0-9a-f]{32}(-\d+w)?\.(png|jpg|gif|webp)$')
+DERIVATIVE_SUFFIX_RE = re.compile(r'-\d+w$')
+# Fon ishi xeshlab qayta nomlaguncha yuklangan fayl shu nomda turadi
+UPLOAD_RE = re.compile(r'^upload-[0-9a-f]{32}\.\w+$')
+
+
+def _stem(image_path):
+    return os.path.splitext(image_path)[0]
+
+
+def derivative_path(image_path, width, ext):
+    return f'{_stem(image_path)}-{width}w.{ext}'
+
+
+def meta_path(image_path):
+    return f'{_stem(image_path)}.meta.json'
+
+
+def _extension(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return '.jpg' if ext == '.jpeg' else ext
+
+
+def content_filename(data, filename):
+    return hashlib.sha256(data).hexdigest()[:32] + _extension(filename)
+
+
+def is_upload(image_path):
+    return bool(image_path) and UPLOAD_RE.match(os.path.basename(image_path)) is not None
+
+
+def _owner_stems(filename):
+    # Fayl qaysi asl rasmga tegishli: x.png, x-640w.webp, x.meta.json -> x
+    # (eski nomlarda nuqta bo'lishi mumkin: "kurs.v2.meta.json" -> "kurs.v2")
+    stem = filename.removesuffix('.meta.json') if filename.endswith('.meta.json') else os.path.splitext(filename)[0]
+    return {stem, DERIVATIVE_SUFFIX_RE.sub('', stem)}
+
+
+def _flatten(img, background=(255, 255, 255)):
+    # JPEG shaffoflikni qo'llamaydi - oq fonga joylashtiramiz
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        canvas = Image.new('RGB', img.size, background)
+        canvas.paste(img, mask=img.split()[-1])
+        return canvas
+    return img.convert('RGB')
+
+
+def _atomic_write(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _encode(img, fmt, **options):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def strip_metadata(data):
+    """``data`` re-encoded upright and without EXIF/XMP; other formats are returned as is."""
+    try:
+        with Image.open(io.BytesIO(data)) as original:
+            fmt = original.format
+            if getattr(original, 'is_animated', False) or fmt not in ('JPEG', 'PNG', 'WEBP'):
+                return data
+            img = ImageOps.exif_transpose(original)
+            img.load()
+    except (OSError, ValueError):
+        return data  # rasm emas - process() xatoni ko'rsatadi
+    return _encode_clean(img, fmt)
+
+
+def _encode_clean(img, fmt):
+    # Qayta saqlashda Pillow EXIF/XMP'ni yozmaydi (exif= berilmasa). optimize=True yo'q:
+    # katta PNG uchun o'nlab soniya, hajmni esa derivativlar hal qiladi
+    if fmt == 'JPEG':
+        return _encode(img.convert('RGB'), 'JPEG', quality=90)
+    if fmt == 'PNG':
+        return _encode(img, 'PNG')
+    if fmt == 'WEBP':
+        return _encode(img, 'WEBP', quality=90)
+    return None
+
+
+class ImagePipeline:
+    """Upload-time processing of course images.
+
+    The admin request only writes the uploaded bytes to an
+    ``upload-<uuid>.<ext>`` name. A job on a small thread pool then
+    re-saves the image upright and without EXIF/XMP metadata, renames it
+    content-addressed to ``<sha256>.<ext>`` of those bytes (identical
+    files are kept once and a name always describes its contents) and
+    writes fixed-width WebP and JPEG derivatives plus a tiny blurred
+    placeholder next to it, with a ``.meta.json`` sidecar recording what
+    exists. The job's ``on_done`` gets the final name, so the caller can
+    point its rows at it.
+    """
+
+    def __init__(self, root, upload_dir, widths=DERIVATIVE_WIDTHS, max_workers=1):
+        self.root = root
+        self.upload_dir = upload_dir
+        self.widths = tuple(sorted(widths))
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._meta = {}
+        self._lock = threading.Lock()
+
+    def _abs(self, image_path):
+        return os.path.join(self.root, image_path)
+
+    def store(self, data, filename):
+        """Save uploaded bytes as they are under a temporary name; returns its image_path."""
+        # Qayta kodlash va xeshlash so'rov thread'ida emas - submit() ishida (finish())
+        image_path = f'{self.upload_dir}/upload-{uuid.uuid4().hex}{_extension(filename)}'
+        _atomic_write(self._abs(image_path), data)
+        return image_path
+
+    def finish(self, upload_path):
+        """Strip metadata from a stored upload and rename it to its content hash."""
+        source = self._abs(upload_path)
+        with open(source, 'rb') as f:
+            data = strip_metadata(f.read())
+        # Xesh tozalangan baytlardan: fayl keyin qayta yozilmaydi (immutable keshlanadi)
+        image_path = f'{self.upload_dir}/{content_filename(data, upload_path)}'
+        if os.path.exists(self._abs(image_path)):
+            # Eski yetim fayl qayta yuklandi: gc-images'ning min_age himoyasi yangilanadi
+            self._touch(image_path)
+        else:
+            _atomic_write(self._abs(image_path), data)
+        os.remove(source)
+        return image_path
+
+    def _touch(self, image_path):
+        paths = [image_path, meta_path(image_path)]
+        meta = self.meta(image_path)
+        if meta is not None:
+            paths += [derivative_path(image_path, w, ext) for w in meta['widths'] for ext in ('webp', 'jpg')]
+        for path in paths:
+            try:
+                os.utime(self._abs(path))
+            except OSError:
+                pass
+
+    def collect_garbage(self, referenced, min_age=3600, dry_run=False):
+        """Remove files in ``upload_dir`` not owned by any referenced image.
+
+        Files younger than ``min_age`` seconds are kept, so an upload whose
+        course row is not committed yet is never removed.
+        """
+        referenced_stems = {os.path.splitext(os.path.basename(p))[0] for p in referenced if p}
+        directory = self._abs(self.upload_dir)
+        cutoff = time.time() - min_age
+        removed = []
+        for entry in os.scandir(directory):
+            if not entry.is_file():
+                continue
+            if _owner_stems(entry.name) & referenced_stems:
+                continue
+            if entry.stat().st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(entry.path)
+                self._meta.pop(f'{self.upload_dir}/{entry.name}', None)
+            removed.append(entry.name)
+        return removed
+
+    def executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='images')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, image_path, on_done=None):
+        """Finish an upload and build its derivatives in the background.
+
+        ``on_done(final_path)`` runs once the file has its final name, even
+        if the derivatives failed (``picture()`` then shows the original).
+        """
+        def job():
+            final_path = image_path
+            try:
+                if is_upload(image_path):
+                    final_path = self.finish(image_path)
+                if self.meta(final_path) is None:
+                    self.process(final_path)
+            except Exception as e:
+                print(f"Image processing error ({image_path}): {e}")
+                if final_path == image_path:
+                    return
+            if on_done is not None:
+                on_done(final_path)
+        return self.executor().submit(job)
+
+    def process(self, image_path):
+        source = self._abs(image_path)
+        with Image.open(source) as original:
+            animated = getattr(original, 'is_animated', False)
+            fmt = original.format
+            img = ImageOps.exif_transpose(original)
+            img.load()
+
+        if not animated and not HASHED_IMAGE_RE.match(os.path.basename(image_path)):
+            # Xeshsiz eski yuklamalar joyida tozalanadi (ular immutable emas)
+            data = _encode_clean(img, fmt)
+            if data is not None:
+                _atomic_write(source, data)
+
+        width, height = img.size
+        widths = [w for w in self.widths if w < width] + [min(width, self.widths[-1])]
+        widths = sorted(set(widths))
+
+        flat = _flatten(img)
+        has_alpha = img.mode in ('RGBA', 'LA', 'P')
+        webp_source = img.convert('RGBA') if has_alpha else flat
+        for w in widths:
+            h = max(1, round(height * w / width))
+            _atomic_write(self._abs(derivative_path(image_path, w, 'webp')),
+                          _encode(webp_source.resize((w, h), Image.LANCZOS), 'WEBP', **WEBP_OPTIONS))
+            _atomic_write(self._abs(derivative_path(image_path, w, 'jpg')),
+                          _encode(flat.resize((w, h), Image.LANCZOS), 'JPEG', **JPEG_OPTIONS))
+
+        ph_height = max(1, round(height * PLACEHOLDER_WIDTH / width))
+        placeholder = flat.resize((PLACEHOLDER_WIDTH, ph_height), Image.BILINEAR).filter(ImageFilter.GaussianBlur(2))
+        placeholder_uri = 'data:image/jpeg;base64,' + base64.b64encode(
+            _encode(placeholder, 'JPEG', quality=40)).decode('ascii')
+
+        meta = {'width': width, 'height': height, 'widths': widths, 'placeholder': placeholder_uri}
+        _atomic_write(self._abs(meta_path(image_path)), json.dumps(meta).encode('utf-8'))
+        self._meta[image_path] = meta
+        return meta
+
+    def meta(self, image_path):
+        meta = self._meta.get(image_path)
+        if meta is None:
+            try:
+                with open(self._abs(meta_path(image_path)), 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._meta[image_path] = meta
+        return meta
+
+    def srcset(self, image_path, ext, meta):
+        return ', '.join(f'/{derivative_path(image_path, w, ext)} {w}w' for w in meta['widths'])
+
+    def picture(self, image_path, alt='', sizes='100vw', class_='', loading='lazy'):
+        """``<picture>`` markup with WebP/JPEG srcsets for a processed image.
+
+        Falls back to a plain ``<img>`` of the original while derivatives
+        are still being generated (or for images uploaded before them).
+        """
+        if not image_path:
+            return Markup('')
+        alt = escape(alt or '')
+        meta = self.meta(image_path)
+        if meta is None:
+            return Markup(f'<img src="/{escape(image_path)}" alt="{alt}" class="{escape(class_)}" '
+                          f'loading="{loading}" decoding="async">')
+
+        largest = meta['widths'][-1]
+        height = round(meta['height'] * largest / meta['width'])
+        return Markup(
+            '<picture style="display:contents">'
+            f'<source type="image/webp" srcset="{escape(self.srcset(image_path, "webp", meta))}" sizes="{escape(sizes)}">'
+            f'<img src="/{escape(derivative_path(image_path, largest, "jpg"))}" '
+            f'srcset="{escape(self.srcset(image_path, "jpg", meta))}" sizes="{escape(sizes)}" '
+            f'width="{largest}" height="{height}" alt="{alt}" class="{escape(class_)}" '
+            f'loading="{loading}" decoding="async" '
+            f'style="background-image:url({meta["placeholder"]});background-size:cover">'
+            '</picture>'
+        )
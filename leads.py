@@ -0,0 +1,243 @@
+import os
+import re
+import csv
+import time
+import atexit
+import threading
+from io import StringIO
+
+# Har bir jadval uchun saqlanadigan ustunlar (created_at submit paytida qo'yiladi)
+LEAD_COLUMNS = {
+    'enrollments': ('course_id', 'course_title', 'full_name', 'phone', 'email',
+                    'preferred_time', 'message', 'lang', 'created_at'),
+    'contact_messages': ('name', 'phone', 'subject', 'message', 'created_at'),
+}
+
+
+def _insert_sql(table):
+    columns = LEAD_COLUMNS[table]
+    # Kurs buferda turgan paytda o'chirilgan bo'lsa, course_id NULL bo'ladi (FK xatosi emas)
+    values = ['(SELECT id FROM courses WHERE id = ?)' if c == 'course_id' else '?' for c in columns]
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)})"
+
+
+_INSERTS = {table: _insert_sql(table) for table in LEAD_COLUMNS}
+
+
+def utc_timestamp(now=None):
+    # CURRENT_TIMESTAMP bilan bir xil format, saralash to'g'ri ishlaydi
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now))
+
+
+class LeadWriter:
+    """Write-behind buffer for enrollments and contact messages.
+
+    ``submit()`` only appends the row (and its optional Telegram text) to
+    an in-memory buffer. A daemon thread per process writes everything
+    buffered in one transaction, at the latest ``max_delay`` seconds after
+    the oldest row arrived or as soon as ``batch_size`` rows are waiting,
+    so a burst of sign-ups costs one commit instead of one per request.
+    Telegram notifications go into ``telegram_outbox`` in the same
+    transaction. Once ``max_pending`` rows are buffered (the database is
+    failing or locked), ``submit()`` writes synchronously first, so the
+    caller sees the error and its row is not kept. The buffer is flushed
+    on interpreter exit; a hard kill loses at most ``max_delay`` seconds
+    of leads.
+    """
+
+    def __init__(self, db, outbox=None, max_delay=0.2, batch_size=500, max_pending=10000, on_flush=None):
+        self.db = db
+        self.outbox = outbox
+        self.max_delay = max_delay
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(self.batch_size, max_pending)
+        self.on_flush = on_flush  # (rows, seconds since the oldest row was submitted)
+        self.written = 0
+        self._pending = []  # (table, params, notification, submitted_at)
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = False
+        self._thread = None
+        self._pid = os.getpid()
+        self._exit_hook = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, table, values, notification=None):
+        params = tuple(values.get(c) for c in LEAD_COLUMNS[table][:-1]) + (utc_timestamp(),)
+        self.ensure_started()
+        if len(self._pending) >= self.max_pending:
+            # Yozuvchi orqada qolgan (baza band yoki xato): chaqiruvchi o'zi yozadi,
+            # xato bo'lsa uning qatori buferga qo'shilmaydi
+            self.flush()
+        with self._cond:
+            self._pending.append((table, params, notification, time.monotonic()))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """Write all buffered rows now; returns how many were written."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with self.db.transaction() as conn:
+                    for table in LEAD_COLUMNS:
+                        rows = [params for t, params, _, _ in batch if t == table]
+                        if rows:
+                            conn.executemany(_INSERTS[table], rows)
+                    if self.outbox is not None:
+                        for _, _, notification, _ in batch:
+                            if notification:
+                                self.outbox.add(conn, notification)
+            except BaseException:
+                # Yozilmagan qatorlar buferning boshiga qaytariladi
+                with self._cond:
+                    self._pending[:0] = batch
+                raise
+            self.written += len(batch)
+        if self.outbox is not None and any(item[2] for item in batch):
+            self.outbox.notify()
+        if self.on_flush is not None:
+            self.on_flush(len(batch), time.monotonic() - batch[0][3])
+        return len(batch)
+
+    # --- background writer ---
+
+    def ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                # Fork'dan keyin: ota jarayon buferidagi qatorlar unga tegishli
+                self._pid = os.getpid()
+                self._pending = []
+                self._thread = None
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name='lead-writer', daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.stop)
+                self._exit_hook = True
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._pid == os.getpid():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Lead writer error: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                # Eng eski qator max_delay dan ortiq kutmaydi
+                deadline = self._pending[0][3] + self.max_delay
+                while len(self._pending) < self.batch_size and not self._stop:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Lead writer error: {e}")
+                with self._cond:
+                    if not self._stop:
+                        self._cond.wait(self.max_delay)
+
+
+# --- admin inbox ---
+
+INBOX_KINDS = {
+    'enrollments': ('id', 'created_at', 'course_id', 'course_title', 'full_name', 'phone', 'email',
+                    'preferred_time', 'message', 'lang'),
+    'contact_messages': ('id', 'created_at', 'name', 'phone', 'subject', 'message'),
+}
+
+
+def inbox_query(kind, course_id=None, date_from=None, date_to=None, after=None, limit=None):
+    """SQL and parameters listing ``kind`` rows newest first.
+
+    Filters match the ``(course_id, created_at, id)`` and
+    ``(created_at, id)`` indexes; ``date_to`` is inclusive and ``after`` is
+    a ``(created_at, id)`` keyset cursor.
+    """
+    where, params = [], []
+    if course_id is not None and kind == 'enrollments':
+        where.append('course_id = ?')
+        params.append(course_id)
+    if date_from:
+        where.append('created_at >= ?')
+        params.append(date_from)
+    if date_to:
+        where.append("created_at < date(?, '+1 day')")
+        params.append(date_to)
+    if after:
+        where.append('(created_at, id) < (?, ?)')
+        params.extend(after)
+    sql = f"SELECT {', '.join(INBOX_KINDS[kind])} FROM {kind}"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY created_at DESC, id DESC'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+# Arizasi bor kurslar: har bir kurs uchun indeksdan bitta qidiruv (DISTINCT butun indeksni o'qiydi)
+ENROLLED_COURSES_SQL = '''
+    WITH RECURSIVE enrolled (course_id) AS (
+        SELECT MIN(course_id) FROM enrollments
+        UNION ALL
+        SELECT (SELECT MIN(course_id) FROM enrollments WHERE course_id > enrolled.course_id)
+        FROM enrolled WHERE enrolled.course_id IS NOT NULL
+    )
+    SELECT course_id FROM enrolled WHERE course_id IS NOT NULL
+'''
+
+
+# Excel'da formula sifatida ishlamasligi uchun (telefon raqamlaridagi "+998" ga tegilmaydi)
+_FORMULA_RE = re.compile(r'^(?:[=@\t\r]|[+-][^\d\s])')
+
+
+def _csv_value(value):
+    if isinstance(value, str) and _FORMULA_RE.match(value):
+        return "'" + value
+    return value
+
+
+def iter_csv(cursor, columns, chunk_rows=500):
+    """CSV text chunks for the rows of an open cursor (UTF-8 BOM first, for Excel)."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            writer.writerows([_csv_value(v) for v in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        # Mijoz yuklashni to'xtatsa ham o'qish tranzaksiyasi ochiq qolmaydi
+        cursor.close()
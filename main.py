@@ -1,17 +1,47 @@
 import os
-import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from werkzeug.utils import secure_filename
+from flask import Flask, request, redirect, url_for, flash, session, jsonify, g, abort, send_file, Response
+from flask import before_render_template, template_rendered, stream_with_context, get_flashed_messages
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from functools import wraps
+import click
 from config import Config
-import requests
+from db import Database
+from courses import (CourseCatalog, encode_cursor, decode_cursor, translations_from_form,
+                     save_translations, insert_course, form_rows, bump_catalog_version, TRANSLATED_FIELDS)
+from migrations import migrate, MIGRATIONS
+from search import CourseSearch
+from outbox import TelegramOutbox
+from ratelimit import SubmissionGuard, MemoryStore, SQLiteStore, phone_key
+from bulk import FORMATS, read_records, import_courses, export_courses
+from leads import LeadWriter, INBOX_KINDS, ENROLLED_COURSES_SQL, inbox_query, iter_csv
+from images import ImagePipeline, HASHED_IMAGE_RE, is_upload
+from i18n import catalog, LANGUAGES, DEFAULT_LANGUAGE
+from templating import LocalizedTemplates
+from freeze import SiteFreezer
+from page_cache import PageCache, cached_page, not_modified, shared_cache_headers, has_session_cookie
+from api import CourseEncoder, parse_fields, make_etag
+from assets import AssetManifest
+from asset_build import AssetBuilder, AssetBuildError
+from compression import CompressedBodyCache, compress_response, choose_encoding
+from metrics import Metrics
+from profiler import RequestProfiler, ProfileStore, collapsed, speedscope, hottest_frames
 from datetime import datetime
+from html import escape
+import io
+import sys
 import json
+import time
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+if Config.TRUSTED_PROXIES:
+    # Proxy ortida request.remote_addr mijozning haqiqiy IP'si, hreflang uchun
+    # to'liq URL'lar esa haqiqiy sxema va host bilan bo'lishi uchun
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXIES, x_proto=Config.TRUSTED_PROXIES,
+                            x_host=Config.TRUSTED_PROXIES)
+
 # File upload configuration
 UPLOAD_FOLDER = 'static/images/courses'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -21,196 +51,410 @@ if not os.path.exists(UPLOAD_FOLDER):
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# So'rovlar bo'yicha o'lchovlar (/admin/metrics): DB, render, HTTP vaqti
+metrics = Metrics(slow_query_ms=Config.SLOW_QUERY_MS)
+
+@app.before_request
+def start_request_metrics():
+    metrics.start_request()
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    metrics.finish_request(request.endpoint, request.method, error=exc is not None)
+
+# Yuklangan rasmlardan WebP/JPEG o'lchamlari fon threadida tayyorlanadi
+image_pipeline = ImagePipeline(app.root_path, UPLOAD_FOLDER)
+app.add_template_global(image_pipeline.picture, 'course_image')
+
+# Tarjimalar jarayon boshida bir marta yuklanadi
+catalog.load_all()
+
+# Statik fayllar uchun kontent xeshli URL'lar (static_url() orqali)
+asset_manifest = AssetManifest(app.static_folder, exclude=('images/courses/',)).build()
+app.add_template_global(asset_manifest.url, 'static_url')
+app.add_template_global(asset_manifest.exists, 'asset_exists')
+compressed_bodies = CompressedBodyCache()
+
+# Birinchi ro'yxatdan o'tgan after_request eng oxirida ishlaydi: HTML shu yerda siqiladi
+@app.after_request
+def compress_html(response):
+    return compress_response(response, request, compressed_bodies)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # Til ma'lumotlarini yuklash
 def load_translations():
-    translations = {}
-    languages = ['uz', 'ru', 'en']
-    
-    for lang in languages:
-        try:
-            with open(f'translations/{lang}.json', 'r', encoding='utf-8') as f:
-                translations[lang] = json.load(f)
-        except FileNotFoundError:
-            # Agar fayl topilmasa, standart qiymatlar
-            translations[lang] = {}
-    
-    return translations
+    return catalog.load_all()
 
 def get_current_language():
-    return session.get('language', 'uz')
+    # Til URL prefiksidan (/uz/, /ru/...); prefikssiz sahifalarda standart til
+    return g.get('lang', DEFAULT_LANGUAGE)
+
+# Public sahifalar /<lang>/... ostida: javob cookie'ga bog'liq emas, shuning uchun
+# nginx yoki CDN uni keshlay oladi
+LANGUAGE_PREFIX = '/<any({}):lang>'.format(', '.join(LANGUAGES))
+localized_endpoints = set()
+
+@app.url_value_preprocessor
+def pull_language(endpoint, values):
+    if values and 'lang' in values:
+        g.lang = values.pop('lang')
+
+@app.url_defaults
+def add_language(endpoint, values):
+    if endpoint in localized_endpoints and 'lang' not in values:
+        values['lang'] = get_current_language()
+
+def localized_route(rule, **options):
+    """``app.route`` under the language prefix.
+
+    The old unprefixed URL stays as a permanent redirect to the default
+    language (308 for POST, so forms on stale pages still submit).
+    """
+    def decorator(f):
+        endpoint = options.pop('endpoint', f.__name__)
+        app.add_url_rule(LANGUAGE_PREFIX + rule, endpoint, f, **options)
+        localized_endpoints.add(endpoint)
+        if rule != '/':
+            app.add_url_rule(rule, f'{endpoint}_legacy', legacy_redirect, **options)
+        return f
+    return decorator
+
+def legacy_redirect(**view_args):
+    location = url_for(request.endpoint.removesuffix('_legacy'), lang=DEFAULT_LANGUAGE, **view_args)
+    if request.query_string:
+        location += '?' + request.query_string.decode('latin-1')
+    return redirect(location, 301 if request.method in ('GET', 'HEAD') else 308)
+
+def language_url(lang, _external=False):
+    # Joriy sahifaning boshqa tildagi manzili (til tanlagich va hreflang uchun)
+    if request.endpoint not in localized_endpoints:
+        return url_for('home', lang=lang, _external=_external)
+    values = {k: v for k, v in request.args.items() if not k.startswith('_')}
+    values.update(request.view_args, lang=lang)
+    return url_for(request.endpoint, _external=_external, **values)
+
+def alternate_links():
+    if request.endpoint not in localized_endpoints:
+        return []
+    links = [(lang, language_url(lang, _external=True)) for lang in LANGUAGES]
+    # Bosh sahifa uchun x-default - tilni Accept-Language bo'yicha tanlaydigan ildiz
+    default = url_for('root', _external=True) if request.endpoint == 'home' else links[0][1]
+    return links + [('x-default', default)]
+
+def flashed_messages(*args, **kwargs):
+    # Cookie'siz so'rovda flash bo'lmaydi: sessiyaga tegilmaydi, javob umumiy keshga yaroqli
+    if not has_session_cookie() and not session.modified:
+        return []
+    return get_flashed_messages(*args, **kwargs)
+
+app.jinja_env.globals['get_flashed_messages'] = flashed_messages
+
+def get_request_translations():
+    # Joriy so'rov tili uchun lug'at bir marta aniqlanadi
+    if 'translations' not in g:
+        g.translations = catalog.get(get_current_language())
+    return g.translations
 
 def get_translation(key, lang=None):
     if lang is None:
-        lang = get_current_language()
-    translations = load_translations()
-    return translations.get(lang, {}).get(key, key)
+        translations = get_request_translations()
+    else:
+        translations = catalog.get(lang)
+    return translations.get(key, key)
 
 # Template funksiyasini global qilish
 @app.context_processor
 def utility_processor():
-    return dict(get_translation=get_translation, current_lang=get_current_language())
+    return dict(get_translation=get_translation, current_lang=get_current_language(),
+                language_url=language_url, alternate_links=alternate_links,
+                catalog_version=course_catalog.version)
 
-def get_db_connection():
-    try:
-        connection = sqlite3.connect(Config.DATABASE_PATH)
-        connection.row_factory = sqlite3.Row  # Bu dict-like access uchun
-        return connection
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+localized_templates = LocalizedTemplates(catalog)
+
+def render_template(template_name_or_list, **context):
+    # Har bir til uchun alohida kompilyatsiya qilingan shablon ishlatiladi:
+    # get_translation('kalit') chaqiruvlari kompilyatsiya paytida matnga almashtiriladi
+    with metrics.phase('render'):
+        env = localized_templates.environment(app.jinja_env, get_current_language())
+        template = env.get_or_select_template(template_name_or_list)
+        app.update_template_context(context)
+        before_render_template.send(app, template=template, context=context)
+        rv = template.render(context)
+        template_rendered.send(app, template=template, context=context)
+    return rv
+
+# Har bir thread uchun bitta sozlangan SQLite ulanishi
+db = Database(Config.DATABASE_PATH, busy_timeout_ms=Config.DATABASE_BUSY_TIMEOUT_MS,
+              mmap_size=Config.DATABASE_MMAP_SIZE, on_query=metrics.record_query)
+
+# Kurslarning xotiradagi (til bo'yicha) ko'rinishi
+course_catalog = CourseCatalog(db, LANGUAGES, DEFAULT_LANGUAGE)
+
+# JSON API uchun oldindan kodlangan kurs maydonlari
+course_encoder = CourseEncoder(course_catalog)
+
+# FTS5 qidiruv indeksi (courses jadvalidagi trigger'lar yangilab turadi)
+course_search = CourseSearch(db, course_catalog, LANGUAGES)
+
+# Telegram xabarlari navbati (fon threadida yuboriladi)
+telegram_outbox = TelegramOutbox(
+    db, Config.TELEGRAM_BOT_TOKEN, Config.TELEGRAM_CHAT_ID,
+    api_url=Config.TELEGRAM_API_URL,
+    timeout=(Config.TELEGRAM_CONNECT_TIMEOUT, Config.TELEGRAM_READ_TIMEOUT),
+    max_attempts=Config.TELEGRAM_MAX_ATTEMPTS,
+    batch_size=Config.TELEGRAM_BATCH_SIZE,
+    on_request=lambda status, seconds: metrics.record_outbound('telegram', status, seconds),
+)
+
+# Public formalar uchun limitlar va dublikatlarni bostirish
+if Config.RATE_LIMIT_DATABASE:
+    rate_limit_store = SQLiteStore(Database(Config.RATE_LIMIT_DATABASE, busy_timeout_ms=Config.DATABASE_BUSY_TIMEOUT_MS,
+                                            on_query=metrics.record_query))
+else:
+    rate_limit_store = MemoryStore()
+submission_guard = SubmissionGuard(rate_limit_store, {
+    'ip': (Config.RATE_LIMIT_PER_IP, Config.RATE_LIMIT_PERIOD),
+    'phone': (Config.RATE_LIMIT_PER_PHONE, Config.RATE_LIMIT_PERIOD),
+}, duplicate_window=Config.DUPLICATE_WINDOW)
+
+# Arizalar va aloqa xabarlari xotirada yig'ilib, bitta tranzaksiyada yoziladi
+lead_writer = LeadWriter(db, telegram_outbox, max_delay=Config.LEAD_FLUSH_DELAY,
+                         batch_size=Config.LEAD_BATCH_SIZE, max_pending=Config.LEAD_MAX_PENDING)
+
+# So'rov profillari (?_profile=1 admin uchun yoki PROFILE_SAMPLE_RATE): barcha workerlar uchun bazada
+profile_store = ProfileStore(db)
+app.wsgi_app = RequestProfiler(app.wsgi_app, app, profile_store, sample_rate=Config.PROFILE_SAMPLE_RATE,
+                               interval=Config.PROFILE_INTERVAL_MS / 1000)
+
+def database_ready(conn):
+    # Faqat o'qish: hammasi joyida bo'lsa init_db yozish qulfini ham olmaydi
+    if conn.execute('PRAGMA user_version').fetchone()[0] != len(MIGRATIONS):
+        return False
+    return conn.execute("SELECT 1 FROM admins WHERE username = 'admin'").fetchone() is not None
 
 def init_db():
     try:
-        connection = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = connection.cursor()
-        
-        # Courses jadvalini yaratish
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title_uz TEXT NOT NULL,
-                title_ru TEXT,
-                title_en TEXT,
-                description_uz TEXT NOT NULL,
-                description_ru TEXT,
-                description_en TEXT,
-                duration_uz TEXT NOT NULL,
-                duration_ru TEXT,
-                duration_en TEXT,
-                price_uz TEXT NOT NULL,
-                price_ru TEXT,
-                price_en TEXT,
-                start_date_uz TEXT NOT NULL,
-                start_date_ru TEXT,
-                start_date_en TEXT,
-                features_uz TEXT,
-                features_ru TEXT,
-                features_en TEXT,
-                image_path TEXT,
-                color TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        if database_ready(db.connection()):
+            print("Database is up to date")
+            return
+        with db.transaction() as conn:
+            # Sxema PRAGMA user_version bo'yicha migratsiyalar bilan yangilanadi
+            fresh = conn.execute('PRAGMA user_version').fetchone()[0] == 0
+            migrate(conn)
         
-        # Admins jadvalini yaratish
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Admin foydalanuvchisini qo'shish
-        admin_password = generate_password_hash('admin123')
-        cursor.execute('INSERT OR IGNORE INTO admins (username, password_hash) VALUES (?, ?)', ('admin', admin_password))
+            # Admin foydalanuvchisi faqat yo'q bo'lsa qo'shiladi (parol xeshi qimmat)
+            if conn.execute("SELECT 1 FROM admins WHERE username = 'admin'").fetchone() is None:
+                admin_password = generate_password_hash('admin123')
+                conn.execute('INSERT INTO admins (username, password_hash) VALUES (?, ?)', ('admin', admin_password))
 
-        # Database migration - image_path ustunini qo'shish
-        try:
-            cursor.execute("ALTER TABLE courses ADD COLUMN image_path TEXT")
-            print("image_path ustuni qo'shildi!")
-        except Exception as e:
-            if "duplicate column name" in str(e).lower():
-                print("image_path ustuni allaqachon mavjud!")
-            else:
-                print(f"Migration xatoligi: {e}")
-
-        # Kurslar sonini tekshirish
-        cursor.execute('SELECT COUNT(*) FROM courses')
-        courses_count = cursor.fetchone()[0]
+            # Standart kurslar faqat yangi bazaga qo'shiladi: admin o'chirgan kurslar qaytib kelmaydi
+            courses_count = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0] if fresh else None
         
-        if courses_count == 0:
-            default_courses = [
-                ('Qur\'on o\'qish', 'Чтение Корана', 'Quran Reading', 
-                 'Qur\'on o\'qishni 0 dan boshlab o\'rganing', 'Изучите чтение Корана с нуля', 'Learn Quran reading from scratch',
-                 '6 oy', '6 месяцев', '6 months',
-                 '500,000 so\'m', '500,000 сум', '500,000 UZS',
-                 '15 Yanvar', '15 Январь', '15 January',
-                 'Tajvid qoidalari, Nozil tarixi, Xat turlari', 'Правила таджвида, История ниспослания, Виды письма', 'Tajweed rules, Revelation history, Writing styles',
-                 'static/images/courses/quran.jpg', 'from-islamic-green to-islamic-blue'),
+            if courses_count == 0:
+                default_courses = [
+                    ('Qur\'on o\'qish', 'Чтение Корана', 'Quran Reading', 
+                     'Qur\'on o\'qishni 0 dan boshlab o\'rganing', 'Изучите чтение Корана с нуля', 'Learn Quran reading from scratch',
+                     '6 oy', '6 месяцев', '6 months',
+                     '500,000 so\'m', '500,000 сум', '500,000 UZS',
+                     '15 Yanvar', '15 Январь', '15 January',
+                     'Tajvid qoidalari, Nozil tarixi, Xat turlari', 'Правила таджвида, История ниспослания, Виды письма', 'Tajweed rules, Revelation history, Writing styles',
+                     'static/images/courses/quran.jpg', 'from-islamic-green to-islamic-blue'),
                 
-                ('Arab tili', 'Арабский язык', 'Arabic Language',
-                 'Arab tilini amaliy va nazariy jihatdan o\'rganing', 'Изучите арабский язык практично и теоретично', 'Learn Arabic language practically and theoretically',
-                 '8 oy', '8 месяцев', '8 months',
-                 '600,000 so\'m', '600,000 сум', '600,000 UZS',
-                 '20 Yanvar', '20 Январь', '20 January',
-                 'Grammatika, Nutq, Yozish, O\'qish', 'Грамматика, Речь, Письмо, Чтение', 'Grammar, Speaking, Writing, Reading',
-                 'static/images/courses/arabic.jpg', 'from-islamic-gold to-orange-500'),
+                    ('Arab tili', 'Арабский язык', 'Arabic Language',
+                     'Arab tilini amaliy va nazariy jihatdan o\'rganing', 'Изучите арабский язык практично и теоретично', 'Learn Arabic language practically and theoretically',
+                     '8 oy', '8 месяцев', '8 months',
+                     '600,000 so\'m', '600,000 сум', '600,000 UZS',
+                     '20 Yanvar', '20 Январь', '20 January',
+                     'Grammatika, Nutq, Yozish, O\'qish', 'Грамматика, Речь, Письмо, Чтение', 'Grammar, Speaking, Writing, Reading',
+                     'static/images/courses/arabic.jpg', 'from-islamic-gold to-orange-500'),
                 
-                ('Islom asoslari', 'Основы ислама', 'Islamic Fundamentals',
-                 'Islom dinining asoslari va tarixi', 'Основы и история исламской религии', 'Fundamentals and history of Islamic religion',
-                 '4 oy', '4 месяца', '4 months',
-                 '400,000 so\'m', '400,000 сум', '400,000 UZS',
-                 '25 Yanvar', '25 Январь', '25 January',
-                 'Aqida, Ibadat, Axloq, Tarix', 'Акида, Ибадат, Ахляк, История', 'Aqeedah, Worship, Ethics, History',
-                 'static/images/courses/islamic.jpg', 'from-islamic-purple to-purple-600')
-            ]
+                    ('Islom asoslari', 'Основы ислама', 'Islamic Fundamentals',
+                     'Islom dinining asoslari va tarixi', 'Основы и история исламской религии', 'Fundamentals and history of Islamic religion',
+                     '4 oy', '4 месяца', '4 months',
+                     '400,000 so\'m', '400,000 сум', '400,000 UZS',
+                     '25 Yanvar', '25 Январь', '25 January',
+                     'Aqida, Ibadat, Axloq, Tarix', 'Акида, Ибадат, Ахляк, История', 'Aqeedah, Worship, Ethics, History',
+                     'static/images/courses/islamic.jpg', 'from-islamic-purple to-purple-600')
+                ]
             
-            for course in default_courses:
-                cursor.execute('''
-                    INSERT INTO courses
-                    (title_uz, title_ru, title_en, description_uz, description_ru, description_en,
-                     duration_uz, duration_ru, duration_en, price_uz, price_ru, price_en,
-                     start_date_uz, start_date_ru, start_date_en, features_uz, features_ru, features_en, image_path, color)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', course)
-            print("Standart kurslar qo'shildi!")
-        else:
-            print("Kurslar allaqachon mavjud!")
+                # Har bir maydon uchun uz, ru, en qiymatlari, keyin rasm va rang
+                keys = [f'{name}_{lang}' for name in TRANSLATED_FIELDS for lang in ('uz', 'ru', 'en')]
+                for course in default_courses:
+                    values = dict(zip(keys + ['image_path', 'color'], course))
+                    insert_course(conn, translations_from_form(values, LANGUAGES, DEFAULT_LANGUAGE),
+                                  values['image_path'], values['color'])
+                print("Standart kurslar qo'shildi!")
+            elif fresh:
+                print("Kurslar allaqachon mavjud!")
             
-        connection.commit()
-        cursor.close()
-        connection.close()
         print("Database initialized successfully!")
     except Exception as e:
         print(f"Database initialization error: {e}")
 
-def send_telegram_message(message):
-    try:
-        if Config.TELEGRAM_BOT_TOKEN and Config.TELEGRAM_CHAT_ID:
-            url = f"https://api.telegram.org/bot{Config.TELEGRAM_BOT_TOKEN}/sendMessage"
-            data = {
-                "chat_id": Config.TELEGRAM_CHAT_ID,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-            response = requests.post(url, data=data)
-            return response.status_code == 200
-    except Exception as e:
-        print(f"Telegram message error: {e}")
-    return False
+@app.before_request
+def start_background_workers():
+    telegram_outbox.ensure_started()
+
+# Public sahifalar keshi: kurslar o'zgarganda admin routelari tozalaydi
+page_cache = PageCache(Config.PAGE_CACHE_MAX_ENTRIES, Config.PAGE_CACHE_MAX_BYTES)
+metrics.gauge('muhib_page_cache_hits_total', 'Page cache hits.', lambda: page_cache.hits, kind='counter')
+metrics.gauge('muhib_page_cache_misses_total', 'Page cache misses.', lambda: page_cache.misses, kind='counter')
+metrics.gauge('muhib_page_cache_entries', 'Pages currently cached.', lambda: len(page_cache))
+metrics.gauge('muhib_telegram_outbox_pending', 'Telegram messages waiting to be sent.',
+              lambda: db.query_one("SELECT COUNT(*) FROM telegram_outbox WHERE status IN ('pending', 'sending')")[0])
+metrics.gauge('muhib_form_rate_limited_total', 'Public form posts rejected by the rate limiter.',
+              lambda: submission_guard.limited, kind='counter')
+metrics.gauge('muhib_form_duplicates_total', 'Public form posts dropped as duplicates.',
+              lambda: submission_guard.duplicates, kind='counter')
+metrics.gauge('muhib_leads_pending', 'Enrollments and contact messages buffered in this worker.', lambda: len(lead_writer))
+metrics.gauge('muhib_leads_written_total', 'Enrollments and contact messages written by this worker.',
+              lambda: lead_writer.written, kind='counter')
+
+def page_cache_key():
+    lang = get_current_language()
+    # hreflang havolalari to'liq URL: host ham kalitga kiradi
+    return lang, catalog.version(lang), request.host_url
+
+def public_page(tags=()):
+    return cached_page(page_cache, page_cache_key, tags, Config.PUBLIC_MAX_AGE, Config.PUBLIC_SHARED_MAX_AGE)
+
+# Statik nusxa (flask freeze): admin o'zgarishlaridan keyin faqat tegishli sahifalar qayta yoziladi
+site_freezer = SiteFreezer(app, Config.FREEZE_DIR, LANGUAGES, Config.SITE_URL) if Config.FREEZE_DIR else None
+
+def on_courses_changed(*course_ids):
+    # Admin o'zgarishidan keyin read model va sahifa keshini yangilash (import: barcha tegilgan kurslar)
+    course_catalog.rebuild()
+    page_cache.invalidate('courses', *(f'course:{course_id}' for course_id in course_ids))
+    if site_freezer is not None:
+        site_freezer.submit(course_ids)
+
+@app.before_request
+def check_catalog_version():
+    # Kurslarni boshqa worker (yoki CLI import) o'zgartirgan bo'lsa: read model keyingi
+    # murojaatda qayta quriladi, qaysi sahifalar eskirgani noma'lum - kesh tozalanadi
+    if request.endpoint in ('static', 'asset'):
+        return
+    if course_catalog.refresh():
+        page_cache.clear()
+
+def save_uploaded_image():
+    # Fayl vaqtinchalik nom bilan yoziladi; tozalash va xeshlash process_course_image() ishida
+    file = request.files.get('image')
+    if not (file and file.filename and allowed_file(file.filename)):
+        return None
+    return image_pipeline.store(file.read(), file.filename)
+
+def use_final_image(conn, upload_path, image_path):
+    # Kurs orada boshqa rasmga o'tgan bo'lsa unga tegilmaydi
+    conn.execute('UPDATE courses SET image_path = ? WHERE image_path = ?', (image_path, upload_path))
+
+def process_course_image(course_id, image_path):
+    # Rasm kontent xeshi nomiga o'tib derivativlari tayyor bo'lgach, kurs sahifalari
+    # yangi nom va srcset bilan qayta render qilinadi
+    def on_done(final_path):
+        # Versiya boshqa workerlar uchun: ularning keshidagi sahifalarda srcset yo'q
+        with db.transaction() as conn:
+            use_final_image(conn, image_path, final_path)
+            bump_catalog_version(conn)
+        on_courses_changed(course_id)
+    image_pipeline.submit(image_path, on_done=on_done)
 
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'admin_logged_in' not in session:
-            return redirect(url_for('admin_login'))
+            return redirect(url_for('admin'))
         return f(*args, **kwargs)
     return decorated_function
 
+def guarded_form(redirect_to, fields):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Bazaga va Telegram'ga tegmasdan oldin: rad etilgan so'rov arzon qaytadi
+            keys = {'ip': request.remote_addr, 'phone': phone_key(request.form.get('phone'))}
+            values = [request.form.get(name) for name in fields]
+            verdict = submission_guard.check(request.endpoint, keys, values)
+            if verdict == 'limited':
+                flash('Juda ko\'p so\'rov yuborildi. Iltimos, birozdan keyin qaytadan urinib ko\'ring.', 'error')
+                return redirect(url_for(redirect_to))
+            if verdict == 'duplicate':
+                flash('Bu ma\'lumotlar allaqachon qabul qilingan. Tez orada siz bilan bog\'lanamiz.', 'success')
+                return redirect(url_for(redirect_to))
+            # View so'rovni qabul qilganini g.submission_accepted bilan bildiradi; aks holda
+            # (tekshiruv rad etdi yoki xato) qayta yuborish dublikat deb hisoblanmaydi
+            g.submission_accepted = False
+            try:
+                return f(*args, **kwargs)
+            finally:
+                if not g.submission_accepted:
+                    submission_guard.forget(request.endpoint, keys, values)
+        return decorated_function
+    return decorator
+
+@app.after_request
+def immutable_image_headers(response):
+    # Xeshlangan rasm nomlari hech qachon o'zgarmaydi
+    if request.endpoint == 'static' and response.status_code == 200:
+        filename = request.view_args.get('filename', '')
+        if filename.startswith('images/courses/') and HASHED_IMAGE_RE.match(filename.rsplit('/', 1)[1]):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+    return response
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    entry = asset_manifest.lookup(filename)
+    if entry is None:
+        abort(404)
+    encoding = choose_encoding(request, tuple(entry.variants))
+    if encoding:
+        response = Response(entry.variants[encoding], mimetype=entry.mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{entry.etag}-{encoding}')
+    else:
+        response = send_file(entry.path, mimetype=entry.mimetype, etag=entry.etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
 @app.route('/')
+def root():
+    # Accept-Language faqat shu yerda: qolgan barcha sahifalarning tili URL'da
+    lang = request.accept_languages.best_match(LANGUAGES, DEFAULT_LANGUAGE)
+    response = redirect(url_for('home', lang=lang))
+    response.vary.add('Accept-Language')
+    return shared_cache_headers(response, Config.PUBLIC_MAX_AGE, Config.PUBLIC_SHARED_MAX_AGE)
+
+@localized_route('/')
+@public_page()
 def home():
     return render_template('home.html')
 
 @app.route('/set_language/<language>')
 def set_language(language):
-    if language in ['uz', 'ru', 'en']:
-        session['language'] = language
-    return redirect(request.referrer or url_for('home'))
+    # Eski havolalar uchun: til endi sessiyada emas, URL'da
+    return redirect(url_for('home', lang=language if language in LANGUAGES else DEFAULT_LANGUAGE))
 
-@app.route('/about')
+@localized_route('/about')
+@public_page()
 def about():
     return render_template('about.html')
 
-@app.route('/contact')
+@localized_route('/contact')
+@public_page()
 def contact():
     return render_template('contact.html')
 
-@app.route('/contact-form', methods=['POST'])
+@localized_route('/contact-form', methods=['POST'])
+@guarded_form('contact', ('name', 'phone', 'subject', 'message'))
 def contact_form():
     try:
         name = request.form.get('name')
@@ -227,15 +471,19 @@ def contact_form():
         telegram_message = f"""
 📧 <b>Yangi aloqa xabari!</b>
 
-👤 <b>Ism:</b> {name}
-📱 <b>Telefon:</b> {phone}
-📝 <b>Mavzu:</b> {subject}
-💬 <b>Xabar:</b> {message}
+👤 <b>Ism:</b> {escape(name)}
+📱 <b>Telefon:</b> {escape(phone)}
+📝 <b>Mavzu:</b> {escape(subject)}
+💬 <b>Xabar:</b> {escape(message)}
 
 📅 <b>Sana:</b> {datetime.now().strftime('%d.%m.%Y %H:%M')}
         """
         
-        send_telegram_message(telegram_message)
+        # Xabar va Telegram bildirishnomasi keyingi guruh bilan birga yoziladi
+        lead_writer.submit('contact_messages', {
+            'name': name, 'phone': phone, 'subject': subject, 'message': message,
+        }, notification=telegram_message)
+        g.submission_accepted = True
         
         flash('Xabaringiz muvaffaqiyatli yuborildi! Tez orada siz bilan bog\'lanamiz.', 'success')
         return redirect(url_for('contact'))
@@ -245,27 +493,39 @@ def contact_form():
         flash('Xabarni yuborishda xatolik yuz berdi. Iltimos, qaytadan urinib ko\'ring.', 'error')
         return redirect(url_for('contact'))
 
-@app.route('/enroll')
+def course_page():
+    # ?cursor= bo'yicha keyingi sahifa; noto'g'ri kursor bo'lsa birinchi sahifa
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    return course_catalog.page(get_current_language(), after, Config.COURSES_PAGE_SIZE)
+
+def course_fragment(template):
+    # "Ko'proq ko'rsatish" tugmasi uchun keyingi sahifa HTML bo'lagi
+    after = decode_cursor(request.args.get('cursor', ''))
+    if after is None:
+        abort(400)
+    courses, next_cursor = course_catalog.page(get_current_language(), after, Config.COURSES_PAGE_SIZE)
+    return jsonify(html=render_template(template, courses=courses), next_cursor=next_cursor)
+
+@localized_route('/enroll')
+@public_page(tags=['courses'])
 def enroll():
     try:
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return render_template('enroll.html', courses=[])
-        
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, title_uz, title_ru, title_en, description_uz, description_ru, description_en, image_path FROM courses ORDER BY created_at DESC')
-        courses = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        courses, next_cursor = course_page()
         
-        return render_template('enroll.html', courses=courses)
+        return render_template('enroll.html', courses=courses, next_cursor=next_cursor)
     except Exception as e:
         print(f"Error in enroll: {e}")
         flash('Ma\'lumotlarni yuklashda xatolik yuz berdi', 'error')
         return render_template('enroll.html', courses=[])
 
-@app.route('/enroll', methods=['POST'])
+@localized_route('/enroll/more')
+@public_page(tags=['courses'])
+def enroll_more():
+    return course_fragment('partials/course_options.html')
+
+@localized_route('/enroll', methods=['POST'])
+@guarded_form('enroll', ('full_name', 'phone', 'email', 'course_id', 'preferred_time', 'message'))
 def enroll_post():
     try:
         full_name = request.form.get('full_name')
@@ -276,33 +536,29 @@ def enroll_post():
         message = request.form.get('message')
         
         # Get course details
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT title_uz FROM courses WHERE id = ?', (course_id,))
-            course = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            course_name = course['title_uz'] if course else 'Noma\'lum kurs'
-        else:
-            course_name = 'Noma\'lum kurs'
+        course = course_catalog.get(DEFAULT_LANGUAGE, int(course_id)) if course_id and course_id.isdigit() else None
+        course_name = course.title if course else 'Noma\'lum kurs'
         
         # Send to Telegram
         telegram_message = f"""
 🎓 <b>Yangi ro'yxatdan o'tish!</b>
 
-👤 <b>Ism:</b> {full_name}
-📱 <b>Telefon:</b> {phone}
-📧 <b>Email:</b> {email}
-📚 <b>Kurs:</b> {course_name}
-⏰ <b>Vaqt:</b> {preferred_time}
-💬 <b>Xabar:</b> {message}
+👤 <b>Ism:</b> {escape(full_name or '')}
+📱 <b>Telefon:</b> {escape(phone or '')}
+📧 <b>Email:</b> {escape(email or '')}
+📚 <b>Kurs:</b> {escape(course_name)}
+⏰ <b>Vaqt:</b> {escape(preferred_time or '')}
+💬 <b>Xabar:</b> {escape(message or '')}
 
 📅 <b>Sana:</b> {datetime.now().strftime('%d.%m.%Y %H:%M')}
         """
         
-        send_telegram_message(telegram_message)
+        lead_writer.submit('enrollments', {
+            'course_id': course.id if course else None, 'course_title': course.title if course else None,
+            'full_name': full_name, 'phone': phone, 'email': email,
+            'preferred_time': preferred_time, 'message': message, 'lang': get_current_language(),
+        }, notification=telegram_message)
+        g.submission_accepted = True
         
         flash('Arizangiz muvaffaqiyatli yuborildi! Tez orada siz bilan bog\'lanamiz.', 'success')
         return redirect(url_for('enroll'))
@@ -312,39 +568,118 @@ def enroll_post():
         flash('Arizani yuborishda xatolik yuz berdi. Iltimos, qaytadan urinib ko\'ring.', 'error')
         return redirect(url_for('enroll'))
 
-@app.route('/online-courses')
+@localized_route('/online-courses')
+@public_page(tags=['courses'])
 def online_courses():
     try:
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return render_template('online_courses.html', courses=[])
-        
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM courses ORDER BY created_at DESC')
-        courses = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        courses, next_cursor = course_page()
         
-        return render_template('online_courses.html', courses=courses)
+        return render_template('online_courses.html', courses=courses, next_cursor=next_cursor)
     except Exception as e:
         print(f"Error in online_courses: {e}")
         flash('Kurslarni yuklashda xatolik yuz berdi', 'error')
         return render_template('online_courses.html', courses=[])
 
-@app.route('/course/<int:course_id>')
-def course_detail(course_id):
+@localized_route('/online-courses/more')
+@public_page(tags=['courses'])
+def online_courses_more():
+    return course_fragment('partials/course_cards.html')
+
+@localized_route('/search')
+@public_page(tags=['courses'])
+def search():
+    q = request.args.get('q', '').strip()[:200]
     try:
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return redirect(url_for('online_courses'))
+        results = course_search.search(q, get_current_language()) if q else []
+    except Exception as e:
+        print(f"Search error: {e}")
+        results = []
+    return render_template('search.html', q=q, results=results)
+
+@localized_route('/api/search/suggest')
+@public_page(tags=['courses'])
+def search_suggest():
+    q = request.args.get('q', '').strip()[:200]
+    try:
+        results = course_search.suggest(q, get_current_language()) if len(q) >= 2 else []
+    except Exception as e:
+        print(f"Search suggest error: {e}")
+        results = []
+    return jsonify([{
+        'id': r.course.id,
+        'title': r.course.title,
+        'title_html': str(r.title),
+        'snippet_html': str(r.snippet),
+        'url': url_for('course_detail', course_id=r.course.id),
+    } for r in results])
+
+def api_error(message, status):
+    return jsonify(error=message), status
+
+def api_params():
+    lang = request.args.get('lang', DEFAULT_LANGUAGE)
+    if lang not in LANGUAGES:
+        raise ValueError(f'Unknown lang: {lang}')
+    return lang, parse_fields(request.args.get('fields'))
+
+def api_response(etag, encode):
+    # ETag katalog versiyasidan olinadi: mos kelsa tana umuman kodlanmaydi
+    response = not_modified(etag)
+    if response is None:
+        response = Response(encode(), mimetype='application/json')
+        response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/v1/courses')
+def api_courses():
+    try:
+        lang, fields = api_params()
+        limit = request.args.get('limit', str(Config.API_PAGE_SIZE))
+        if not (limit.isdigit() and 1 <= int(limit) <= Config.API_MAX_PAGE_SIZE):
+            raise ValueError(f'limit must be an integer between 1 and {Config.API_MAX_PAGE_SIZE}')
+        limit = int(limit)
+        cursor = request.args.get('cursor', '')
+        after = decode_cursor(cursor) if cursor else None
+        if cursor and after is None:
+            raise ValueError('Invalid cursor')
+    except ValueError as e:
+        return api_error(str(e), 400)
+    try:
+        # Versiya ma'lumotdan oldin o'qiladi: oraliqda rebuild bo'lsa ETag eskiroq chiqadi, xolos
+        etag = make_etag(course_catalog.version, 'list', lang, fields, cursor, limit)
         
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM courses WHERE id = ?', (course_id,))
-        course = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        def encode():
+            courses, next_cursor = course_catalog.page(lang, after, limit)
+            return course_encoder.encode_page(lang, courses, next_cursor, fields)
+        
+        return api_response(etag, encode)
+    except Exception as e:
+        print(f"API courses error: {e}")
+        return api_error('Internal error', 500)
+
+@app.route('/api/v1/courses/<int:course_id>')
+def api_course(course_id):
+    try:
+        lang, fields = api_params()
+    except ValueError as e:
+        return api_error(str(e), 400)
+    try:
+        etag = make_etag(course_catalog.version, 'course', lang, fields, course_id)
+        course = course_catalog.get(lang, course_id)
+        if course is None:
+            return api_error('Course not found', 404)
+        return api_response(etag, lambda: course_encoder.encode_course(lang, course, fields))
+    except Exception as e:
+        print(f"API course error: {e}")
+        return api_error('Internal error', 500)
+
+@localized_route('/course/<int:course_id>')
+@public_page(tags=lambda course_id: [f'course:{course_id}'])
+def course_detail(course_id):
+    try:
+        course = course_catalog.get(get_current_language(), course_id)
         
         if not course:
             flash('Kurs topilmadi', 'error')
@@ -368,18 +703,12 @@ def admin_login_post():
         username = request.form.get('username')
         password = request.form.get('password')
         
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return redirect(url_for('admin'))
+        admin = db.query_one('SELECT * FROM admins WHERE username = ?', (username,))
         
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM admins WHERE username = ?', (username,))
-        admin = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with metrics.phase('auth'):
+            valid = bool(admin) and check_password_hash(admin['password_hash'], password)
         
-        if admin and check_password_hash(admin['password_hash'], password):
+        if valid:
             session['admin_logged_in'] = True
             session['admin_username'] = username
             flash('Muvaffaqiyatli kirildi!', 'success')
@@ -404,18 +733,20 @@ def admin_logout():
 @admin_required
 def admin_dashboard():
     try:
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return render_template('admin/dashboard.html', courses=[])
-        
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM courses ORDER BY created_at DESC')
-        courses = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        # Keyset sahifalash: idx_courses_created_at bo'yicha, OFFSET'siz
+        after = decode_cursor(request.args.get('cursor', ''))
+        limit = Config.ADMIN_PAGE_SIZE
+        if after:
+            rows = db.query('''
+                SELECT * FROM courses WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC LIMIT ?
+            ''', (*after, limit + 1))
+        else:
+            rows = db.query('SELECT * FROM courses ORDER BY created_at DESC, id DESC LIMIT ?', (limit + 1,))
+        courses = form_rows(db, rows[:limit])
+        next_cursor = encode_cursor(courses[-1]['created_at'], courses[-1]['id']) if len(rows) > limit else None
         
-        return render_template('admin/dashboard.html', courses=courses)
+        return render_template('admin/dashboard.html', courses=courses, next_cursor=next_cursor)
     except Exception as e:
         print(f"Error in admin_dashboard: {e}")
         flash('Kurslarni yuklashda xatolik yuz berdi', 'error')
@@ -427,58 +758,17 @@ def admin_add_course():
     if request.method == 'POST':
         try:
             # Get form data
-            title_uz = request.form.get('title_uz')
-            title_ru = request.form.get('title_ru')
-            title_en = request.form.get('title_en')
-            description_uz = request.form.get('description_uz')
-            description_ru = request.form.get('description_ru')
-            description_en = request.form.get('description_en')
-            duration_uz = request.form.get('duration_uz')
-            duration_ru = request.form.get('duration_ru')
-            duration_en = request.form.get('duration_en')
-            price_uz = request.form.get('price_uz')
-            price_ru = request.form.get('price_ru')
-            price_en = request.form.get('price_en')
-            start_date_uz = request.form.get('start_date_uz')
-            start_date_ru = request.form.get('start_date_ru')
-            start_date_en = request.form.get('start_date_en')
-            features_uz = request.form.get('features_uz')
-            features_ru = request.form.get('features_ru')
-            features_en = request.form.get('features_en')
+            translations = translations_from_form(request.form, LANGUAGES, DEFAULT_LANGUAGE)
             color = request.form.get('color')
             
             # Handle image upload
-            image_path = None
-            if 'image' in request.files:
-                file = request.files['image']
-                if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    # Add timestamp to avoid conflicts
-                    name, ext = os.path.splitext(filename)
-                    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)
-                    image_path = f"static/images/courses/{filename}"
-            
-            conn = get_db_connection()
-            if conn is None:
-                flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-                return redirect(url_for('admin_add_course'))
+            image_path = save_uploaded_image()
             
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO courses
-                (title_uz, title_ru, title_en, description_uz, description_ru, description_en,
-                 duration_uz, duration_ru, duration_en, price_uz, price_ru, price_en,
-                 start_date_uz, start_date_ru, start_date_en, features_uz, features_ru, features_en, image_path, color)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (title_uz, title_ru, title_en, description_uz, description_ru, description_en,
-                  duration_uz, duration_ru, duration_en, price_uz, price_ru, price_en,
-                  start_date_uz, start_date_ru, start_date_en, features_uz, features_ru, features_en, image_path, color))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with db.transaction() as conn:
+                course_id = insert_course(conn, translations, image_path, color)
+            on_courses_changed(course_id)
+            if image_path:
+                process_course_image(course_id, image_path)
             
             flash('Kurs muvaffaqiyatli qo\'shildi!', 'success')
             return redirect(url_for('admin_dashboard'))
@@ -494,91 +784,30 @@ def admin_add_course():
 @admin_required
 def admin_edit_course(course_id):
     try:
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return redirect(url_for('admin_dashboard'))
-        
         if request.method == 'POST':
             # Get form data
-            title_uz = request.form.get('title_uz')
-            title_ru = request.form.get('title_ru')
-            title_en = request.form.get('title_en')
-            description_uz = request.form.get('description_uz')
-            description_ru = request.form.get('description_ru')
-            description_en = request.form.get('description_en')
-            duration_uz = request.form.get('duration_uz')
-            duration_ru = request.form.get('duration_ru')
-            duration_en = request.form.get('duration_en')
-            price_uz = request.form.get('price_uz')
-            price_ru = request.form.get('price_ru')
-            price_en = request.form.get('price_en')
-            start_date_uz = request.form.get('start_date_uz')
-            start_date_ru = request.form.get('start_date_ru')
-            start_date_en = request.form.get('start_date_en')
-            features_uz = request.form.get('features_uz')
-            features_ru = request.form.get('features_ru')
-            features_en = request.form.get('features_en')
+            translations = translations_from_form(request.form, LANGUAGES, DEFAULT_LANGUAGE)
             color = request.form.get('color')
             
             # Handle image upload
-            image_path = None
-            if 'image' in request.files:
-                file = request.files['image']
-                if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    # Add timestamp to avoid conflicts
-                    name, ext = os.path.splitext(filename)
-                    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)
-                    image_path = f"static/images/courses/{filename}"
+            image_path = save_uploaded_image()
             
-            cursor = conn.cursor()
+            with db.transaction() as conn:
+                if image_path:
+                    conn.execute('UPDATE courses SET image_path = ?, color = ? WHERE id = ?', (image_path, color, course_id))
+                else:
+                    conn.execute('UPDATE courses SET color = ? WHERE id = ?', (color, course_id))
+                save_translations(conn, course_id, translations)
+            on_courses_changed(course_id)
             if image_path:
-                cursor.execute('''
-                    UPDATE courses SET
-                    title_uz = ?, title_ru = ?, title_en = ?,
-                    description_uz = ?, description_ru = ?, description_en = ?,
-                    duration_uz = ?, duration_ru = ?, duration_en = ?,
-                    price_uz = ?, price_ru = ?, price_en = ?,
-                    start_date_uz = ?, start_date_ru = ?, start_date_en = ?,
-                    features_uz = ?, features_ru = ?, features_en = ?,
-                    image_path = ?, color = ?
-                    WHERE id = ?
-                ''', (title_uz, title_ru, title_en, description_uz, description_ru, description_en,
-                      duration_uz, duration_ru, duration_en, price_uz, price_ru, price_en,
-                      start_date_uz, start_date_ru, start_date_en, features_uz, features_ru, features_en,
-                      image_path, color, course_id))
-            else:
-                cursor.execute('''
-                    UPDATE courses SET
-                    title_uz = ?, title_ru = ?, title_en = ?,
-                    description_uz = ?, description_ru = ?, description_en = ?,
-                    duration_uz = ?, duration_ru = ?, duration_en = ?,
-                    price_uz = ?, price_ru = ?, price_en = ?,
-                    start_date_uz = ?, start_date_ru = ?, start_date_en = ?,
-                    features_uz = ?, features_ru = ?, features_en = ?,
-                    color = ?
-                    WHERE id = ?
-                ''', (title_uz, title_ru, title_en, description_uz, description_ru, description_en,
-                      duration_uz, duration_ru, duration_en, price_uz, price_ru, price_en,
-                      start_date_uz, start_date_ru, start_date_en, features_uz, features_ru, features_en,
-                      color, course_id))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+                process_course_image(course_id, image_path)
             
             flash('Kurs muvaffaqiyatli yangilandi!', 'success')
             return redirect(url_for('admin_dashboard'))
         
         # GET request - show edit form
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM courses WHERE id = ?', (course_id,))
-        course = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        rows = form_rows(db, db.query('SELECT * FROM courses WHERE id = ?', (course_id,)))
+        course = rows[0] if rows else None
         
         if not course:
             flash('Kurs topilmadi', 'error')
@@ -595,16 +824,9 @@ def admin_edit_course(course_id):
 @admin_required
 def admin_delete_course(course_id):
     try:
-        conn = get_db_connection()
-        if conn is None:
-            flash('Database bilan bog\'lanishda xatolik yuz berdi', 'error')
-            return redirect(url_for('admin_dashboard'))
-        
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM courses WHERE id = ?', (course_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db.transaction() as conn:
+            conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+        on_courses_changed(course_id)
         
         flash('Kurs muvaffaqiyatli o\'chirildi!', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -614,6 +836,297 @@ def admin_delete_course(course_id):
         flash('Kursni o\'chirishda xatolik yuz berdi', 'error')
         return redirect(url_for('admin_dashboard'))
 
-if __name__ == '__main__':
+def import_flash(result):
+    if result.errors:
+        details = '; '.join(f'{number}-qator: {message}' for number, message in result.errors[:5])
+        flash(f"Import bekor qilindi ({len(result.errors)} ta xato): {details}", 'error')
+    else:
+        flash(f"Import tugadi: {result.added} ta yangi, {result.updated} ta yangilangan kurs", 'success')
+
+@app.route('/admin/courses/export')
+@admin_required
+def admin_courses_export():
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in FORMATS:
+        abort(400)
+    filename = f"courses-{datetime.now().strftime('%Y%m%d-%H%M')}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    # Katalog bo'laklab yoziladi: kurslar soni xotiraga ta'sir qilmaydi
+    return Response(stream_with_context(export_courses(db, fmt, LANGUAGES)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/admin/courses/import', methods=['POST'])
+@admin_required
+def admin_courses_import():
+    file = request.files.get('file')
+    if not (file and file.filename):
+        flash('Fayl tanlanmagan', 'error')
+        return redirect(url_for('admin_dashboard'))
+    fmt = request.form.get('format') or file.filename.rsplit('.', 1)[-1].lower()
+    if fmt not in FORMATS:
+        flash('Faqat .jsonl yoki .csv fayllar qabul qilinadi', 'error')
+        return redirect(url_for('admin_dashboard'))
+    try:
+        # Yuklangan fayl oqim sifatida o'qiladi (BOM bo'lsa tashlab yuboriladi)
+        stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+        result = import_courses(db, read_records(stream, fmt), LANGUAGES, DEFAULT_LANGUAGE, course_search)
+        if not result.errors:
+            on_courses_changed(*result.course_ids)
+        import_flash(result)
+    except Exception as e:
+        print(f"Course import error: {e}")
+        flash('Importda xatolik yuz berdi', 'error')
+    return redirect(url_for('admin_dashboard'))
+
+def inbox_filters():
+    # ?kind=enrollments|contact_messages, ?course_id=, ?date_from=/?date_to= (YYYY-MM-DD, UTC)
+    kind = request.args.get('kind', 'enrollments')
+    if kind not in INBOX_KINDS:
+        kind = 'enrollments'
+    course_id = request.args.get('course_id', '')
+    filters = {'course_id': int(course_id) if course_id.isdigit() else None}
+    for name in ('date_from', 'date_to'):
+        try:
+            filters[name] = datetime.strptime(request.args.get(name, ''), '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            filters[name] = None
+    return kind, filters
+
+@app.route('/admin/inbox')
+@admin_required
+def admin_inbox():
+    try:
+        kind, filters = inbox_filters()
+        # Shu workerning buferidagi eng yangi arizalar ham ko'rinsin
+        lead_writer.flush()
+        after = decode_cursor(request.args.get('cursor', ''))
+        limit = Config.ADMIN_PAGE_SIZE
+        sql, params = inbox_query(kind, after=after, limit=limit + 1, **filters)
+        rows = db.query(sql, params)
+        items = rows[:limit]
+        next_cursor = encode_cursor(items[-1]['created_at'], items[-1]['id']) if len(rows) > limit else None
+        
+        # Filtr uchun faqat arizasi bor kurslar
+        courses = []
+        for row in db.query(ENROLLED_COURSES_SQL):
+            course = course_catalog.get(DEFAULT_LANGUAGE, row['course_id'])
+            courses.append((row['course_id'], course.title if course else f"#{row['course_id']}"))
+        
+        return render_template('admin/inbox.html', kind=kind, items=items, next_cursor=next_cursor,
+                               filters=filters, courses=courses)
+    except Exception as e:
+        print(f"Error in admin_inbox: {e}")
+        flash('Arizalarni yuklashda xatolik yuz berdi', 'error')
+        return render_template('admin/inbox.html', kind='enrollments', items=[], next_cursor=None,
+                               filters={}, courses=[])
+
+@app.route('/admin/inbox/export.csv')
+@admin_required
+def admin_inbox_export():
+    try:
+        kind, filters = inbox_filters()
+        lead_writer.flush()
+        sql, params = inbox_query(kind, **filters)
+        # Qatorlar kursordan bo'laklab o'qiladi: jadval butunlay xotiraga olinmaydi
+        cursor = db.execute(sql, params)
+    except Exception as e:
+        print(f"Inbox export error: {e}")
+        flash('Eksportda xatolik yuz berdi', 'error')
+        return redirect(url_for('admin_inbox'))
+    filename = f"{kind}-{datetime.now().strftime('%Y%m%d-%H%M')}.csv"
+    return Response(stream_with_context(iter_csv(cursor, INBOX_KINDS[kind])), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/metrics/slow-queries')
+@admin_required
+def admin_slow_queries():
+    return jsonify(list(metrics.slow_queries))
+
+@app.route('/admin/profiles')
+@admin_required
+def admin_profiles():
+    try:
+        profiles = profile_store.endpoints()
+        endpoint = request.args.get('name') or (profiles[0]['endpoint'] if profiles else None)
+        stacks = profile_store.stacks(endpoint) if endpoint else {}
+        own, total, packages = hottest_frames(stacks)
+        return render_template('admin/profiles.html', profiles=profiles, endpoint=endpoint,
+                               sampled=sum(stacks.values()), own=own, total=total, packages=packages)
+    except Exception as e:
+        print(f"Error in admin_profiles: {e}")
+        flash('Profillarni yuklashda xatolik yuz berdi', 'error')
+        return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/profiles/<name>.collapsed')
+@admin_required
+def admin_profile_collapsed(name):
+    # Endpoint nomi url_for(endpoint=...) bilan to'qnashmasligi uchun "name"
+    return Response(collapsed(profile_store.stacks(name)), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename="{name}.collapsed"'})
+
+@app.route('/admin/profiles/<name>.speedscope.json')
+@admin_required
+def admin_profile_speedscope(name):
+    return Response(json.dumps(speedscope(name, profile_store.stacks(name))), mimetype='application/json',
+                    headers={'Content-Disposition': f'attachment; filename="{name}.speedscope.json"'})
+
+@app.route('/admin/profiles/clear', methods=['POST'])
+@admin_required
+def admin_profiles_clear():
+    try:
+        profile_store.clear()
+        flash('Profillar tozalandi', 'success')
+    except Exception as e:
+        print(f"Profile clear error: {e}")
+        flash('Profillarni tozalashda xatolik yuz berdi', 'error')
+    return redirect(url_for('admin_profiles'))
+
+def warm_caches():
+    # gunicorn preload: master'da bir marta to'ldiriladi, workerlar fork'dan keyin
+    # copy-on-write bo'lishadi va birinchi so'rov ham tayyor keshga tushadi
+    start = time.perf_counter()
+    catalog.load_all()
+    templates = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for lang in LANGUAGES:
+        env = localized_templates.environment(app.jinja_env, lang)
+        for name in templates:
+            env.get_template(name)
+        # Katalog va API uchun oldindan kodlangan kurslar
+        course_encoder.encode_page(lang, course_catalog.all(lang), None)
+    for course in course_catalog.all(DEFAULT_LANGUAGE):
+        if course.image_path:
+            image_pipeline.meta(course.image_path)
+    # Fork'dan oldin ulanish yopiladi: har bir worker o'zinikini ochadi
+    db.close()
+    print(f"Caches warmed in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({len(templates)} templates x {len(LANGUAGES)} languages, {len(course_catalog.all(DEFAULT_LANGUAGE))} courses)")
+
+def create_app(bootstrap=True, warm=True):
+    """The application for gunicorn (``main:create_app()``, see gunicorn.conf.py).
+
+    Brings the database up to date (a few reads when nothing is left to
+    do) and fills the translation, template and course caches, so with
+    ``preload_app`` this runs once in the master before workers fork.
+    """
+    if bootstrap:
+        init_db()
+    if warm:
+        warm_caches()
+    return app
+
+@app.cli.command('bootstrap')
+def bootstrap_command():
+    """Bazani yangilash (migratsiyalar, qidiruv indeksi, admin, standart kurslar)."""
+    start = time.perf_counter()
     init_db()
-    app.run(debug=True)
\ No newline at end of file
+    print(f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+def file_format(path, fmt):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension not in FORMATS:
+        raise click.UsageError('--format kerak (jsonl yoki csv)')
+    return extension
+
+def open_text(path, mode, encoding):
+    # "-" stdin/stdout; CSV uchun newline='' (maydon ichidagi qator oxirlari o'zgarmasin)
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        return io.TextIOWrapper(stream.buffer, encoding=encoding, newline='', write_through=True)
+    return open(path, mode, encoding=encoding, newline='')
+
+@app.cli.command('export-courses')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help="Standart: fayl kengaytmasidan, stdout uchun jsonl.")
+@click.option('--output', default='-', show_default=True, help='Fayl yoki stdout uchun "-".')
+def export_courses_command(fmt, output):
+    """Barcha kurslarni JSON Lines yoki CSV ko'rinishida chiqarish."""
+    fmt = fmt or ('jsonl' if output == '-' else file_format(output, None))
+    with open_text(output, 'w', 'utf-8') as f:
+        for chunk in export_courses(db, fmt, LANGUAGES):
+            f.write(chunk)
+
+@app.cli.command('import-courses')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Standart: fayl kengaytmasidan.')
+def import_courses_command(path, fmt):
+    """Kurslarni JSON Lines yoki CSV fayldan qo'shish/yangilash (id bo'yicha, bitta tranzaksiyada)."""
+    fmt = file_format(path, fmt) if path != '-' else fmt or 'jsonl'
+    start = time.perf_counter()
+    with open_text(path, 'r', 'utf-8-sig') as f:
+        result = import_courses(db, read_records(f, fmt), LANGUAGES, DEFAULT_LANGUAGE, course_search)
+    if result.errors:
+        for number, message in result.errors:
+            print(f"{path}:{number}: {message}")
+        raise click.ClickException('Import bekor qilindi, hech narsa yozilmadi')
+    on_courses_changed(*result.course_ids)
+    print(f"{result.added} added, {result.updated} updated in {time.perf_counter() - start:.1f} s")
+
+@app.cli.command('freeze')
+@click.option('--output', default=lambda: Config.FREEZE_DIR, help='Standart: FREEZE_DIR.')
+@click.option('--base-url', default=lambda: Config.SITE_URL, show_default='SITE_URL',
+              help="hreflang havolalari uchun sayt manzili.")
+@click.option('--jobs', default=lambda: os.cpu_count() or 1, show_default='CPU soni', type=int,
+              help='Parallel siqish uchun threadlar.')
+def freeze_command(output, base_url, jobs):
+    """Public sahifalarni har bir til uchun statik HTML (.gz/.br bilan) qilib yozish."""
+    if not output:
+        raise click.UsageError('--output yoki FREEZE_DIR kerak')
+    start = time.perf_counter()
+    freezer = SiteFreezer(app, output, LANGUAGES, base_url)
+    course_ids = [row['id'] for row in db.query('SELECT id FROM courses ORDER BY id')]
+    written, removed = freezer.freeze(course_ids, jobs)
+    print(f"{written} pages written, {removed} stale files removed in {time.perf_counter() - start:.1f} s")
+
+@app.cli.command('process-images')
+def process_images_command():
+    """Mavjud kurs rasmlari uchun derivativlarni yaratish."""
+    for row in db.query('SELECT DISTINCT image_path FROM courses WHERE image_path IS NOT NULL'):
+        image_path = row['image_path']
+        if not os.path.exists(os.path.join(app.root_path, image_path)):
+            continue
+        if is_upload(image_path):
+            # Fon ishi tugamay qolgan yuklama (masalan, server qayta ishga tushgan)
+            image_path = image_pipeline.finish(image_path)
+            with db.transaction() as conn:
+                use_final_image(conn, row['image_path'], image_path)
+        image_pipeline.process(image_path)
+        print(f"Processed {image_path}")
+    page_cache.clear()
+
+@app.cli.command('gc-images')
+@click.option('--dry-run', is_flag=True, help="Faqat ro'yxatni chiqarish, o'chirmaslik.")
+@click.option('--min-age', default=3600, show_default=True, help='Shundan yangi fayllarga tegilmaydi (soniya).')
+def gc_images_command(dry_run, min_age):
+    """Hech bir kursga bog'lanmagan rasmlarni o'chirish."""
+    referenced = [row['image_path'] for row in db.query('SELECT DISTINCT image_path FROM courses WHERE image_path IS NOT NULL')]
+    removed = image_pipeline.collect_garbage(referenced, min_age=min_age, dry_run=dry_run)
+    for name in removed:
+        print(f"{'Would remove' if dry_run else 'Removed'} {name}")
+    print(f"{len(removed)} file(s)")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Tailwind, Font Awesome va AOS'ni static/dist ichiga yig'ish."""
+    builder = AssetBuilder(
+        app.root_path, app.static_folder, os.path.join(app.root_path, app.template_folder),
+        cache_dir=os.path.join(app.root_path, app.config['ASSET_CACHE_DIR']),
+        tailwind_bin=app.config['TAILWINDCSS_BIN'],
+        asset_prefix=asset_manifest.url_prefix,
+    )
+    # Kurs ranglari bazada saqlanadi - ularni ham Tailwind'ga beramiz
+    colors = [row['color'] for row in db.query('SELECT DISTINCT color FROM courses WHERE color IS NOT NULL')]
+    try:
+        sizes = builder.build(extra_classes=colors)
+    except AssetBuildError as e:
+        raise click.ClickException(str(e))
+    for logical, size in sizes.items():
+        print(f"{logical}: {size} bytes")
+
+if __name__ == '__main__':
+    create_app(warm=False).run(debug=True)
\ No newline at end of file
@@ -0,0 +1,250 @@
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+PHASES = ('db', 'render', 'http', 'auth')
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH', 'REPLACE')
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for le, n in zip(self.buckets + (float('inf'),), self.counts):
+            total += n
+            yield le, total
+
+
+def _format_le(le):
+    return '+Inf' if le == float('inf') else repr(le)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+class Metrics:
+    """In-process request metrics in Prometheus text format.
+
+    ``start_request()``/``finish_request()`` time each request per endpoint.
+    Inside a request, ``phase('render')`` etc. and ``record_query()`` (the
+    ``on_query`` hook of ``Database``) add to a per-thread breakdown;
+    phases are exclusive, so DB time spent inside a render is counted as
+    ``db`` only and the rest of the request shows up as ``other``.
+    Statements slower than ``slow_query_ms`` are printed with their
+    ``EXPLAIN QUERY PLAN`` and kept in ``slow_queries``.
+
+    The cost per request is a handful of ``perf_counter()`` calls and one
+    short lock, so it stays on in production. Each gunicorn worker keeps
+    its own numbers.
+    """
+
+    def __init__(self, slow_query_ms=100, slow_query_log_size=100):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.slow_queries = deque(maxlen=slow_query_log_size)
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._requests = {}     # (endpoint, method) -> Histogram
+        self._errors = {}       # endpoint -> count
+        self._phases = {}       # (endpoint, phase) -> seconds
+        self._queries = {}      # endpoint -> count
+        self._query_hist = Histogram(QUERY_BUCKETS)
+        self._slow_total = 0
+        self._outbound = {}     # (target, status) -> Histogram
+        self._gauges = {}       # name -> (help, callable, kind)
+
+    # --- per request ---
+
+    def start_request(self):
+        local = self._local
+        local.start = time.perf_counter()
+        local.phases = dict.fromkeys(PHASES, 0.0)
+        local.queries = 0
+        local.stack = []
+
+    def finish_request(self, endpoint, method, error=False):
+        local = self._local
+        start = getattr(local, 'start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        local.start = None
+        phases = local.phases
+        phases['other'] = max(0.0, elapsed - sum(phases.values()))
+        endpoint = endpoint or 'not_found'
+        with self._lock:
+            hist = self._requests.get((endpoint, method))
+            if hist is None:
+                hist = self._requests[(endpoint, method)] = Histogram(REQUEST_BUCKETS)
+            hist.observe(elapsed)
+            for name, seconds in phases.items():
+                if seconds:
+                    key = (endpoint, name)
+                    self._phases[key] = self._phases.get(key, 0.0) + seconds
+            if local.queries:
+                self._queries[endpoint] = self._queries.get(endpoint, 0) + local.queries
+            if error:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    def _add_phase(self, name, seconds):
+        local = self._local
+        if getattr(local, 'start', None) is None:
+            return
+        stack = local.stack
+        if stack:
+            # Ichki faza tashqi fazadan ayriladi
+            stack[-1][1] += seconds
+        local.phases[name] = local.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        local = self._local
+        if getattr(local, 'start', None) is None:
+            yield
+            return
+        frame = [name, 0.0]
+        local.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            local.stack.pop()
+            self._add_phase(name, elapsed - frame[1])
+            if local.stack:
+                # _add_phase ota fazaga faqat o'z vaqtini qo'shdi; bolalarniki ham kerak
+                local.stack[-1][1] += frame[1]
+
+    # --- database ---
+
+    def record_query(self, conn, sql, params, seconds):
+        self._add_phase('db', seconds)
+        local = self._local
+        if getattr(local, 'start', None) is not None:
+            local.queries += 1
+        with self._lock:
+            self._query_hist.observe(seconds)
+        if seconds >= self.slow_query_seconds:
+            self._log_slow_query(conn, sql, params, seconds)
+
+    def _log_slow_query(self, conn, sql, params, seconds):
+        plan = []
+        if sql.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                # Asosiy execute'ni chetlab o'tamiz, aks holda EXPLAIN ham o'lchanadi
+                rows = sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+                plan = [row[-1] for row in rows]
+            except sqlite3.Error as e:
+                plan = [f'(explain failed: {e})']
+        entry = {
+            'time': time.time(),
+            'seconds': round(seconds, 6),
+            'sql': ' '.join(sql.split()),
+            'plan': plan,
+        }
+        with self._lock:
+            self._slow_total += 1
+            self.slow_queries.append(entry)
+        print(f"Slow query ({seconds * 1000:.1f} ms): {entry['sql']}\n  plan: {' | '.join(plan) or '-'}")
+
+    # --- outbound HTTP (fon threadlari ham) ---
+
+    def record_outbound(self, target, status, seconds):
+        self._add_phase('http', seconds)
+        with self._lock:
+            key = (target, str(status))
+            hist = self._outbound.get(key)
+            if hist is None:
+                hist = self._outbound[key] = Histogram(REQUEST_BUCKETS)
+            hist.observe(seconds)
+
+    def gauge(self, name, help_text, func, kind='gauge'):
+        # Qiymati scrape paytida func() dan olinadi
+        self._gauges[name] = (help_text, func, kind)
+
+    # --- export ---
+
+    def render(self):
+        out = []
+        with self._lock:
+            out.append('# HELP muhib_http_request_duration_seconds Request latency by endpoint.')
+            out.append('# TYPE muhib_http_request_duration_seconds histogram')
+            for (endpoint, method), hist in sorted(self._requests.items()):
+                self._render_histogram(out, 'muhib_http_request_duration_seconds', hist,
+                                       endpoint=endpoint, method=method)
+
+            out.append('# HELP muhib_http_request_errors_total Requests that raised an exception.')
+            out.append('# TYPE muhib_http_request_errors_total counter')
+            for endpoint, n in sorted(self._errors.items()):
+                out.append(f'muhib_http_request_errors_total{{{_labels(endpoint=endpoint)}}} {n}')
+
+            out.append('# HELP muhib_http_request_phase_seconds_total Request time split into db, render, http, auth and other.')
+            out.append('# TYPE muhib_http_request_phase_seconds_total counter')
+            for (endpoint, name), seconds in sorted(self._phases.items()):
+                out.append(f'muhib_http_request_phase_seconds_total{{{_labels(endpoint=endpoint, phase=name)}}} {seconds:.6f}')
+
+            out.append('# HELP muhib_db_queries_total SQL statements executed while serving requests.')
+            out.append('# TYPE muhib_db_queries_total counter')
+            for endpoint, n in sorted(self._queries.items()):
+                out.append(f'muhib_db_queries_total{{{_labels(endpoint=endpoint)}}} {n}')
+
+            out.append('# HELP muhib_db_query_duration_seconds Duration of every SQL statement.')
+            out.append('# TYPE muhib_db_query_duration_seconds histogram')
+            self._render_histogram(out, 'muhib_db_query_duration_seconds', self._query_hist)
+
+            out.append('# HELP muhib_db_slow_queries_total Statements slower than the slow query threshold.')
+            out.append('# TYPE muhib_db_slow_queries_total counter')
+            out.append(f'muhib_db_slow_queries_total {self._slow_total}')
+
+            out.append('# HELP muhib_outbound_http_duration_seconds Outbound HTTP calls by target and status.')
+            out.append('# TYPE muhib_outbound_http_duration_seconds histogram')
+            for (target, status), hist in sorted(self._outbound.items()):
+                self._render_histogram(out, 'muhib_outbound_http_duration_seconds', hist,
+                                       target=target, status=status)
+
+        for name, (help_text, func, kind) in sorted(self._gauges.items()):
+            try:
+                value = func()
+            except Exception as e:
+                print(f"Metrics gauge error ({name}): {e}")
+                continue
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            out.append(f'{name} {value}')
+
+        out.append('# HELP muhib_process_start_time_seconds Start time of this worker.')
+        out.append('# TYPE muhib_process_start_time_seconds gauge')
+        out.append(f'muhib_process_start_time_seconds {self.started_at:.3f}')
+        return '\n'.join(out) + '\n'
+
+    @staticmethod
+    def _render_histogram(out, name, hist, **labels):
+        prefix = _labels(**labels)
+        sep = ',' if prefix else ''
+        for le, total in hist.cumulative():
+            out.append(f'{name}_bucket{{{prefix}{sep}le="{_format_le(le)}"}} {total}')
+        suffix = f'{{{prefix}}}' if prefix else ''
+        out.append(f'{name}_sum{suffix} {hist.sum:.6f}')
+        out.append(f'{name}_count{suffix} {hist.count}')
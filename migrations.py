@@ -0,0 +1,250 @@
+import json
+
+import search
+
+# Migratsiyalar ro'yxati tartib bilan qo'llanadi: N-migratsiyadan keyin
+# PRAGMA user_version = N. Yangi o'zgarish faqat ro'yxat oxiriga qo'shiladi,
+# qo'llangan migratsiya keyin tahrirlanmaydi.
+
+
+def initial_schema(conn):
+    """Schema as it was before versioning (idempotent for existing databases)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title_uz TEXT NOT NULL,
+            title_ru TEXT,
+            title_en TEXT,
+            description_uz TEXT NOT NULL,
+            description_ru TEXT,
+            description_en TEXT,
+            duration_uz TEXT NOT NULL,
+            duration_ru TEXT,
+            duration_en TEXT,
+            price_uz TEXT NOT NULL,
+            price_ru TEXT,
+            price_en TEXT,
+            start_date_uz TEXT NOT NULL,
+            start_date_ru TEXT,
+            start_date_en TEXT,
+            features_uz TEXT,
+            features_ru TEXT,
+            features_en TEXT,
+            image_path TEXT,
+            color TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Eski bazalarda image_path ustuni bo'lmasligi mumkin
+    if 'image_path' not in _columns(conn, 'courses'):
+        conn.execute('ALTER TABLE courses ADD COLUMN image_path TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courses_created_at ON courses (created_at, id)')
+
+
+def course_translations(conn):
+    """Move the per-language ``<field>_<lang>`` columns into ``course_translations``.
+
+    One row per (course, language), features as a JSON array. ``courses``
+    is rebuilt with the language independent columns only; ids and the
+    AUTOINCREMENT counter are kept.
+    """
+    fields = ('title', 'description', 'duration', 'price', 'start_date', 'features')
+    columns = _columns(conn, 'courses')
+    langs = [c[len('title_'):] for c in columns if c.startswith('title_')]
+    rows = conn.execute('SELECT * FROM courses').fetchall()
+
+    translations = []
+    for row in rows:
+        for lang in langs:
+            values = {name: row[f'{name}_{lang}'] if f'{name}_{lang}' in columns else None for name in fields}
+            if not any(values.values()):
+                continue
+            # "a, b, c" matni JSON massivga aylantiriladi
+            items = [item.strip() for item in (values['features'] or '').split(',') if item.strip()]
+            values['features'] = json.dumps(items, ensure_ascii=False) if items else None
+            translations.append((row['id'], lang, *(values[name] for name in fields)))
+
+    conn.execute('''
+        CREATE TABLE courses_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_path TEXT,
+            color TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('INSERT INTO courses_new (id, image_path, color, created_at) '
+                 'SELECT id, image_path, color, created_at FROM courses')
+    # O'chirilgan kurslarning id'lari qayta ishlatilmasligi uchun hisoblagich ko'chiriladi
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'courses_new'")
+    conn.execute("UPDATE sqlite_sequence SET name = 'courses_new' WHERE name = 'courses'")
+    # Eski qidiruv indeksi har til uchun alohida ustunli edi - qayta quriladi
+    conn.execute('DROP TABLE IF EXISTS course_search')
+    conn.execute('DROP TABLE courses')
+    conn.execute('ALTER TABLE courses_new RENAME TO courses')
+    conn.execute('CREATE INDEX idx_courses_created_at ON courses (created_at, id)')
+
+    # (course_id, lang) kaliti jadvalning o'zi: bitta tilni o'qish qo'shimcha qidiruvsiz
+    conn.execute('''
+        CREATE TABLE course_translations (
+            course_id INTEGER NOT NULL REFERENCES courses (id) ON DELETE CASCADE,
+            lang TEXT NOT NULL,
+            title TEXT,
+            description TEXT,
+            duration TEXT,
+            price TEXT,
+            start_date TEXT,
+            features TEXT,
+            PRIMARY KEY (course_id, lang)
+        ) WITHOUT ROWID
+    ''')
+    conn.executemany('''
+        INSERT INTO course_translations
+        (course_id, lang, title, description, duration, price, start_date, features)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', translations)
+
+
+def leads(conn):
+    """``enrollments`` and ``contact_messages`` for the admin inbox."""
+    # Kurs o'chirilsa ariza qoladi: nomi course_title'da saqlangan
+    conn.execute('''
+        CREATE TABLE enrollments (
+            id INTEGER PRIMARY KEY,
+            course_id INTEGER REFERENCES courses (id) ON DELETE SET NULL,
+            course_title TEXT,
+            full_name TEXT,
+            phone TEXT,
+            email TEXT,
+            preferred_time TEXT,
+            message TEXT,
+            lang TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_enrollments_created_at ON enrollments (created_at, id)')
+    # Kurs bo'yicha filtr va ON DELETE SET NULL uchun
+    conn.execute('CREATE INDEX idx_enrollments_course ON enrollments (course_id, created_at, id)')
+    conn.execute('''
+        CREATE TABLE contact_messages (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            phone TEXT,
+            subject TEXT,
+            message TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_contact_messages_created_at ON contact_messages (created_at, id)')
+
+
+def catalog_version(conn):
+    """A single-row counter bumped by triggers on every course change.
+
+    Every worker compares it with the version its in-memory caches were
+    built from, so a change committed by another process (or the CLI) is
+    noticed on the next request.
+    """
+    conn.execute('''
+        CREATE TABLE catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT INTO catalog_version (id, version) VALUES (1, 1)')
+    for table in ('courses', 'course_translations'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER catalog_version_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+
+def request_profiles(conn):
+    """Sampled request profiles (profiler.py), aggregated per endpoint by every worker."""
+    # IF NOT EXISTS: bu jadvallar avval init_db'da migratsiyasiz yaratilgan bazalar uchun
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS profiles (
+            endpoint TEXT PRIMARY KEY,
+            requests INTEGER NOT NULL DEFAULT 0,
+            seconds REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP
+        )
+    ''')
+    # weight - mikrosekund; stack - collapsed ko'rinishda ("a;b;c")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS profile_stacks (
+            endpoint TEXT NOT NULL,
+            stack TEXT NOT NULL,
+            weight INTEGER NOT NULL,
+            PRIMARY KEY (endpoint, stack)
+        ) WITHOUT ROWID
+    ''')
+
+
+def telegram_outbox(conn):
+    """The durable Telegram notification queue (outbox.py)."""
+    # IF NOT EXISTS: jadval avval init_db'da migratsiyasiz yaratilgan bazalar uchun
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS telegram_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_telegram_outbox_due
+        ON telegram_outbox (status, next_attempt_at)
+    ''')
+
+
+def course_search(conn):
+    """The FTS5 course search index and the triggers that keep it current (search.py)."""
+    # Avval init_db'da yaratilgan indeks tayyor bo'lsa create_schema() hech narsa qilmaydi
+    search.create_schema(conn)
+
+
+MIGRATIONS = [
+    initial_schema,
+    course_translations,
+    leads,
+    catalog_version,
+    request_profiles,
+    telegram_outbox,
+    course_search,
+]
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply the migrations newer than ``PRAGMA user_version``.
+
+    Must run inside a transaction: a failing migration rolls back
+    together with its version bump. Returns the resulting version.
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version > len(migrations):
+        print(f"Database schema version {version} is newer than this code ({len(migrations)})")
+        return version
+    for number, migration in enumerate(migrations[version:], version + 1):
+        migration(conn)
+        conn.execute(f'PRAGMA user_version = {number}')
+        print(f"Migration {number} ({migration.__name__}) applied")
+    return max(version, len(migrations))
@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+BATCH_SEPARATOR = '\n\n━━━━━━━━━━\n\n'
+
+
+class TelegramOutbox:
+    """Durable Telegram notification queue.
+
+    ``enqueue()`` only inserts a row into ``telegram_outbox``; a daemon
+    thread per process claims due rows, delivers them over a pooled
+    ``requests.Session`` and retries failures with exponential backoff.
+    A 429 from Telegram pauses the sender for ``retry_after`` seconds.
+    Claimed rows get a lease, so several gunicorn workers can run senders
+    against the same database without sending a message twice, and rows
+    left behind by a crashed worker are picked up again. The table comes
+    from the ``telegram_outbox`` migration.
+    """
+
+    def __init__(self, db, token, chat_id, api_url='https://api.telegram.org',
+                 timeout=(3.05, 10), max_attempts=8, backoff_base=2.0, backoff_max=600.0,
+                 batch_size=1, poll_interval=5.0, lease=60.0, on_request=None):
+        self.db = db
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.on_request = on_request  # (status, seconds) - o'lchovlar uchun
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._session = None
+        self._paused_until = 0.0
+        self._start_lock = threading.Lock()
+
+    @property
+    def configured(self):
+        return bool(self.token and self.chat_id)
+
+    def enqueue(self, text):
+        with self.db.transaction() as conn:
+            self.add(conn, text)
+        self.notify()
+        return True
+
+    def add(self, conn, text):
+        # Chaqiruvchining tranzaksiyasi ichida; commit'dan keyin notify() chaqiriladi
+        conn.execute('INSERT INTO telegram_outbox (chat_id, text) VALUES (?, ?)',
+                     (str(self.chat_id or ''), text))
+
+    def notify(self):
+        self.ensure_started()
+        self._wakeup.set()
+
+    # --- background sender ---
+
+    def ensure_started(self):
+        if not self.configured:
+            return
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            # Fork'dan keyin (gunicorn) thread va session qaytadan yaratiladi
+            self._pid = os.getpid()
+            self._session = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='telegram-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.process_due():
+                    continue
+                timeout = self._idle_timeout()
+            except Exception as e:
+                print(f"Telegram outbox error: {e}")
+                timeout = self.poll_interval
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _idle_timeout(self):
+        # Keyingi xabar vaqti kelguncha (ko'pi bilan poll_interval) kutamiz
+        row = self.db.query_one(
+            "SELECT MIN(next_attempt_at) FROM telegram_outbox WHERE status IN ('pending', 'sending')")
+        if row is None or row[0] is None:
+            return self.poll_interval
+        due = max(row[0], self._paused_until) - time.time()
+        return min(max(due, 0.05), self.poll_interval)
+
+    def session(self):
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+
+    def claim(self, now=None):
+        now = time.time() if now is None else now
+        with self.db.transaction() as conn:
+            rows = conn.execute('''
+                SELECT id, chat_id, text, attempts FROM telegram_outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY id
+                LIMIT ?
+            ''', (now, self.batch_size)).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE telegram_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                    [(now + self.lease, row['id']) for row in rows])
+        return rows
+
+    def process_due(self):
+        now = time.time()
+        if now < self._paused_until:
+            return 0
+        rows = self.claim(now)
+        if not rows:
+            return 0
+        for batch in self._batches(rows):
+            self._deliver(batch)
+        return len(rows)
+
+    def _batches(self, rows):
+        # Bir chatga ketadigan xabarlar 4096 belgidan oshmagan holda birlashtiriladi
+        batch, length = [], 0
+        for row in rows:
+            extra = len(row['text']) + (len(BATCH_SEPARATOR) if batch else 0)
+            if batch and (row['chat_id'] != batch[0]['chat_id'] or length + extra > TELEGRAM_MESSAGE_LIMIT):
+                yield batch
+                batch, length = [], 0
+                extra = len(row['text'])
+            batch.append(row)
+            length += extra
+        if batch:
+            yield batch
+
+    def _deliver(self, batch):
+        text = BATCH_SEPARATOR.join(row['text'] for row in batch)
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        data = {"chat_id": batch[0]['chat_id'], "text": text, "parse_mode": "HTML"}
+        ids = [row['id'] for row in batch]
+        start = time.perf_counter()
+        try:
+            response = self.session().post(url, data=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._observe('error', start)
+            self._retry(batch, str(e))
+            return False
+        self._observe(response.status_code, start)
+
+        if response.status_code == 200:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "UPDATE telegram_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ?",
+                    [(i,) for i in ids])
+            return True
+
+        if response.status_code == 429:
+            retry_after = self._retry_after(response)
+            self._paused_until = time.time() + retry_after
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "UPDATE telegram_outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    [(self._paused_until, 'rate limited', i) for i in ids])
+            return False
+
+        error = f"HTTP {response.status_code}: {response.text[:200]}"
+        if 400 <= response.status_code < 500:
+            # Qayta yuborish foyda bermaydi (noto'g'ri token, chat va h.k.)
+            self._fail(ids, error)
+        else:
+            self._retry(batch, error)
+        return False
+
+    def _observe(self, status, start):
+        if self.on_request is not None:
+            self.on_request(status, time.perf_counter() - start)
+
+    def _retry_after(self, response):
+        try:
+            return float(response.json().get('parameters', {}).get('retry_after', 1))
+        except ValueError:
+            return float(response.headers.get('Retry-After', 1))
+
+    def _retry(self, batch, error):
+        now = time.time()
+        params = []
+        for row in batch:
+            attempts = row['attempts'] + 1
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            delay = min(self.backoff_base ** attempts, self.backoff_max)
+            params.append((status, attempts, now + delay, error, row['id']))
+        with self.db.transaction() as conn:
+            conn.executemany('''
+                UPDATE telegram_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+            ''', params)
+        print(f"Telegram message error: {error}")
+
+    def _fail(self, ids, error):
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "UPDATE telegram_outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(error, i) for i in ids])
+        print(f"Telegram message error: {error}")
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, session, Response, make_response
+
+
+class CachedPage:
+    __slots__ = ('body', 'mimetype', 'etag', 'tags')
+
+    def __init__(self, body, mimetype, etag, tags):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.tags = tags
+
+
+class PageCache:
+    """Bounded LRU cache of rendered pages with tag based invalidation."""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._pages = OrderedDict()
+        self._tags = {}  # tag -> set(keys)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, page):
+        if len(page.body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._pages[key] = page
+            self._size += len(page.body)
+            for tag in page.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._pages and (len(self._pages) > self.max_entries or self._size > self.max_bytes):
+                self._discard(next(iter(self._pages)))
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._pages)
+
+    def _discard(self, key):
+        page = self._pages.pop(key, None)
+        if page is None:
+            return
+        self._size -= len(page.body)
+        for tag in page.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def has_session_cookie():
+    # Cookie'siz so'rovda sessiya bo'sh: unga tegilmasa Flask "Vary: Cookie" qo'shmaydi
+    return current_app.config['SESSION_COOKIE_NAME'] in request.cookies
+
+
+def make_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def not_modified(etag):
+    """A 304 response if ``If-None-Match`` matches ``etag``, else None."""
+    # Siqilgan javoblar ETag'iga kodlash qo'shiladi ("<etag>-gzip"), shuning
+    # uchun If-None-Match barcha variantlar bilan solishtiriladi
+    for variant in (etag, f'{etag}-br', f'{etag}-gzip'):
+        if request.if_none_match.contains(variant):
+            response = Response(status=304)
+            response.set_etag(variant)
+            response.vary.add('Accept-Encoding')
+            return response
+    return None
+
+
+def conditional_response(page):
+    response = not_modified(page.etag)
+    if response is not None:
+        return response
+    response = Response(page.body, mimetype=page.mimetype)
+    response.set_etag(page.etag)
+    return response
+
+
+def shared_cache_headers(response, max_age, shared_max_age):
+    # Sessiya o'qilgan javob (flash, admin) faqat shu mijozniki
+    if session.accessed:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    elif shared_max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.s_maxage = shared_max_age
+    return response
+
+
+def cached_page(cache, key_func, tags=(), max_age=0, shared_max_age=None):
+    """Serve a GET view from ``cache``.
+
+    ``key_func()`` returns the per-request part of the key (e.g. the
+    language); ``tags`` is a list of tags or a callable receiving the view
+    arguments. Requests with pending flash messages bypass the cache, and
+    only plain 200 responses that don't touch the session are stored.
+    The session is only looked at when the request has a session cookie,
+    so anonymous responses stay cookie-free and, with ``shared_max_age``,
+    are marked ``public`` for nginx or a CDN.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+            if has_session_cookie() and '_flashes' in session:
+                return shared_cache_headers(make_response(f(*args, **kwargs)), max_age, None)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   request.query_string, key_func())
+            page = cache.get(key)
+            if page is not None:
+                return shared_cache_headers(conditional_response(page), max_age, shared_max_age)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or session.modified or response.direct_passthrough:
+                return shared_cache_headers(response, max_age, None)
+
+            body = response.get_data()
+            page_tags = tags(**kwargs) if callable(tags) else tags
+            page = CachedPage(body, response.mimetype, make_etag(body), tuple(page_tags))
+            cache.put(key, page)
+            return shared_cache_headers(conditional_response(page), max_age, shared_max_age)
+        return decorated_function
+    return decorator
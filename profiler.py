@@ -0,0 +1,233 @@
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode
+
+# ?_profile=1 yoki "X-Profile: 1" sarlavhasi (faqat admin sessiyasi bilan)
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+UNMATCHED = '<unmatched>'
+
+_labels = {}  # code -> "modul:funksiya"
+
+
+def frame_label(frame):
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename.replace('\\', '/')
+        if '/templates/' in filename:
+            # Jinja shabloni: "templates/course_detail.html:block_content"
+            module = 'templates/' + filename.rsplit('/templates/', 1)[1]
+        else:
+            module = frame.f_globals.get('__name__') or filename
+        # Collapsed formatda ";" kadrlarni, bo'shliq esa og'irlikni ajratadi
+        label = _labels[code] = f'{module}:{code.co_name}'.replace(';', ',').replace(' ', '_')
+    return label
+
+
+class Sampler:
+    """Samples one thread's Python stack from a helper thread.
+
+    Every ``interval`` seconds the stack of ``thread_id`` above ``root``
+    is recorded with the time since the previous sample as its weight,
+    in microseconds. The sampler needs the GIL, so while the profiled
+    thread runs pure Python it is sampled at the interpreter's switch
+    interval (5 ms) rather than ``interval``; the weights keep the totals
+    right. Calls that release the GIL (SQLite, file I/O) are sampled on
+    time and show up under the Python frame that made them.
+    """
+
+    def __init__(self, thread_id, root, interval=0.001):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if self._stop.is_set():
+                break  # profillangan thread allaqachon stop() -> join() ichida
+            now = time.perf_counter()
+            weight, last = int((now - last) * 1e6), now
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[';'.join(stack)] += weight
+
+
+class ProfileStore:
+    """Request profiles aggregated per endpoint in SQLite, shared by all workers.
+
+    The tables come from the ``request_profiles`` migration.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def add(self, endpoint, seconds, stacks):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                INSERT INTO profiles (endpoint, requests, seconds, updated_at) VALUES (?, 1, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (endpoint) DO UPDATE SET
+                    requests = requests + 1, seconds = seconds + excluded.seconds, updated_at = excluded.updated_at
+            ''', (endpoint, seconds))
+            conn.executemany('''
+                INSERT INTO profile_stacks (endpoint, stack, weight) VALUES (?, ?, ?)
+                ON CONFLICT (endpoint, stack) DO UPDATE SET weight = weight + excluded.weight
+            ''', [(endpoint, stack, weight) for stack, weight in stacks.items()])
+
+    def endpoints(self):
+        return self.db.query('''
+            SELECT p.endpoint, p.requests, p.seconds, p.updated_at,
+                   (SELECT COALESCE(SUM(weight), 0) FROM profile_stacks s WHERE s.endpoint = p.endpoint) AS sampled
+            FROM profiles p
+            ORDER BY p.seconds DESC
+        ''')
+
+    def stacks(self, endpoint):
+        return {row['stack']: row['weight'] for row in self.db.query(
+            'SELECT stack, weight FROM profile_stacks WHERE endpoint = ?', (endpoint,))}
+
+    def clear(self):
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM profile_stacks')
+            conn.execute('DELETE FROM profiles')
+
+
+# --- natijalar ---
+
+def collapsed(stacks):
+    """Brendan Gregg's collapsed format (flamegraph.pl, speedscope, inferno)."""
+    return ''.join(f'{stack} {weight}\n' for stack, weight in sorted(stacks.items()))
+
+
+def speedscope(name, stacks):
+    """A sampled speedscope profile (https://www.speedscope.app) with weights in microseconds."""
+    frames, index, samples, weights = [], {}, [], []
+    for stack, weight in sorted(stacks.items()):
+        sample = []
+        for label in stack.split(';'):
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({'name': label})
+            sample.append(index[label])
+        samples.append(sample)
+        weights.append(weight)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'muhib-academy',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled', 'name': name, 'unit': 'microseconds',
+            'startValue': 0, 'endValue': sum(weights), 'samples': samples, 'weights': weights,
+        }],
+    }
+
+
+def hottest_frames(stacks, limit=20):
+    """``(self, total, packages)`` lists of ``(name, microseconds)``, largest first.
+
+    ``self`` counts a frame when it is on top of the stack, ``total``
+    whenever it is on the stack (once per sample, so recursion is not
+    counted twice), ``packages`` groups self time by top-level module:
+    ``jinja2``, ``templates/...``, ``werkzeug``, ``db`` (time inside
+    sqlite3 calls) and so on.
+    """
+    own, total, packages = Counter(), Counter(), Counter()
+    for stack, weight in stacks.items():
+        labels = stack.split(';')
+        own[labels[-1]] += weight
+        packages[labels[-1].split(':', 1)[0].split('.', 1)[0]] += weight
+        for label in set(labels):
+            total[label] += weight
+    return own.most_common(limit), total.most_common(limit), packages.most_common(limit)
+
+
+class RequestProfiler:
+    """WSGI middleware that profiles selected requests with ``Sampler``.
+
+    A request is profiled when it carries ``?_profile=1`` or an
+    ``X-Profile`` header and the session belongs to a logged-in admin, or
+    at random with probability ``sample_rate``. The parameter is removed
+    before the app sees the request, so the page is served (and cached)
+    as usual. The whole response is produced inside the profiled call,
+    which buffers streamed responses while profiling. Results go to
+    ``store`` under the request's endpoint.
+
+    An unprofiled request costs two dict lookups and a substring test.
+    """
+
+    def __init__(self, wsgi_app, flask_app, store, sample_rate=0.0, interval=0.001):
+        self.wsgi_app = wsgi_app
+        self.flask_app = flask_app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def __call__(self, environ, start_response):
+        requested = environ.get(PROFILE_HEADER) or PROFILE_PARAM in environ.get('QUERY_STRING', '')
+        if requested:
+            requested = self._strip_param(environ) and self._is_admin(environ)
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            return self.wsgi_app(environ, start_response)
+        return self._profile(environ, start_response)
+
+    def _strip_param(self, environ):
+        query = environ.get('QUERY_STRING', '')
+        pairs = parse_qsl(query, keep_blank_values=True)
+        values = [value for name, value in pairs if name == PROFILE_PARAM]
+        if values:
+            environ['QUERY_STRING'] = urlencode([(n, v) for n, v in pairs if n != PROFILE_PARAM])
+        # ?_profile=0 so'rovni profillamaydi
+        return bool(environ.get(PROFILE_HEADER, '') not in ('', '0') or (values and values[-1] not in ('', '0')))
+
+    def _is_admin(self, environ):
+        app = self.flask_app
+        session = app.session_interface.open_session(app, app.request_class(environ))
+        return bool(session and session.get('admin_logged_in'))
+
+    def _endpoint(self, environ):
+        try:
+            return self.flask_app.url_map.bind_to_environ(environ).match()[0]
+        except Exception:
+            return UNMATCHED
+
+    def _profile(self, environ, start_response):
+        endpoint = self._endpoint(environ)
+        sampler = Sampler(threading.get_ident(), sys._getframe(), self.interval).start()
+        start = time.perf_counter()
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                body = list(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            elapsed = time.perf_counter() - start
+            stacks = sampler.stop()
+            try:
+                self.store.add(endpoint, elapsed, stacks)
+            except Exception as e:
+                print(f"Profile save error: {e}")
+        return body
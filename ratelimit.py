@@ -0,0 +1,222 @@
+import re
+import time
+import hashlib
+import threading
+
+RATE_LIMIT_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        tat REAL NOT NULL
+    ) WITHOUT ROWID
+'''
+SUBMISSIONS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS recent_submissions (
+        digest BLOB PRIMARY KEY,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID
+'''
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def phone_key(phone):
+    # "+998 (90) 123-45-67" va "998901234567" bitta kalit
+    digits = ''.join(ch for ch in phone or '' if ch.isdigit())
+    return digits or None
+
+
+def submission_digest(endpoint, values):
+    """16-byte digest of a form, insensitive to case and whitespace."""
+    h = hashlib.blake2b(endpoint.encode('utf-8'), digest_size=16)
+    for value in values:
+        h.update(b'\0' + _SPACE_RE.sub(' ', (value or '').strip().casefold()).encode('utf-8'))
+    return h.digest()
+
+
+def _sweep(entries, now, max_keys):
+    # Qiymat = muddat; kalitlar taxminan muddat tartibida qo'shiladi, shuning
+    # uchun boshidan muddati o'tganlarini (va limitdan ortig'ini) olish yetarli
+    while entries:
+        key = next(iter(entries))
+        if entries[key] > now and len(entries) <= max_keys:
+            break
+        del entries[key]
+
+
+class MemoryStore:
+    """Per-process limiter state: one float per key in insertion-ordered dicts.
+
+    Limits use GCRA: a key stores its "theoretical arrival time" and a
+    request is allowed while that stays within ``period`` of now, which
+    permits ``period / interval`` requests in a burst and one more every
+    ``interval`` seconds. A key is dropped as soon as it is fully
+    refilled, and the dicts never grow beyond ``max_keys``.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._tats = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, interval, period, now):
+        with self._lock:
+            old = self._tats.pop(key, None)
+            tat = max(old or now, now) + interval
+            allowed = tat - now <= period
+            # Qayta qo'shilgan kalit dict oxiriga o'tadi
+            self._tats[key] = tat if allowed else old
+            _sweep(self._tats, now, self.max_keys)
+            return allowed
+
+    def release(self, key, interval, now):
+        with self._lock:
+            tat = self._tats.get(key)
+            if tat is None:
+                return
+            if tat - interval <= now:
+                del self._tats[key]
+            else:
+                self._tats[key] = tat - interval
+
+    def first_seen(self, digest, window, now):
+        with self._lock:
+            expires_at = self._seen.get(digest)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._seen.pop(digest, None)
+            self._seen[digest] = now + window
+            _sweep(self._seen, now, self.max_keys)
+            return True
+
+    def forget(self, digest):
+        with self._lock:
+            self._seen.pop(digest, None)
+
+    def __len__(self):
+        return len(self._tats) + len(self._seen)
+
+
+class SQLiteStore:
+    """Limiter state shared by all workers through a small SQLite database.
+
+    Each check is one upsert that only succeeds while the key is within
+    its limit (``RETURNING`` tells the outcome). A rejected key is also
+    remembered in-process until it may pass again, so a flood from one
+    client is turned away without touching the database.
+    """
+
+    def __init__(self, db, max_keys=100000, sweep_interval=60.0):
+        self.db = db
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self._blocked = {}  # key -> vaqt (shu paytgacha umumiy hisob ham rad etadi)
+        self._lock = threading.Lock()
+        self._ready = False
+        self._next_sweep = 0.0
+
+    def create_schema(self, conn):
+        conn.execute(RATE_LIMIT_SCHEMA)
+        conn.execute(SUBMISSIONS_SCHEMA)
+
+    def _prepare(self, now):
+        if not self._ready:
+            with self.db.transaction() as conn:
+                self.create_schema(conn)
+            self._ready = True
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            with self.db.transaction() as conn:
+                conn.execute('DELETE FROM rate_limits WHERE tat <= ?', (now,))
+                conn.execute('DELETE FROM recent_submissions WHERE expires_at <= ?', (now,))
+
+    def acquire(self, key, interval, period, now):
+        with self._lock:
+            blocked_until = self._blocked.get(key)
+        if blocked_until is not None and blocked_until > now:
+            return False
+        self._prepare(now)
+        row = self.db.query_one('''
+            INSERT INTO rate_limits (key, tat) VALUES (?1, ?2 + ?3)
+            ON CONFLICT (key) DO UPDATE SET tat = max(tat, ?2) + ?3
+            WHERE max(tat, ?2) + ?3 - ?2 <= ?4
+            RETURNING tat
+        ''', (key, now, interval, period))
+        if row is not None:
+            return True
+        row = self.db.query_one('SELECT tat FROM rate_limits WHERE key = ?', (key,))
+        with self._lock:
+            self._blocked.pop(key, None)
+            self._blocked[key] = (row[0] if row else now) + interval - period
+            _sweep(self._blocked, now, self.max_keys)
+        return False
+
+    def release(self, key, interval, now):
+        with self.db.transaction() as conn:
+            conn.execute('UPDATE rate_limits SET tat = tat - ? WHERE key = ?', (interval, key))
+
+    def first_seen(self, digest, window, now):
+        self._prepare(now)
+        row = self.db.query_one('''
+            INSERT INTO recent_submissions (digest, expires_at) VALUES (?1, ?2 + ?3)
+            ON CONFLICT (digest) DO UPDATE SET expires_at = ?2 + ?3 WHERE expires_at <= ?2
+            RETURNING 1
+        ''', (digest, now, window))
+        return row is not None
+
+    def forget(self, digest):
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM recent_submissions WHERE digest = ?', (digest,))
+
+    def __len__(self):
+        return len(self._blocked)
+
+
+class SubmissionGuard:
+    """Rate limits and duplicate suppression for public form posts.
+
+    ``rules`` maps a key kind (``'ip'``, ``'phone'``) to ``(limit,
+    period)``: at most ``limit`` submissions per ``period`` seconds per
+    key, across all guarded endpoints. ``check()`` returns ``'limited'``,
+    ``'duplicate'`` (the same form from the same client within
+    ``duplicate_window`` seconds) or None. A post rejected by one rule
+    gives back what the rules before it took. A post that passed but was
+    not stored after all must be ``forget()``-ed, or its retry would be
+    taken for a duplicate.
+    """
+
+    def __init__(self, store, rules, duplicate_window=300.0):
+        self.store = store
+        self.rules = {kind: (period / limit, period) for kind, (limit, period) in rules.items() if limit > 0}
+        self.duplicate_window = duplicate_window
+        self.limited = 0
+        self.duplicates = 0
+
+    def check(self, endpoint, keys, values):
+        now = time.time()
+        taken = []
+        for kind, value in keys.items():
+            rule = self.rules.get(kind)
+            if rule is None or not value:
+                continue
+            key = f'{kind}:{value}'
+            if not self.store.acquire(key, rule[0], rule[1], now):
+                # Masalan telefon limiti rad etsa, IP navbati sarflanmagan bo'ladi
+                for key, interval in taken:
+                    self.store.release(key, interval, now)
+                self.limited += 1
+                return 'limited'
+            taken.append((key, rule[0]))
+        if self.duplicate_window > 0:
+            if not self.store.first_seen(self._digest(endpoint, keys, values), self.duplicate_window, now):
+                self.duplicates += 1
+                return 'duplicate'
+        return None
+
+    def forget(self, endpoint, keys, values):
+        if self.duplicate_window > 0:
+            self.store.forget(self._digest(endpoint, keys, values))
+
+    def _digest(self, endpoint, keys, values):
+        # Mijoz manzili ham kalitga kiradi: boshqa odamning bir xil xabari dublikat emas
+        return submission_digest(endpoint, (keys.get('ip'), *values))
@@ -0,0 +1,266 @@
+import re
+
+from markupsafe import Markup, escape
+
+COLUMNS = ('title', 'description', 'features')
+# bm25 og'irliklari: sarlavha > xususiyatlar > tavsif
+WEIGHTS = {'title': 10.0, 'description': 1.0, 'features': 2.0}
+# Indeksni course_search migratsiyasi yaratadi: og'irliklar o'zgarsa yangi migratsiya kerak
+RANK_FUNCTION = 'bm25({})'.format(', '.join(str(WEIGHTS[c]) for c in COLUMNS))
+# Bitta so'rovda bm25 bilan baholanadigan eng ko'p qator (eng yangilari)
+RANK_WINDOW = 200
+TRIGGERS = ('course_translations_search_ai', 'course_translations_search_ad', 'course_translations_search_au')
+# FTS rowid = course_id * LANG_SLOTS + ikki harfli til kodidan olingan raqam
+LANG_SLOTS = 1024
+
+# O'zbek lotin yozuvidagi tutuq belgisining barcha ko'rinishlari bitta "'" ga
+# keltiriladi (o‘ = oʻ = o' ), ruscha ё esa е ga - indeksda ham, so'rovda ham
+NORMALIZE = {"ʻ": "'", "ʼ": "'", "‘": "'", "’": "'", "`": "'", "ё": "е", "Ё": "Е"}
+_NORMALIZE_TABLE = str.maketrans(NORMALIZE)
+TOKEN_RE = re.compile(r"[\w']+")
+
+# Snippet ichidagi belgilash uchun matnda uchramaydigan belgilar
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+
+def normalize(text):
+    return (text or '').translate(_NORMALIZE_TABLE)
+
+
+def _sql_literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _normalize_sql(expr):
+    # normalize() ning SQL ko'rinishi - trigger'lar har qanday ulanishda ishlashi uchun
+    for src, dst in NORMALIZE.items():
+        expr = f'replace({expr}, {_sql_literal(src)}, {_sql_literal(dst)})'
+    return expr
+
+
+def lang_slot(lang):
+    if not (len(lang) == 2 and 'a' <= lang[0] <= 'z' and 'a' <= lang[1] <= 'z'):
+        raise ValueError(f'Language codes must be two lowercase letters: {lang!r}')
+    return (ord(lang[0]) - 97) * 26 + ord(lang[1]) - 97
+
+
+def _rowid_sql(row):
+    # lang_slot() ning SQL ko'rinishi: til ro'yxatiga bog'liq emas
+    return (f'{row}.course_id * {LANG_SLOTS} + (unicode(substr({row}.lang, 1, 1)) - 97) * 26'
+            f' + unicode(substr({row}.lang, 2, 1)) - 97')
+
+
+def _values_sql(row):
+    features = f"(SELECT group_concat(value, ', ') FROM json_each({row}.features))"
+    return ', '.join(_normalize_sql(expr) for expr in (f'{row}.title', f'{row}.description', features))
+
+
+def build_match(text, prefix=True):
+    """FTS5 MATCH expression for free user input, or None if it has no terms.
+
+    Every term is quoted, so FTS5 operators typed by users are searched
+    literally; with ``prefix`` each term of two or more characters also
+    matches longer words.
+    """
+    terms = [t.strip("'") for t in TOKEN_RE.findall(normalize(text).lower())]
+    terms = [t for t in terms if t]
+    if not terms:
+        return None
+    # Bir harfli prefiks indeksda yo'q va minglab so'zni qamrab oladi
+    return ' '.join(f'"{t}"*' if prefix and len(t) > 1 else f'"{t}"' for t in terms[:8])
+
+
+def schema_ready(conn):
+    """True if the table, its triggers and the current rank function exist."""
+    names = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('course_search', ?, ?, ?)", TRIGGERS)}
+    if len(names) != 1 + len(TRIGGERS):
+        return False
+    row = conn.execute("SELECT v FROM course_search_config WHERE k = 'rank'").fetchone()
+    return row is not None and row[0] == RANK_FUNCTION
+
+
+def create_schema(conn):
+    """Creates the index and its triggers, filling it from ``course_translations``."""
+    if schema_ready(conn):
+        return
+    cols = ', '.join(COLUMNS)
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS course_search USING fts5(
+            {cols},
+            tokenize = "unicode61 remove_diacritics 2 tokenchars ''''",
+            prefix = '2 3'
+        )
+    """)
+    # "ORDER BY rank" shu funksiyani ishlatadi; FTS5 o'zi saralaydi va
+    # highlight()/snippet() faqat LIMIT ichidagi qatorlar uchun hisoblanadi
+    conn.execute("INSERT INTO course_search (course_search, rank) VALUES ('rank', ?)", (RANK_FUNCTION,))
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS course_translations_search_ai AFTER INSERT ON course_translations BEGIN
+            INSERT INTO course_search (rowid, {cols}) VALUES ({_rowid_sql('new')}, {_values_sql('new')});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS course_translations_search_ad AFTER DELETE ON course_translations BEGIN
+            DELETE FROM course_search WHERE rowid = {_rowid_sql('old')};
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS course_translations_search_au AFTER UPDATE ON course_translations BEGIN
+            DELETE FROM course_search WHERE rowid = {_rowid_sql('old')};
+            INSERT INTO course_search (rowid, {cols}) VALUES ({_rowid_sql('new')}, {_values_sql('new')});
+        END
+    ''')
+    # Indeks bo'sh yoki eskirgan bo'lsa (trigger'lardan oldingi ma'lumotlar)
+    indexed = conn.execute('SELECT COUNT(*) FROM course_search').fetchone()[0]
+    total = conn.execute('SELECT COUNT(*) FROM course_translations').fetchone()[0]
+    if indexed != total:
+        rebuild(conn)
+
+
+def drop_triggers(conn):
+    # Katta import uchun: har qatorni alohida indekslashdan bitta rebuild() arzonroq.
+    # create_schema() trigger'larni qaytaradi
+    for name in TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def rebuild(conn):
+    cols = ', '.join(COLUMNS)
+    conn.execute('DELETE FROM course_search')
+    conn.execute(f'''
+        INSERT INTO course_search (rowid, {cols})
+        SELECT {_rowid_sql('t')}, {_values_sql('t')} FROM course_translations t
+    ''')
+    conn.execute("INSERT INTO course_search (course_search) VALUES ('optimize')")
+
+
+def _highlight(value):
+    # Matn escape qilinadi, keyin belgilar <mark> ga almashtiriladi
+    return Markup(str(escape(value or '')).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+class SearchResult:
+    __slots__ = ('course', 'title', 'snippet', 'rank')
+
+    def __init__(self, course, title, snippet, rank):
+        self.course = course
+        self.title = title
+        self.snippet = snippet
+        self.rank = rank
+
+
+class CourseSearch:
+    """Full-text course search over an FTS5 table kept in sync by triggers.
+
+    ``course_search`` has one row per ``course_translations`` row; its
+    rowid encodes the course id and the language, so triggers can update
+    single rows and a new language needs no schema change. The
+    ``unicode61`` tokenizer keeps apostrophes inside words, so
+    ``o'qish`` and ``qur'on`` stay single terms. Titles weigh most in the
+    bm25 ranking. A course is listed once, at its best matching
+    translation, and shown from the in-memory ``CourseCatalog`` in the
+    requested language.
+
+    bm25 costs microseconds per row, so only the newest ``RANK_WINDOW``
+    matching rows are ranked. When more rows match, the title column is
+    ranked the same way and its matches go first, so an exact title
+    match is missed only when ``RANK_WINDOW`` newer titles contain the
+    same terms, and those rank alike anyway. highlight() and snippet()
+    are computed for the displayed rows alone.
+    """
+
+    def __init__(self, db, catalog, languages):
+        self.db = db
+        self.catalog = catalog
+        self.languages = list(languages)
+        self._langs_by_slot = {lang_slot(lang): lang for lang in self.languages}
+
+    def schema_ready(self, conn):
+        return schema_ready(conn)
+
+    def create_schema(self, conn):
+        create_schema(conn)
+
+    def drop_triggers(self, conn):
+        drop_triggers(conn)
+
+    def rebuild(self, conn):
+        rebuild(conn)
+
+    def _ranked(self, match, limit):
+        # bm25 faqat eng yangi RANK_WINDOW ta mos qator uchun: FTS5 ularni rowid
+        # tartibida beradi va LIMIT dan keyin to'xtaydi. candidates = baholanganlar soni
+        return self.db.query('''
+            SELECT rowid, rank, COUNT(*) OVER () AS candidates
+            FROM (
+                SELECT rowid, rank FROM course_search
+                WHERE course_search MATCH ?
+                ORDER BY rowid DESC
+                LIMIT ?
+            )
+            ORDER BY rank
+            LIMIT ?
+        ''', (match, RANK_WINDOW, limit))
+
+    def _marked(self, match, rowids, snippet_tokens):
+        # highlight()/snippet() faqat ko'rsatiladigan qatorlar uchun. "+rowid IN" FTS5 ga
+        # berilmaydi: har bir qiymat uchun alohida so'rov o'rniga bitta rowid oralig'i
+        return {row['rowid']: row for row in self.db.query(f'''
+            SELECT rowid,
+                   highlight(course_search, 0, ?, ?) AS title,
+                   snippet(course_search, -1, ?, ?, '…', {int(snippet_tokens)}) AS snippet
+            FROM course_search
+            WHERE course_search MATCH ? AND rowid >= ? AND +rowid IN ({', '.join('?' * len(rowids))})
+        ''', (_MARK_OPEN, _MARK_CLOSE) * 2 + (match, min(rowids), *rowids))}
+
+    def _query(self, text, lang, limit, prefix=True, snippet_tokens=16):
+        match = build_match(text, prefix)
+        if match is None:
+            return []
+        lang = lang if lang in self.languages else self.languages[0]
+        # Bitta kurs bir necha tilda topilishi mumkin - shuning uchun zaxira bilan
+        wanted = limit * len(self.languages)
+        rows = self._ranked(match, wanted)
+        if rows and rows[0]['candidates'] == RANK_WINDOW:
+            # Oyna to'lgan (keng so'rov): sarlavhasida topilganlar yoshidan qat'i nazar oldinda
+            rows = self._ranked(f'title : ({match})', wanted) + rows
+
+        found = {}  # course_id -> (row, row_lang), eng yaxshi qator tartibida
+        for row in rows:
+            course_id, slot = divmod(row['rowid'], LANG_SLOTS)
+            row_lang = self._langs_by_slot.get(slot)
+            best = found.get(course_id)
+            if best is None or (row_lang == lang and best[1] != lang):
+                found[course_id] = (row, row_lang)
+
+        shown = []
+        for course_id, (row, row_lang) in found.items():
+            course = self.catalog.get(lang, course_id)
+            if course is not None:
+                shown.append((course, row))
+                if len(shown) == limit:
+                    break
+        if not shown:
+            return []
+        marked = self._marked(match, [row['rowid'] for _, row in shown], snippet_tokens)
+
+        results = []
+        for course, row in shown:
+            marks = marked.get(row['rowid'])
+            # Ko'rsatilayotgan sarlavha topilgan qatorniki bo'lsa (yoki standart
+            # tildan olingan bo'lsa) belgilangan variant ishlatiladi
+            title = marks['title'] or '' if marks is not None else ''
+            if title.replace(_MARK_OPEN, '').replace(_MARK_CLOSE, '') == normalize(course.title):
+                title_html = _highlight(title)
+            else:
+                title_html = escape(course.title)
+            snippet = _highlight(marks['snippet']) if marks is not None else Markup('')
+            results.append(SearchResult(course, title_html, snippet, row['rank']))
+        return results
+
+    def search(self, text, lang, limit=30):
+        return self._query(text, lang, limit)
+
+    def suggest(self, text, lang, limit=8):
+        return self._query(text, lang, limit, snippet_tokens=8)
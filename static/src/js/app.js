@@ -0,0 +1,191 @@
+// Initialize AOS
+if (window.AOS) {
+    AOS.init({
+        duration: 800,
+        easing: 'ease-out-cubic',
+        once: true,
+        offset: 100
+    });
+}
+
+// Language dropdown smooth animation
+document.addEventListener('DOMContentLoaded', function() {
+    const languageButton = document.querySelector('.group button');
+    const languageDropdown = document.querySelector('.group > div:last-child');
+
+    if (languageButton && languageDropdown) {
+        languageButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            languageDropdown.classList.toggle('opacity-0');
+            languageDropdown.classList.toggle('invisible');
+        });
+
+        // Close dropdown when clicking outside
+        document.addEventListener('click', function(e) {
+            if (!languageButton.contains(e.target) && !languageDropdown.contains(e.target)) {
+                languageDropdown.classList.add('opacity-0');
+                languageDropdown.classList.add('invisible');
+            }
+        });
+    }
+
+    // Mobile menu functionality
+    const mobileMenuButton = document.getElementById('mobile-menu-button');
+    const mobileMenu = document.getElementById('mobile-menu');
+
+    if (mobileMenuButton && mobileMenu) {
+        mobileMenuButton.addEventListener('click', function() {
+            mobileMenu.classList.toggle('hidden');
+
+            // Change icon
+            const icon = mobileMenuButton.querySelector('i');
+            if (mobileMenu.classList.contains('hidden')) {
+                icon.className = 'fas fa-bars text-xl';
+            } else {
+                icon.className = 'fas fa-times text-xl';
+            }
+        });
+
+        // Close mobile menu when clicking outside
+        document.addEventListener('click', function(e) {
+            if (!mobileMenuButton.contains(e.target) && !mobileMenu.contains(e.target)) {
+                mobileMenu.classList.add('hidden');
+                const icon = mobileMenuButton.querySelector('i');
+                icon.className = 'fas fa-bars text-xl';
+            }
+        });
+
+        // Close mobile menu when clicking on a link
+        const mobileMenuLinks = mobileMenu.querySelectorAll('a');
+        mobileMenuLinks.forEach(link => {
+            link.addEventListener('click', function() {
+                mobileMenu.classList.add('hidden');
+                const icon = mobileMenuButton.querySelector('i');
+                icon.className = 'fas fa-bars text-xl';
+            });
+        });
+    }
+});
+
+// Radio button selection styling (enroll sahifasi)
+// Hodisa document'da ushlanadi: "Ko'proq" orqali qo'shilgan kurslar ham ishlaydi
+document.addEventListener('change', function(e) {
+    const radio = e.target;
+    if (!radio.matches('input[type="radio"][name="course_id"]')) {
+        return;
+    }
+
+    // Remove all checked styles
+    document.querySelectorAll('.border-islamic-green.bg-islamic-green.text-white').forEach(el => {
+        el.classList.remove('border-islamic-green', 'bg-islamic-green', 'text-white');
+        el.classList.add('border-gray-200');
+    });
+
+    // Add checked styles to selected option
+    if (radio.checked) {
+        const label = radio.closest('label');
+        const div = label.querySelector('div');
+        div.classList.remove('border-gray-200');
+        div.classList.add('border-islamic-green', 'bg-islamic-green', 'text-white');
+    }
+});
+
+// "Ko'proq ko'rsatish": keyingi sahifa JSON orqali olinib ro'yxat oxiriga qo'shiladi.
+// JavaScript bo'lmasa havola oddiy ?cursor= sahifasini ochadi.
+document.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-load-more]');
+    if (!button) {
+        return;
+    }
+    e.preventDefault();
+    if (button.dataset.loading) {
+        return;
+    }
+    button.dataset.loading = '1';
+    button.classList.add('opacity-50');
+
+    const target = document.querySelector(button.dataset.target);
+    fetch(button.dataset.loadMore + '?cursor=' + encodeURIComponent(button.dataset.cursor), {
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        })
+        .then(data => {
+            target.insertAdjacentHTML('beforeend', data.html);
+            if (data.next_cursor) {
+                const url = new URL(button.href, window.location.href);
+                url.searchParams.set('cursor', data.next_cursor);
+                button.href = url.toString();
+                button.dataset.cursor = data.next_cursor;
+                delete button.dataset.loading;
+                button.classList.remove('opacity-50');
+            } else {
+                button.parentElement.remove();
+            }
+        })
+        .catch(() => {
+            window.location.href = button.href;
+        });
+});
+
+// Qidiruv: yozish paytida /api/search/suggest dan takliflar
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('input[data-suggest]').forEach(input => {
+        const list = document.querySelector(input.dataset.suggestList);
+        let timer = null;
+        let controller = null;
+
+        function hide() {
+            list.classList.add('hidden');
+            list.innerHTML = '';
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const q = input.value.trim();
+            if (q.length < 2) {
+                hide();
+                return;
+            }
+            timer = setTimeout(function() {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                fetch(input.dataset.suggest + '?q=' + encodeURIComponent(q), { signal: controller.signal })
+                    .then(response => response.json())
+                    .then(items => {
+                        if (!items.length) {
+                            hide();
+                            return;
+                        }
+                        // title_html/snippet_html serverda escape qilingan, faqat <mark> bor
+                        list.innerHTML = items.map(item =>
+                            '<a href="' + item.url + '" class="block px-6 py-3 hover:bg-gray-50 border-b border-gray-100">' +
+                            '<div class="font-semibold text-gray-900">' + item.title_html + '</div>' +
+                            '<div class="text-sm text-gray-500 truncate">' + item.snippet_html + '</div>' +
+                            '</a>'
+                        ).join('');
+                        list.classList.remove('hidden');
+                    })
+                    .catch(() => {});
+            }, 150);
+        });
+
+        input.addEventListener('keydown', function(e) {
+            if (e.key === 'Escape') {
+                hide();
+            }
+        });
+
+        document.addEventListener('click', function(e) {
+            if (!input.form.contains(e.target)) {
+                hide();
+            }
+        });
+    });
+});
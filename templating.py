@@ -0,0 +1,88 @@
+import threading
+
+from jinja2.ext import Extension
+from jinja2.lexer import Token, TOKEN_NAME, TOKEN_LPAREN, TOKEN_RPAREN, TOKEN_STRING, TOKEN_DOT
+
+
+class InlineTranslationsExtension(Extension):
+    """Compile-time replacement of ``get_translation('literal')``.
+
+    When the environment carries an ``inline_translations`` dict the call
+    is swapped for a string constant while the template is parsed, so the
+    compiled template contains the translated text itself. Calls with a
+    variable key or an explicit ``lang`` argument are left untouched and
+    still resolved at render time.
+    """
+
+    function_name = 'get_translation'
+
+    def filter_stream(self, stream):
+        translations = getattr(self.environment, 'inline_translations', None)
+        if translations is None:
+            yield from stream
+            return
+
+        window = []
+        previous = None
+        for token in stream:
+            window.append(token)
+            while window:
+                matched = self._match(window, previous)
+                if matched is None:
+                    # Yetarli token yo'q - keyingisini kutamiz
+                    break
+                if matched:
+                    key = window[2].value
+                    previous = Token(window[0].lineno, TOKEN_STRING, translations.get(key, key))
+                    del window[:4]
+                else:
+                    previous = window.pop(0)
+                yield previous
+        yield from window
+
+    def _match(self, window, previous):
+        first = window[0]
+        if first.type != TOKEN_NAME or first.value != self.function_name:
+            return False
+        if previous is not None and previous.type == TOKEN_DOT:
+            return False
+        expected = (TOKEN_LPAREN, TOKEN_STRING, TOKEN_RPAREN)
+        for i, token_type in enumerate(expected, start=1):
+            if len(window) <= i:
+                return None
+            if window[i].type != token_type:
+                return False
+        return True
+
+
+class LocalizedTemplates:
+    """One overlay of the app's Jinja environment per language.
+
+    Each overlay has its own template cache, so every template is compiled
+    once per (template, language). An overlay is rebuilt when the
+    catalog reloads that language.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._environments = {}  # lang -> (version, environment)
+        self._lock = threading.Lock()
+
+    def environment(self, base_env, lang):
+        translations = self.catalog.get(lang)
+        version = self.catalog.version(lang)
+        entry = self._environments.get(lang)
+        if entry is None or entry[0] != version or entry[1].base_env is not base_env:
+            with self._lock:
+                entry = self._environments.get(lang)
+                if entry is None or entry[0] != version or entry[1].base_env is not base_env:
+                    env = base_env.overlay(extensions=[InlineTranslationsExtension])
+                    env.base_env = base_env
+                    env.inline_translations = dict(translations)
+                    entry = (version, env)
+                    self._environments[lang] = entry
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._environments.clear()